@@ -0,0 +1,62 @@
+import sys
+import json
+import argparse
+from typing import Dict, Tuple
+
+# (지표, 값이 클수록 좋은지)
+METRICS = [
+    ("latency_ms_p50", False),
+    ("latency_ms_p95", False),
+    ("latency_ms_p99", False),
+    ("throughput_rps", True),
+    ("peak_rss_mb", False),
+    ("seconds", False),
+]
+
+
+def index_results(report: dict) -> Dict[Tuple, dict]:
+    return {(r["size"], r["stage"], r["concurrency"]): r for r in report["results"]}
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list:
+    """
+    두 run_benchmark 결과를 (크기, 단계, 동시성) 별로 비교합니다.
+    threshold(비율) 이상 나빠진 지표는 regression 으로 표시합니다.
+    """
+    rows = []
+    base_index, current_index = index_results(baseline), index_results(current)
+    for key in sorted(set(base_index) & set(current_index)):
+        for metric, higher_is_better in METRICS:
+            before, after = base_index[key].get(metric), current_index[key].get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            regression = (-change if higher_is_better else change) > threshold
+            rows.append({
+                "size": key[0], "stage": key[1], "concurrency": key[2], "metric": metric,
+                "baseline": before, "current": after, "change": round(change, 4), "regression": regression,
+            })
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="run_benchmark 결과 JSON 두 개 비교 (커밋 간 회귀 확인)")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.1, help="regression 으로 볼 변화율 (기본 10%%)")
+    parser.add_argument("--fail-on-regression", action="store_true", help="regression 이 있으면 종료 코드 1")
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+
+    print(f"baseline: {baseline['meta'].get('commit')}  current: {current['meta'].get('commit')}")
+    rows = compare(baseline, current, args.threshold)
+    for row in rows:
+        mark = "  REGRESSION" if row["regression"] else ""
+        print(f"{row['size']:>8} {row['stage']:<16} c={row['concurrency']:<3} {row['metric']:<16} "
+              f"{row['baseline']:>12} -> {row['current']:>12} ({row['change']:+.1%}){mark}")
+    if args.fail_on_regression and any(row["regression"] for row in rows):
+        sys.exit(1)
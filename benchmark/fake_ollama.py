@@ -0,0 +1,119 @@
+import json
+import time
+import random
+import asyncio
+import argparse
+import threading
+from typing import List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from util.date_tool import get_seoul_time
+
+
+def create_app(vocabulary: List[str], latency: float, jitter: float = 0.0,
+               tokens_per_sec: Optional[float] = None, seed: int = 0) -> FastAPI:
+    """
+    Ollama /api/chat 프로토콜을 흉내 내는 로컬 스텁 서버입니다.
+    사용자 프롬프트에 등장하는 태그(없으면 무작위 태그)와 프롬프트 앞부분으로 {"tags", "summary"} JSON 을 응답합니다.
+    format 이 JSON schema 이면 tags 의 maxItems 와 summary 의 maxLength 를 따르고,
+    options.num_predict 보다 긴 응답은 잘라서 done_reason "length" 로 돌려줍니다 (2자당 1토큰으로 계산).
+
+    :param latency: 응답 전체 지연시간(초). jitter 만큼 균등분포로 흔듭니다.
+    :param tokens_per_sec: 지정하면 latency 대신 출력 길이/속도로 지연시간을 정합니다.
+    """
+    app = FastAPI()
+    rng = random.Random(seed)
+
+    def answer(user_prompt: str, schema) -> str:
+        tags = [tag for tag in vocabulary if tag in user_prompt] or rng.sample(vocabulary, rng.randint(1, 3))
+        summary = " ".join(user_prompt.split())[:80]
+        if isinstance(schema, dict):
+            properties = schema.get("properties", {})
+            tags = tags[:properties.get("tags", {}).get("maxItems", len(tags))]
+            summary = summary[:properties.get("summary", {}).get("maxLength", len(summary))]
+        return json.dumps({"tags": tags, "summary": summary}, ensure_ascii=False)
+
+    def delay_for(content: str) -> float:
+        if tokens_per_sec:
+            return len(content) / 2 / tokens_per_sec  # 한국어/영어 혼합 기준 대략 2자당 1토큰
+        return max(0.0, latency + rng.uniform(-jitter, jitter))
+
+    @app.post("/api/chat")
+    async def chat(request: Request):
+        body = await request.json()
+        user_prompt = next((m["content"] for m in reversed(body["messages"]) if m["role"] == "user"), "")
+        content = answer(user_prompt, body.get("format"))
+        num_predict = (body.get("options") or {}).get("num_predict")
+        done_reason = "stop"
+        if num_predict is not None and len(content) > num_predict * 2:
+            content, done_reason = content[:num_predict * 2], "length"
+        delay = delay_for(content)
+        started = time.perf_counter_ns()
+        meta = {"model": body.get("model", ""), "created_at": get_seoul_time().isoformat()}
+
+        def final(eval_count: int) -> dict:
+            return {
+                **meta, "message": {"role": "assistant", "content": ""}, "done": True, "done_reason": done_reason,
+                "total_duration": time.perf_counter_ns() - started,
+                "prompt_eval_count": sum(len(m["content"]) for m in body["messages"]) // 2,
+                "eval_count": eval_count, "eval_duration": int(delay * 1e9),
+            }
+
+        if not body.get("stream", True):
+            await asyncio.sleep(delay)
+            response = final(len(content) // 2)
+            response["message"]["content"] = content
+            return JSONResponse(response)
+
+        async def stream():
+            chunks = [content[i:i + 4] for i in range(0, len(content), 4)]
+            for chunk in chunks:
+                await asyncio.sleep(delay / len(chunks))
+                yield json.dumps({**meta, "message": {"role": "assistant", "content": chunk}, "done": False},
+                                 ensure_ascii=False) + "\n"
+            yield json.dumps(final(len(chunks)), ensure_ascii=False) + "\n"
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    return app
+
+
+class FakeOllamaServer:
+    """create_app 서버를 백그라운드 스레드에서 실행합니다 (벤치마크 프로세스 안에서 사용)."""
+
+    def __init__(self, app: FastAPI, host: str = "127.0.0.1", port: int = 0):
+        self._server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, name="fake-ollama", daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.servers[0].sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeOllamaServer":
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+
+    def stop(self):
+        self._server.should_exit = True
+        self._thread.join()
+
+
+if __name__ == "__main__":
+    from benchmark.synthetic_catalog import tag_vocabulary
+
+    parser = argparse.ArgumentParser(description="Ollama /api/chat 스텁 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", type=float, default=1.0, help="응답 지연시간(초)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="지연시간 흔들림(초)")
+    parser.add_argument("--tokens-per-sec", type=float, help="지정 시 출력 길이/속도로 지연시간 결정")
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(tag_vocabulary(), args.latency, args.jitter, args.tokens_per_sec),
+                host=args.host, port=args.port)
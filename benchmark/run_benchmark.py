@@ -0,0 +1,310 @@
+import os
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, List
+
+import numpy as np
+
+# 저장소 모듈(constants.env_variables 등)은 import 시점에 환경 변수를 읽으므로,
+# worker 에서 합성 카탈로그용 환경 변수를 설정한 뒤에 import 합니다.
+
+DEFAULT_PROMPTS = [
+    "신제품 화장품 런칭을 위한 감성적인 뷰티 광고 영상을 만들고 싶어요. 모델이 등장하고 제품 클로즈업이 많았으면 합니다.",
+    "지자체 축제를 홍보하는 행사 스케치 영상, 드론 촬영으로 현장 분위기를 담아 주세요.",
+    "모바일 앱 서비스 소개용 모션 그래픽 영상이 필요합니다. 숏폼으로도 편집해 주세요.",
+    "병원 신뢰도를 높이는 인터뷰 중심 홍보영상을 제작하고 싶습니다.",
+    "자동차 신차 출시 TV CF, 역동적인 주행 장면과 3D 그래픽을 활용하고 싶어요.",
+]
+
+
+def load_prompts(path: str) -> List[str]:
+    """프롬프트 코퍼스. .jsonl 이면 각 줄의 title + body, 아니면 줄 단위 텍스트를 사용합니다."""
+    if not path or not os.path.exists(path):
+        return DEFAULT_PROMPTS
+    prompts = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if path.endswith(".jsonl"):
+                item = json.loads(line)
+                line = " ".join(str(item[key]) for key in ("title", "body") if item.get(key))
+            prompts.append(line)
+    return prompts or DEFAULT_PROMPTS
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 는 KB, macOS 는 byte 단위
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def summarize(latencies_ms: List[float], wall_sec: float) -> dict:
+    latencies = np.asarray(latencies_ms)
+    return {
+        "count": len(latencies),
+        "latency_ms_mean": round(float(latencies.mean()), 3),
+        "latency_ms_p50": round(float(np.percentile(latencies, 50)), 3),
+        "latency_ms_p90": round(float(np.percentile(latencies, 90)), 3),
+        "latency_ms_p95": round(float(np.percentile(latencies, 95)), 3),
+        "latency_ms_p99": round(float(np.percentile(latencies, 99)), 3),
+        "latency_ms_max": round(float(latencies.max()), 3),
+        "throughput_rps": round(len(latencies) / wall_sec, 2) if wall_sec > 0 else None,
+    }
+
+
+def run_threads(fn: Callable, items: list, concurrency: int) -> dict:
+    """동기 함수 fn 을 concurrency 개 스레드로 items 에 대해 실행하고 지연시간/처리량을 집계합니다."""
+    def timed(item):
+        started = time.perf_counter()
+        fn(item)
+        return (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    if concurrency <= 1:
+        latencies = [timed(item) for item in items]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = list(pool.map(timed, items))
+    return summarize(latencies, time.perf_counter() - started)
+
+
+async def run_async(fn: Callable[..., Awaitable], items: list, concurrency: int) -> dict:
+    """코루틴 함수 fn 을 최대 concurrency 개 동시에 items 에 대해 실행하고 지연시간/처리량을 집계합니다."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def timed(item):
+        async with semaphore:
+            started = time.perf_counter()
+            await fn(item)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(timed(item) for item in items))
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def configure_env(args, workdir: str, ollama_port: int):
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'catalog.sqlite')}",
+        "ARTIFACTS_DIR": os.path.join(workdir, "artifacts"),
+        "ARTIFACT_RELOAD_INTERVAL": "0",
+        "TAG_MAPPING_REFRESH_INTERVAL": "0",
+        "OLLAMA_HOST": f"http://127.0.0.1:{ollama_port}",
+        "LLM_MAX_CONCURRENCY": str(args.concurrency),
+    })
+    if args.index_type:
+        os.environ["INDEX_TYPE"] = args.index_type
+    if not args.summary_cache:
+        # 같은 프롬프트가 반복되므로 캐시를 끄지 않으면 LLM 경로가 측정되지 않습니다.
+        os.environ["SUMMARY_CACHE_SIZE"] = "0"
+        os.environ.pop("SUMMARY_CACHE_DB_PATH", None)
+
+
+def run_worker(args) -> List[dict]:
+    """카탈로그 크기 하나에 대한 측정. 최대 RSS 를 크기별로 분리하기 위해 크기마다 별도 프로세스에서 실행됩니다."""
+    size = args.worker_size
+    workdir = os.path.join(args.workdir, f"catalog_{size}_seed{args.seed}")
+    os.makedirs(workdir, exist_ok=True)
+    ollama_port = free_port()
+    configure_env(args, workdir, ollama_port)
+
+    import httpx
+    from benchmark.fake_ollama import FakeOllamaServer, create_app
+    from benchmark.synthetic_catalog import RandomEncoder, create_catalog, tag_vocabulary
+    from constants.env_variables import EnvVariables
+    from preprocess.generate_embedding import build_portfolio_artifact, build_tag_artifact
+    from schema.generate_dto import GenerateDTO
+    from schema.search_dto import SearchDTO
+    from service.generate_service import GenerateService
+    from service.llm_client import LLMClient
+    from service.search_engine import SearchEngine
+    from service.search_service import SearchService
+    from service.tag_mapping_store import TagMappingStore
+    from util.artifact_store import PORTFOLIO_ARTIFACT, TAG_ARTIFACT, current_generation
+    from util.database import SessionLocal
+
+    results = []
+
+    def record(stage: str, concurrency: int, stats: dict, **extra):
+        results.append({"size": size, "stage": stage, "concurrency": concurrency, **stats,
+                        "peak_rss_mb": peak_rss_mb(), **extra})
+
+    vocabulary = tag_vocabulary()
+    rng = random.Random(args.seed)
+    prompts = load_prompts(args.prompts)
+
+    # 1. 합성 카탈로그 + artifact
+    db_path = os.path.join(workdir, "catalog.sqlite")
+    reuse = args.reuse_catalog and os.path.exists(db_path) and \
+        current_generation(EnvVariables.ARTIFACTS_DIR, PORTFOLIO_ARTIFACT) is not None
+    if not reuse:
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        started = time.perf_counter()
+        catalog = create_catalog(db_path, size, seed=args.seed)
+        record("create_catalog", 1, {"seconds": round(time.perf_counter() - started, 3), **catalog})
+
+        engine = SearchEngine.get_instance()
+        encoder = engine.model if args.encode else \
+            RandomEncoder(engine.model.get_sentence_embedding_dimension(), args.seed)
+        started = time.perf_counter()
+        with SessionLocal() as db:
+            _, _, build_report = build_portfolio_artifact(
+                db, encoder, EnvVariables.EMBEDDING_MODEL_NAME, False,
+                EnvVariables.PREPROCESS_BATCH_SIZE, EnvVariables.PREPROCESS_WORKERS,
+            )
+        record("build_artifact", 1, {"seconds": round(time.perf_counter() - started, 3),
+                                     "encoder": "model" if args.encode else "random"},
+               stages=build_report["stages"])
+
+    # 태그 어휘 유사도 표는 쿼리와 같은 임베딩 모델로 만듭니다 (어휘가 작아 --encode 와 무관하게 실제 모델 사용).
+    if current_generation(EnvVariables.ARTIFACTS_DIR, TAG_ARTIFACT) is None:
+        with SessionLocal() as db:
+            build_tag_artifact(db, SearchEngine.get_instance().model, EnvVariables.EMBEDDING_MODEL_NAME)
+
+    # 2. SearchService.ptfo_search (프로세스 상주 상태 로드 후 단건/동시 측정)
+    engine = SearchEngine.get_instance()
+    started = time.perf_counter()
+    engine.load()
+    TagMappingStore.get_instance().load()
+    record("load", 1, {"seconds": round(time.perf_counter() - started, 3)})
+
+    search_requests = [
+        SearchDTO.PtfoSearchReqDTO(
+            summary=" ".join(rng.choice(prompts).split())[:120],
+            tags=rng.sample(vocabulary, rng.randint(1, 3)),
+            top_k=args.top_k,
+        )
+        for _ in range(args.queries)
+    ]
+    SearchService.ptfo_search(search_requests[0])
+    record("ptfo_search", 1, run_threads(SearchService.ptfo_search, search_requests, 1))
+    if args.concurrency > 1:
+        record("ptfo_search", args.concurrency,
+               run_threads(SearchService.ptfo_search, search_requests, args.concurrency))
+
+    # 3. GenerateService.generate_summary 와 /rank/ptfo (가짜 Ollama 상대로, 같은 이벤트 루프에서)
+    server = FakeOllamaServer(
+        create_app(vocabulary, args.llm_latency, args.llm_jitter, seed=args.seed), port=ollama_port
+    ).start()
+    llm_prompts = [rng.choice(prompts) for _ in range(args.llm_requests)]
+
+    async def measure_llm_stages():
+        async def generate(prompt):
+            await GenerateService.generate_summary(GenerateDTO.SummaryReqDTO(user_prompt=prompt))
+
+        # llm: 생성 토큰 수/속도, repair/fallback 수 (LLM_STRUCTURED_OUTPUT 비교용)
+        record("generate_summary", args.concurrency, await run_async(generate, llm_prompts, args.concurrency),
+               llm_latency_ms=args.llm_latency * 1000, llm=LLMClient.get_instance().stats())
+
+        from main import app
+        async with app.router.lifespan_context(app), httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://benchmark", timeout=None,
+        ) as client:
+            async def rank(prompt):
+                response = await client.post("/rank/ptfo", json={"user_prompt": prompt, "top_k": args.top_k})
+                response.raise_for_status()
+
+            record("rank_ptfo", args.concurrency, await run_async(rank, llm_prompts, args.concurrency),
+                   llm_latency_ms=args.llm_latency * 1000)
+
+            # LLM 호출과 후보 검색을 겹치는 speculative 모드 (후보 포함률은 모든 요청을 검증해 집계)
+            from service.speculative_search import SpeculativeSearch
+            speculative = SpeculativeSearch.get_instance()
+            speculative.verify_rate = 1.0
+
+            async def rank_speculative(prompt):
+                response = await client.post("/rank/ptfo", json={
+                    "user_prompt": prompt, "top_k": args.top_k, "speculative": True,
+                })
+                response.raise_for_status()
+
+            stats = await run_async(rank_speculative, llm_prompts, args.concurrency)
+            await asyncio.to_thread(speculative.wait_for_verification)
+            record("rank_ptfo_speculative", args.concurrency, stats,
+                   llm_latency_ms=args.llm_latency * 1000, speculative=speculative.stats())
+
+    try:
+        asyncio.run(measure_llm_stages())
+    finally:
+        server.stop()
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="합성 카탈로그 + 가짜 Ollama 로 검색/요약/랭크 파이프라인 벤치마크")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000], help="포폴 수 (1k ~ 1M)")
+    parser.add_argument("--queries", type=int, default=200, help="ptfo_search 측정 요청 수")
+    parser.add_argument("--llm-requests", type=int, default=50, help="generate_summary, /rank/ptfo 측정 요청 수")
+    parser.add_argument("--concurrency", type=int, default=8, help="동시 요청 수")
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="가짜 Ollama 응답 지연시간(초)")
+    parser.add_argument("--llm-jitter", type=float, default=0.1, help="가짜 Ollama 지연시간 흔들림(초)")
+    parser.add_argument("--index-type", help="INDEX_TYPE 재지정 (flat | ivf_flat | hnsw | ivf_pq)")
+    parser.add_argument("--encode", action="store_true",
+                        help="포폴 임베딩을 실제 모델로 인코딩 (기본: 무작위 벡터, 대규모 카탈로그용)")
+    parser.add_argument("--summary-cache", action="store_true", help="LLM 요약 캐시를 켠 채 측정")
+    parser.add_argument("--prompts", default="requests.jsonl", help="프롬프트 코퍼스 (.jsonl 또는 줄 단위 텍스트)")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "ragvertise_benchmark"),
+                        help="합성 DB/artifact 디렉토리")
+    parser.add_argument("--reuse-catalog", action="store_true", help="이전 실행의 합성 DB/artifact 재사용")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="결과 JSON 경로 (미지정 시 표준출력)")
+    parser.add_argument("--worker-size", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker_size:
+        print(json.dumps(run_worker(args), ensure_ascii=False))
+        sys.exit(0)
+
+    results = []
+    for size in args.sizes:
+        print(f"benchmark: {size} portfolios", file=sys.stderr)
+        worker = subprocess.run(
+            [sys.executable, "-m", "benchmark.run_benchmark", *sys.argv[1:], "--worker-size", str(size)],
+            stdout=subprocess.PIPE, text=True, check=True,
+        )
+        results += json.loads(worker.stdout.strip().splitlines()[-1])
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": {key: value for key, value in vars(args).items() if key != "worker_size"},
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    else:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
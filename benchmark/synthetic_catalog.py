@@ -0,0 +1,95 @@
+import random
+import sqlite3
+from typing import List
+
+import numpy as np
+from sqlalchemy import create_engine
+
+from model.tag_info import TagInfo
+from model.ptfo_info import PtfoInfo
+from model.ptfo_tag_merged import PtfoTagMerged
+from util.database import Base
+
+# 포폴명/설명 생성용 단어
+_SUBJECTS = ["브랜드", "신제품", "매장", "서비스", "앱", "캠페인", "행사", "공간", "기업", "축제", "학교", "병원", "자동차", "화장품", "음료"]
+_STYLES = ["감성적인", "역동적인", "따뜻한", "세련된", "유쾌한", "미니멀한", "시네마틱", "트렌디한", "신뢰감 있는", "몰입감 있는"]
+_SHOTS = ["드론 항공 촬영", "인터뷰", "제품 클로즈업", "모션 그래픽", "3D 렌더링", "타임랩스", "핸드헬드 촬영", "스톱모션",
+          "배우 연기", "숏폼 편집", "인포그래픽", "현장 스케치"]
+_GOALS = ["인지도 향상", "구매 전환", "브랜드 이미지 구축", "정보 전달", "공감 형성", "신뢰 형성", "채용 홍보", "행사 기록"]
+
+
+def tag_vocabulary() -> List[str]:
+    """tb_tag_info 의 광고 카테고리 어휘. LLM 시스템 프롬프트의 '태그종류' 와 같은 목록을 사용합니다."""
+    from service.generate_service import SUMMARY_TAGS
+
+    return list(SUMMARY_TAGS)
+
+
+def _description(rng: random.Random, tags: List[str]) -> str:
+    parts = [
+        f"{rng.choice(_STYLES)} {rng.choice(_SUBJECTS)} 광고 영상입니다.",
+        f"{rng.choice(_SHOTS)}과 {rng.choice(_SHOTS)}을 활용해 {rng.choice(_GOALS)}을 목표로 제작했습니다.",
+    ]
+    if tags:
+        parts.append(f"주요 키워드는 {', '.join(tags)} 입니다.")
+    parts.append(f"{rng.choice(_STYLES)} 톤으로 {rng.choice(_GOALS)}에 집중했습니다.")
+    return " ".join(parts)
+
+
+def create_catalog(path: str, rows: int, seed: int = 0, max_tags: int = 4, chunk_rows: int = 50000) -> dict:
+    """
+    model/ 의 테이블과 같은 스키마로 SQLite 합성 카탈로그를 만듭니다.
+    각 포폴은 태그 어휘에서 0~max_tags 개의 태그를 받고, 태그는 설명에도 일부 등장합니다.
+
+    :return: 생성된 행 수 요약
+    """
+    Base.metadata.create_all(create_engine(f"sqlite:///{path}"), tables=[
+        TagInfo.__table__, PtfoInfo.__table__, PtfoTagMerged.__table__,
+    ])
+    vocabulary = tag_vocabulary()
+    rng = random.Random(seed)
+    tag_counts = np.random.default_rng(seed).integers(0, max_tags + 1, size=rows)
+
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.executemany("INSERT INTO tb_tag_info (TAG_SEQNO, TAG_NM) VALUES (?, ?)",
+                         [(i + 1, tag) for i, tag in enumerate(vocabulary)])
+        merged_rows = 0
+        for start in range(0, rows, chunk_rows):
+            portfolios, merged = [], []
+            for seqno in range(start + 1, min(rows, start + chunk_rows) + 1):
+                tag_ids = rng.sample(range(len(vocabulary)), int(tag_counts[seqno - 1]))
+                tags = [vocabulary[i] for i in tag_ids]
+                name = f"{rng.choice(_SUBJECTS)} {rng.choice(_SHOTS)} {seqno}"
+                desc = _description(rng, tags)
+                portfolios.append((seqno, name, desc))
+                merged += [(seqno, tag_id + 1, name, desc, vocabulary[tag_id]) for tag_id in tag_ids]
+            conn.executemany("INSERT INTO tb_ptfo_info (PTFO_SEQNO, PTFO_NM, PTFO_DESC) VALUES (?, ?, ?)", portfolios)
+            conn.executemany(
+                "INSERT INTO tb_ptfo_tag_merged (PTFO_SEQNO, TAG_SEQNO, PTFO_NM, PTFO_DESC, TAG_NM) VALUES (?, ?, ?, ?, ?)",
+                merged,
+            )
+            merged_rows += len(merged)
+        conn.commit()
+    finally:
+        conn.close()
+    return {"portfolios": rows, "tags": len(vocabulary), "portfolio_tags": merged_rows}
+
+
+class RandomEncoder:
+    """
+    SentenceTransformer 대신 쓰는 무작위 인코더. 대규모 합성 카탈로그의 artifact 를 빠르게 만들 때 사용합니다.
+    벡터에 의미적 유사도가 없으므로 지연시간/처리량/메모리 측정 전용입니다.
+    """
+
+    def __init__(self, dim: int, seed: int = 0):
+        self.dim = dim
+        self._rng = np.random.default_rng(seed)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def encode(self, texts: List[str], convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        return self._rng.standard_normal((len(texts), self.dim)).astype(np.float32)
@@ -5,6 +5,8 @@ load_dotenv()
 
 class EnvVariables:
     API_PORT = os.getenv('API_PORT')
+    # python main.py 로 실행할 때의 uvicorn worker 수, 0 이면 CPU 코어 수
+    API_WORKERS = int(os.getenv("API_WORKERS", "1"))
 
     # DB
     DB_HOST = os.getenv("DB_HOST")
@@ -13,6 +15,124 @@ class EnvVariables:
     DB_PASSWORD = os.getenv("DB_PASSWORD")
     DB_CLASSNAME = os.getenv("DB_CLASSNAME")
     DB_PORT = os.getenv("DB_PORT")
+    DATABASE_URL = os.getenv("DATABASE_URL")  # 지정 시 위 DB_* 대신 사용하는 SQLAlchemy URL
+    # DB 커넥션 풀 크기, 초과 허용 수, 대기 타임아웃(초), 재생성 주기(초)
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "3600"))
+
+    # Search
+    ARTIFACTS_DIR = os.getenv("ARTIFACTS_DIR", "./artifacts")
+    EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+    # 서버 쿼리 인코더 백엔드 (torch | onnx | torch_int8), 로컬 모델 디렉토리(미지정 시 허브), ONNX 파일(모델 디렉토리 기준 경로)
+    ENCODER_BACKEND = os.getenv("ENCODER_BACKEND", "torch")
+    ENCODER_MODEL_DIR = os.getenv("ENCODER_MODEL_DIR") or None
+    ENCODER_ONNX_FILE = os.getenv("ENCODER_ONNX_FILE") or None
+    # true 이면 warm-up(모델/artifact 로드, 첫 인코딩)이 끝난 뒤에 요청을 받기 시작 (기본은 백그라운드 warm-up)
+    WARMUP_BLOCKING = os.getenv("WARMUP_BLOCKING", "false").lower() == "true"
+    # artifact 변경 감지 주기(초), 0 이하이면 감시하지 않음
+    ARTIFACT_RELOAD_INTERVAL = float(os.getenv("ARTIFACT_RELOAD_INTERVAL", "30"))
+    # 로드 시 artifact sha256 체크섬 검증 여부 (파일 전체를 읽으므로 기본 비활성)
+    ARTIFACT_VERIFY_CHECKSUM = os.getenv("ARTIFACT_VERIFY_CHECKSUM", "false").lower() == "true"
+    # 보관할 artifact generation 수
+    ARTIFACT_KEEP_GENERATIONS = int(os.getenv("ARTIFACT_KEEP_GENERATIONS", "3"))
+
+    # ANN 인덱스 (flat | ivf_flat | hnsw | ivf_pq), preprocess 단계에서 학습/저장
+    INDEX_TYPE = os.getenv("INDEX_TYPE", "flat")
+    INDEX_IVF_NLIST = int(os.getenv("INDEX_IVF_NLIST", "1024"))
+    INDEX_IVF_NPROBE = int(os.getenv("INDEX_IVF_NPROBE", "16"))
+    INDEX_HNSW_M = int(os.getenv("INDEX_HNSW_M", "32"))
+    INDEX_HNSW_EF_CONSTRUCTION = int(os.getenv("INDEX_HNSW_EF_CONSTRUCTION", "200"))
+    INDEX_HNSW_EF_SEARCH = int(os.getenv("INDEX_HNSW_EF_SEARCH", "128"))
+    INDEX_PQ_M = int(os.getenv("INDEX_PQ_M", "16"))
+    INDEX_PQ_NBITS = int(os.getenv("INDEX_PQ_NBITS", "8"))
+    # 검색에 쓰는 포폴 임베딩 저장 형식 (float32 | float16 | int8), preprocess 단계에서 원본 float32 와 함께 저장
+    EMBEDDING_STORAGE = os.getenv("EMBEDDING_STORAGE", "float32")
+    # ANN 인덱스 사용 시 텍스트 유사도로 먼저 가져와 재채점할 후보 수
+    ANN_CANDIDATES = int(os.getenv("ANN_CANDIDATES", "1000"))
+    # 쿼리(요약/태그) 벡터 LRU 캐시 크기, 동시 요청 인코딩 묶음의 최대 크기와 최대 대기(ms, 0 이면 묶지 않음)
+    QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "4096"))
+    ENCODE_MAX_BATCH = int(os.getenv("ENCODE_MAX_BATCH", "32"))
+    ENCODE_MAX_WAIT_MS = float(os.getenv("ENCODE_MAX_WAIT_MS", "5"))
+    # 포폴→태그 매핑 변경 확인 주기(초), 0 이하이면 주기적으로 확인하지 않음 (reload API 로만 갱신)
+    TAG_MAPPING_REFRESH_INTERVAL = float(os.getenv("TAG_MAPPING_REFRESH_INTERVAL", "60"))
+    # true 이면 포폴→태그 매핑을 ARTIFACTS_DIR/tag_mapping 에 mmap 파일로 공유 (한 worker 만 DB 를 읽어 게시하고 나머지는 읽기 전용으로 붙음)
+    TAG_MAPPING_SHARED = os.getenv("TAG_MAPPING_SHARED", "false").lower() == "true"
+
+    # preprocess 배치 크기와 전처리 프로세스 수 (0 이면 현재 프로세스에서 전처리)
+    PREPROCESS_BATCH_SIZE = int(os.getenv("PREPROCESS_BATCH_SIZE", "1024"))
+    PREPROCESS_WORKERS = int(os.getenv("PREPROCESS_WORKERS", "0"))
+
+    # LLM (Ollama)
+    OLLAMA_HOST = os.getenv("OLLAMA_HOST")  # 미설정 시 ollama 기본값 (http://127.0.0.1:11434)
+    LLM_MODEL = os.getenv("LLM_MODEL", "mistral")
+    # 동시 LLM 호출 수 (커넥션 풀 크기와 동일), 초과 요청은 대기
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+    # 호출당 타임아웃(초)과 연결 타임아웃(초)
+    LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+    LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+    # 연결 오류/타임아웃/429·5xx 재시도 횟수와 첫 재시도 대기(초, 이후 2배씩)
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+    LLM_RETRY_BACKOFF = float(os.getenv("LLM_RETRY_BACKOFF", "0.5"))
+    # 구조화 출력 모드: 요약을 Ollama format(JSON schema, tags 는 태그 어휘 enum)으로 생성하고 생성 토큰 수를 LLM_NUM_PREDICT 로 제한
+    LLM_STRUCTURED_OUTPUT = os.getenv("LLM_STRUCTURED_OUTPUT", "false").lower() == "true"
+    LLM_NUM_PREDICT = int(os.getenv("LLM_NUM_PREDICT", "256"))
+    # 마지막 호출 후 Ollama 가 모델(과 프롬프트 KV 캐시)을 메모리에 유지하는 시간 (예: 30m, 초 단위 숫자, -1 이면 계속), 미설정 시 Ollama 기본값
+    LLM_KEEP_ALIVE = os.getenv("LLM_KEEP_ALIVE") or None
+
+    # LLM 요약 캐시: 메모리 LRU 크기(0 이면 사용 안 함)와 TTL(초)
+    SUMMARY_CACHE_SIZE = int(os.getenv("SUMMARY_CACHE_SIZE", "1024"))
+    SUMMARY_CACHE_TTL = float(os.getenv("SUMMARY_CACHE_TTL", "3600"))
+    # 재시작 후에도 유지되는 SQLite 캐시 경로(미설정 시 사용 안 함)와 TTL(초)
+    SUMMARY_CACHE_DB_PATH = os.getenv("SUMMARY_CACHE_DB_PATH")
+    SUMMARY_CACHE_DISK_TTL = float(os.getenv("SUMMARY_CACHE_DISK_TTL", "604800"))
+
+    # speculative 랭크: LLM 요약과 동시에 원문 프롬프트로 후보를 미리 검색 (요청의 speculative 필드가 우선)
+    RANK_SPECULATIVE = os.getenv("RANK_SPECULATIVE", "false").lower() == "true"
+    # 후보 수 = max(SPECULATIVE_CANDIDATES, (offset + top_k) * SPECULATIVE_OVERSAMPLE)
+    SPECULATIVE_CANDIDATES = int(os.getenv("SPECULATIVE_CANDIDATES", "2000"))
+    SPECULATIVE_OVERSAMPLE = int(os.getenv("SPECULATIVE_OVERSAMPLE", "10"))
+    # 전체 검색을 백그라운드로 함께 수행해 후보 포함률(containment)을 집계할 요청 비율
+    SPECULATIVE_VERIFY_RATE = float(os.getenv("SPECULATIVE_VERIFY_RATE", "0.05"))
+
+    # 스트리밍 랭크(/rank/ptfo/stream)에서 results 이벤트 하나에 담는 포폴 수
+    RANK_STREAM_CHUNK_SIZE = int(os.getenv("RANK_STREAM_CHUNK_SIZE", "10"))
+
+    # 배치 검색(ptfo_search_batch)에서 한 번에 계산하는 (요청 수 × 포폴 수) 점수 행렬의 최대 크기
+    SEARCH_BATCH_MAX_CELLS = int(os.getenv("SEARCH_BATCH_MAX_CELLS", "2000000"))
+    # 배치 API/CLI 에서 한 번에 검색·출력하는 요청 수와 배치 하나의 동시 LLM 호출 수 (전체 상한은 LLM_MAX_CONCURRENCY)
+    BATCH_WINDOW = int(os.getenv("BATCH_WINDOW", "256"))
+    BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "4"))
+
+    # 태그 사전 필터: 요청 태그 중 하나와 유사도가 이 값 이상인 태그를 가진 포폴만 채점 (비어 있으면 사용 안 함, 요청별 지정 가능)
+    TAG_PREFILTER_THRESHOLD = float(os.getenv("TAG_PREFILTER_THRESHOLD")) if os.getenv("TAG_PREFILTER_THRESHOLD") else None
+    # 사전 필터를 통과한 포폴이 이 수 이하이면 ANN 없이 전부 정확히 채점, 초과하면 ANN 인덱스를 필터 안에서만 검색
+    PREFILTER_EXACT_MAX = int(os.getenv("PREFILTER_EXACT_MAX", "50000"))
+
+    # 최종 점수 = SEARCH_ALPHA * 텍스트 유사도 + SEARCH_BETA * 태그 유사도 (요청/테넌트별 지정 가능)
+    SEARCH_ALPHA = float(os.getenv("SEARCH_ALPHA", "0.5"))
+    SEARCH_BETA = float(os.getenv("SEARCH_BETA", "0.5"))
+    # 태그 점수 벌점: 사용자 태그별 최고 유사도가 임계값 미만이면 (임계값 - 유사도) * factor 만큼 차감
+    TAG_PENALTY_THRESHOLD = float(os.getenv("TAG_PENALTY_THRESHOLD", "0.5"))
+    TAG_PENALTY_FACTOR = float(os.getenv("TAG_PENALTY_FACTOR", "3.0"))
+    # 테넌트별 랭킹 파라미터 JSON 파일 ({"테넌트": {"alpha": 0.6, "penalty_factor": 2.0}, ...}), 변경 시 다시 읽음
+    RANKING_PROFILES_PATH = os.getenv("RANKING_PROFILES_PATH") or None
+
+    # 하이브리드 검색: 최종 점수 = SEARCH_ALPHA * 텍스트 + SEARCH_BETA * 태그 + LEXICAL_WEIGHT * BM25 (0 이면 사용 안 함)
+    LEXICAL_WEIGHT = float(os.getenv("LEXICAL_WEIGHT", "0"))
+    # ANN/사전 필터 후보에 BM25 상위 후보를 이만큼 더합니다
+    LEXICAL_CANDIDATES = int(os.getenv("LEXICAL_CANDIDATES", "200"))
+    # preprocess 의 BM25 역색인 파라미터 (문자 n-gram 길이 1~3, k1, b)
+    LEXICAL_NGRAM = int(os.getenv("LEXICAL_NGRAM", "2"))
+    LEXICAL_BM25_K1 = float(os.getenv("LEXICAL_BM25_K1", "1.2"))
+    LEXICAL_BM25_B = float(os.getenv("LEXICAL_BM25_B", "0.75"))
+
+    # 요청 프로파일링 (기본 사용 안 함): 요청 중 PROFILE_SAMPLE_RATE 비율을 프로파일링하고,
+    # PROFILE_SLOW_MS 이상 걸린 요청의 리포트만 PROFILE_DIR 에 저장 (pyinstrument 가 있으면 HTML, 없으면 cProfile)
+    PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+    PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "1000"))
+    PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
 
     @staticmethod
     def get_routes_by_prefix(prefix):
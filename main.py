@@ -1,4 +1,9 @@
-from fastapi import FastAPI
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 
 from router.generate_router import generate_router
@@ -6,14 +11,69 @@ from router.healthcheck_router import healthcheck_router
 from constants.env_variables import EnvVariables
 from dotenv import load_dotenv
 
+from router.admin_router import admin_router
+from router.metrics_router import metrics_router
 from router.rank_router import rank_router
+from router.search_router import search_router
 from router.test_router import test_api_router
+from service.generate_service import GenerateService
+from service.llm_client import LLMClient
+from service.search_engine import SearchEngine
+from service.tag_mapping_store import TagMappingStore
+from service.warmup import WarmUp
+from util.metrics import REQUEST_SECONDS, start_request_timings, reset_request_timings, server_timing_header
+from util.profiler import RequestProfiler
 
 # .env 로드
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+
+async def refresh_periodically(refresh, interval: float, name: str):
+    """
+    주기적으로 변경을 확인하여 상태를 교체합니다 (artifact, 포폴→태그 매핑).
+    실패하면 이전 상태를 유지하고 다음 주기에 다시 시도합니다.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(refresh)
+        except Exception:
+            logger.exception("%s refresh failed; keeping previous state", name)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 검색 엔진(모델, 인덱스, 포폴 메타데이터)과 포폴→태그 매핑을 프로세스 시작 시 한 번만 로드하고 첫 인코딩까지 실행.
+    # 기본은 백그라운드로 진행하여 /healthcheck 는 바로 응답하고, 완료 여부는 /healthcheck/ready 로 확인합니다.
+    engine = SearchEngine.get_instance()
+    tag_mapping_store = TagMappingStore.get_instance()
+    warmup = asyncio.create_task(asyncio.to_thread(WarmUp.get_instance().run))
+    if EnvVariables.WARMUP_BLOCKING:
+        await warmup
+
+    watchers = [warmup]
+    if EnvVariables.LLM_KEEP_ALIVE is not None:
+        # LLMClient 는 이벤트 루프에 묶이므로 warm-up 스레드가 아닌 여기서 모델 로드와 시스템 프롬프트 평가를 요청합니다.
+        watchers.append(asyncio.create_task(GenerateService.prime_prompt_cache()))
+    if EnvVariables.ARTIFACT_RELOAD_INTERVAL > 0:
+        watchers.append(asyncio.create_task(refresh_periodically(
+            engine.reload_if_changed, EnvVariables.ARTIFACT_RELOAD_INTERVAL, "artifact"
+        )))
+    if EnvVariables.TAG_MAPPING_REFRESH_INTERVAL > 0:
+        watchers.append(asyncio.create_task(refresh_periodically(
+            tag_mapping_store.refresh_if_changed, EnvVariables.TAG_MAPPING_REFRESH_INTERVAL, "tag mapping"
+        )))
+    yield
+    WarmUp.get_instance().stop()
+    for watcher in watchers:
+        watcher.cancel()
+    await LLMClient.get_instance().aclose()
+
+
 # FastAPI 앱 생성
-app = FastAPI(root_path="/api")
+app = FastAPI(root_path="/api", lifespan=lifespan)
 
 
 app.add_middleware(
@@ -24,11 +84,71 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def timing_middleware(request: Request, call_next):
+    """
+    요청 전체 및 단계별(timed) 소요시간을 기록하여 Server-Timing 헤더로 돌려주고,
+    REQUEST_SECONDS 히스토그램에 라우트 템플릿 단위로 누적합니다. PROFILE_SAMPLE_RATE 설정 시 느린 요청을 프로파일링합니다.
+    스트리밍 응답(content-length 없음)은 헤더 시점에 본문이 아직 만들어지는 중이므로, 마지막 청크를 보낸 뒤에 기록하고
+    Server-Timing 헤더는 붙이지 않습니다.
+    """
+    timings, token = start_request_timings()
+    profiler = RequestProfiler.get_instance()
+    session = profiler.start()
+    started = time.perf_counter()
+
+    def record(status: int) -> float:
+        elapsed = time.perf_counter() - started
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", None) or "unmatched"
+        REQUEST_SECONDS.observe(elapsed, method=request.method, route=route_path, status=status)
+        if session is not None:
+            profiler.finish(session, f"{request.method}_{route_path}", elapsed * 1000)
+        return elapsed
+
+    try:
+        response = await call_next(request)
+    except BaseException:
+        record(500)
+        raise
+    finally:
+        # 스트리밍 본문의 단계 기록은 라우트 쪽 context 가 같은 timings 리스트에 계속 추가합니다
+        reset_request_timings(token)
+
+    if "content-length" not in response.headers:
+        body_iterator = response.body_iterator
+
+        async def timed_body():
+            status = response.status_code
+            try:
+                async for chunk in body_iterator:
+                    yield chunk
+            except Exception:
+                status = 500
+                raise
+            finally:
+                record(status)
+
+        response.body_iterator = timed_body()
+        return response
+
+    elapsed = record(response.status_code)
+    response.headers["Server-Timing"] = server_timing_header(timings, elapsed * 1000)
+    return response
+
 app.include_router(healthcheck_router, prefix="/healthcheck")
 app.include_router(test_api_router, prefix="/test")
 app.include_router(generate_router, prefix="/generate")
 app.include_router(rank_router, prefix="/rank")
+app.include_router(search_router, prefix="/search")
+app.include_router(admin_router, prefix="/admin")
+app.include_router(metrics_router, prefix="/metrics")
 
 if __name__ == "__main__":
+    import os
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=int(EnvVariables.API_PORT))
\ No newline at end of file
+    # worker 가 여러 개면 uvicorn 이 프로세스마다 앱을 import 하도록 문자열로 넘깁니다.
+    # artifact 와 ANN 인덱스는 mmap 이라 worker 끼리 페이지를 공유하며, 태그 매핑은 TAG_MAPPING_SHARED 로 공유합니다.
+    workers = EnvVariables.API_WORKERS or os.cpu_count()
+    uvicorn.run("main:app" if workers > 1 else app, host="0.0.0.0", port=int(EnvVariables.API_PORT), workers=workers)
\ No newline at end of file
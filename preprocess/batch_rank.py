@@ -0,0 +1,117 @@
+import sys
+import json
+import time
+import asyncio
+import argparse
+from typing import Iterator, List, Optional, TextIO
+
+from constants.env_variables import EnvVariables
+from schema.rank_dto import RankDTO
+from schema.search_dto import SearchDTO
+from service.llm_client import LLMClient
+from service.rank_service import RankService
+from service.search_engine import SearchEngine
+from service.search_service import SearchService
+from service.tag_mapping_store import TagMappingStore
+
+
+def read_jsonl(path: str) -> Iterator[dict]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+async def rank_prompts(records: List[dict], args, out: TextIO):
+    """원문 프롬프트를 LLM 으로 요약한 뒤 BATCH_WINDOW 개씩 배치 검색합니다."""
+    requests = [
+        RankDTO.GetRankPtfoReqDTO(
+            user_prompt=record[args.prompt_field],
+            top_k=args.top_k,
+            offset=args.offset,
+            min_score=args.min_score,
+            filter_tags=args.filter_tags,
+            min_tag_similarity=args.min_tag_similarity,
+        )
+        for record in records
+    ]
+    try:
+        async for item in RankService.rank_ptfo_batch(requests, args.llm_concurrency):
+            write_line(out, records[item["index"]].get(args.id_field), item)
+    finally:
+        await LLMClient.get_instance().aclose()
+
+
+def rank_summaries(records: List[dict], args, out: TextIO):
+    """이미 요약/태그가 있는 레코드를 LLM 없이 BATCH_WINDOW 개씩 배치 검색합니다."""
+    requests = [
+        SearchDTO.PtfoSearchReqDTO(
+            summary=record["summary"],
+            tags=record.get("tags", []),
+            top_k=args.top_k,
+            offset=args.offset,
+            min_score=args.min_score,
+            filter_tags=args.filter_tags,
+            min_tag_similarity=args.min_tag_similarity,
+        )
+        for record in records
+    ]
+    window = EnvVariables.BATCH_WINDOW
+    for start in range(0, len(requests), window):
+        results = SearchService.ptfo_search_batch(requests[start:start + window])
+        for i, search_results in enumerate(results):
+            write_line(out, records[start + i].get(args.id_field), {
+                "index": start + i,
+                "search_results": [result.model_dump() for result in search_results],
+            })
+
+
+def write_line(out: TextIO, record_id: Optional[str], item: dict):
+    out.write(json.dumps({"id": record_id, **item}, ensure_ascii=False) + "\n")
+    out.flush()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="저장된 광고 요청(JSONL)을 일괄 재랭킹하여 결과를 JSONL 로 출력")
+    parser.add_argument("input", help="한 줄에 요청 하나인 JSONL 파일")
+    parser.add_argument("--prompt-field", default="user_prompt", help="원문 광고 요청이 담긴 필드")
+    parser.add_argument("--id-field", default="request_id", help="결과에 함께 출력할 식별자 필드")
+    parser.add_argument("--summaries", action="store_true",
+                        help="입력 레코드에 summary/tags 가 이미 있으면 LLM 요약을 건너뛰고 검색만 수행")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--offset", type=int, default=0)
+    parser.add_argument("--min-score", type=float)
+    parser.add_argument("--filter-tags", nargs="+", help="이 태그 중 하나 이상을 가진 포폴만 검색")
+    parser.add_argument("--min-tag-similarity", type=float,
+                        help="요청 태그와 유사도가 이 값 이상인 태그를 가진 포폴만 채점 (기본 TAG_PREFILTER_THRESHOLD)")
+    parser.add_argument("--llm-concurrency", type=int, help="동시 LLM 요약 수 (기본 BATCH_LLM_CONCURRENCY)")
+    parser.add_argument("--window", type=int, help="한 번에 검색·출력할 요청 수 (기본 BATCH_WINDOW)")
+    parser.add_argument("--output", help="결과 JSONL 경로 (미지정 시 표준 출력)")
+    args = parser.parse_args()
+
+    if args.window:
+        EnvVariables.BATCH_WINDOW = args.window
+    records = list(read_jsonl(args.input))
+
+    # 모델, 인덱스, 태그 매핑은 실행 시작 시 한 번만 로드
+    started = time.perf_counter()
+    engine = SearchEngine.get_instance()
+    engine.model
+    engine.load()
+    TagMappingStore.get_instance().load()
+    loaded = time.perf_counter()
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        if args.summaries:
+            rank_summaries(records, args, out)
+        else:
+            asyncio.run(rank_prompts(records, args, out))
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(
+        f"{len(records)} 건 처리 완료: 로드 {loaded - started:.1f}s, 랭킹 {time.perf_counter() - loaded:.1f}s",
+        file=sys.stderr,
+    )
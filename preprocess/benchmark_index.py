@@ -0,0 +1,118 @@
+import json
+import time
+import argparse
+from dataclasses import replace
+from typing import List
+
+import numpy as np
+
+from constants.env_variables import EnvVariables
+from util.artifact_store import PORTFOLIO_ARTIFACT, read_artifact
+from util.index_factory import INDEX_FLAT, INDEX_TYPES, IndexParams, build_index
+from util.quantization import STORAGE_FLOAT32, STORAGE_TYPES, EmbeddingMatrix, accuracy_report
+
+
+def exact_top_k(embeddings: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """flat 내적 기준 정답 상위 k 행 번호 (Q, k)."""
+    sims = queries @ embeddings.T
+    top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(top, np.argsort(-np.take_along_axis(sims, top, axis=1), axis=1), axis=1)
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(np.intersect1d(f[f >= 0], t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def benchmark(embeddings: np.ndarray, queries: np.ndarray, params_list: List[IndexParams], k: int) -> List[dict]:
+    """
+    같은 데이터로 각 인덱스 구성을 학습한 뒤, flat 정답 대비 recall@k 와 검색 지연시간을 측정합니다.
+    지연시간은 서빙과 같이 쿼리 한 건씩 검색하여 측정합니다.
+    """
+    truth = exact_top_k(embeddings, queries, k)
+    reports = []
+    for params in params_list:
+        started = time.perf_counter()
+        index = build_index(embeddings, params)
+        build_sec = time.perf_counter() - started
+
+        latencies = []
+        found = np.empty((len(queries), k), dtype=np.int64)
+        for i, query in enumerate(queries):
+            started = time.perf_counter()
+            _, I = index.search(query[None, :], k)
+            latencies.append((time.perf_counter() - started) * 1000)
+            found[i] = I[0]
+
+        reports.append({
+            **params.to_dict(),
+            "k": k,
+            f"recall@{k}": round(recall_at_k(found, truth), 4),
+            "latency_ms_p50": round(float(np.percentile(latencies, 50)), 4),
+            "latency_ms_p95": round(float(np.percentile(latencies, 95)), 4),
+            "build_sec": round(build_sec, 3),
+        })
+    return reports
+
+
+def load_embeddings(args) -> np.ndarray:
+    if args.synthetic:
+        rng = np.random.default_rng(args.seed)
+        embeddings = rng.standard_normal((args.synthetic, args.dim)).astype(np.float32)
+        return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return np.asarray(read_artifact(EnvVariables.ARTIFACTS_DIR, PORTFOLIO_ARTIFACT).embeddings)
+
+
+def sample_queries(embeddings: np.ndarray, n_queries: int, noise: float, seed: int) -> np.ndarray:
+    """포폴 벡터에 잡음을 섞어 실제 요약 임베딩과 비슷한 쿼리를 만듭니다."""
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(embeddings), size=min(n_queries, len(embeddings)), replace=False)
+    queries = embeddings[rows] + noise * rng.standard_normal((len(rows), embeddings.shape[1])).astype(np.float32)
+    return (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ANN 인덱스 구성별 recall@k / 지연시간 비교 (flat 정답 기준)")
+    parser.add_argument("--index-types", nargs="+", default=list(INDEX_TYPES), choices=INDEX_TYPES)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.3, help="쿼리 생성 시 섞을 가우시안 잡음 크기")
+    parser.add_argument("--nprobe", type=int, nargs="+", help="IVF 계열에 대해 nprobe 값을 바꿔가며 측정")
+    parser.add_argument("--ef-search", type=int, nargs="+", help="HNSW 에 대해 efSearch 값을 바꿔가며 측정")
+    parser.add_argument("--storages", nargs="+", default=[], choices=[s for s in STORAGE_TYPES if s != STORAGE_FLOAT32],
+                        help="검색 임베딩 양자화 형식별 float32 대비 recall@k / 내적 오차 / 크기도 측정")
+    parser.add_argument("--synthetic", type=int, help="artifact 대신 N 개의 무작위 벡터 사용")
+    parser.add_argument("--dim", type=int, default=384, help="--synthetic 벡터 차원")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="결과를 저장할 JSON 파일 경로")
+    args = parser.parse_args()
+
+    embeddings = load_embeddings(args)
+    queries = sample_queries(embeddings, args.queries, args.noise, args.seed)
+
+    base_params = IndexParams.from_env()
+    params_list = []
+    for index_type in args.index_types:
+        params = replace(base_params, index_type=index_type)
+        if index_type in ("ivf_flat", "ivf_pq") and args.nprobe:
+            params_list += [replace(params, nprobe=nprobe) for nprobe in args.nprobe]
+        elif index_type == "hnsw" and args.ef_search:
+            params_list += [replace(params, ef_search=ef) for ef in args.ef_search]
+        else:
+            params_list.append(params)
+    if INDEX_FLAT not in args.index_types:
+        params_list.insert(0, replace(base_params, index_type=INDEX_FLAT))
+
+    reports = benchmark(embeddings, queries, params_list, args.k)
+    for report in reports:
+        print(json.dumps(report, ensure_ascii=False))
+    storage_reports = [
+        accuracy_report(embeddings, EmbeddingMatrix.quantize(embeddings, storage), queries, args.k)
+        for storage in [STORAGE_FLOAT32] + args.storages
+    ] if args.storages else []
+    for report in storage_reports:
+        print(json.dumps(report, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"rows": len(embeddings), "dim": int(embeddings.shape[1]), "results": reports,
+                       "storages": storage_reports}, f, indent=2)
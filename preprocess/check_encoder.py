@@ -0,0 +1,109 @@
+import sys
+import json
+import time
+import argparse
+from typing import List
+
+import numpy as np
+
+from constants.env_variables import EnvVariables
+from service.encoder_backend import ENCODER_BACKENDS, ENCODER_TORCH, ENCODER_TORCH_INT8, load_encoder
+from util.artifact_store import PORTFOLIO_ARTIFACT, TAG_ARTIFACT, read_artifact
+
+# artifact 가 없을 때 사용하는 광고 요청 예시
+SAMPLE_TEXTS = [
+    "브랜드 홍보 영상 촬영",
+    "드론으로 촬영한 리조트 광고",
+    "유튜브 쇼츠용 신제품 언박싱 영상",
+    "3D 모션그래픽을 활용한 앱 서비스 소개",
+    "감성적인 웨딩 스냅 영상 제작",
+    "기업 채용 브랜딩 인터뷰 영상",
+    "TV CF 스타일의 자동차 광고",
+    "뷰티 제품 리뷰 숏폼 콘텐츠",
+]
+
+
+def load_texts(limit: int) -> List[str]:
+    """태그 어휘와 포폴명/설명 일부를 비교 문장으로 사용합니다 (artifact 가 없으면 SAMPLE_TEXTS)."""
+    texts = list(SAMPLE_TEXTS)
+    for name, columns in ((TAG_ARTIFACT, ("TAG_NM",)), (PORTFOLIO_ARTIFACT, ("PTFO_NM", "PTFO_DESC"))):
+        try:
+            artifact = read_artifact(EnvVariables.ARTIFACTS_DIR, name)
+        except FileNotFoundError:
+            continue
+        for column in columns:
+            values = artifact.columns[column]
+            texts += [values[i] for i in range(min(limit, len(values)))]
+    return list(dict.fromkeys(text for text in texts if text))
+
+
+def encode(model, texts: List[str]) -> np.ndarray:
+    embeddings = np.asarray(model.encode(texts, convert_to_numpy=True), dtype=np.float32)
+    return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+
+def query_latency_ms(model, texts: List[str]) -> float:
+    """서빙처럼 한 문장씩 인코딩한 지연시간 중앙값."""
+    latencies = []
+    for text in texts:
+        started = time.perf_counter()
+        model.encode([text], convert_to_numpy=True)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return round(float(np.median(latencies)), 3)
+
+
+def compare(reference, candidate, texts: List[str], k: int) -> dict:
+    """
+    기본 torch 인코더 대비 후보 인코더의 임베딩 일치도.
+    - cosine_min / mean: 같은 문장의 두 임베딩 간 코사인 유사도
+    - neighbor_recall@k: 문장마다 나머지 문장 중 최근접 k 개가 두 인코더에서 겹치는 비율 (검색 순위 보존 정도)
+    """
+    ref, cand = encode(reference, texts), encode(candidate, texts)
+    cosine = np.sum(ref * cand, axis=1)
+    k = min(k, len(texts) - 1)
+    recall = None
+    if k > 0:
+        ref_sims, cand_sims = ref @ ref.T, cand @ cand.T
+        np.fill_diagonal(ref_sims, -np.inf)
+        np.fill_diagonal(cand_sims, -np.inf)
+        ref_top = np.argpartition(-ref_sims, k - 1, axis=1)[:, :k]
+        cand_top = np.argpartition(-cand_sims, k - 1, axis=1)[:, :k]
+        recall = np.mean([len(np.intersect1d(a, b)) / k for a, b in zip(ref_top, cand_top)])
+    return {
+        "texts": len(texts),
+        "cosine_min": round(float(cosine.min()), 6),
+        "cosine_mean": round(float(cosine.mean()), 6),
+        f"neighbor_recall@{k}": None if recall is None else round(float(recall), 4),
+        "reference_query_ms_p50": query_latency_ms(reference, texts[:100]),
+        "candidate_query_ms_p50": query_latency_ms(candidate, texts[:100]),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CPU 최적화 인코더(ONNX / 동적 int8)와 기본 torch 인코더의 임베딩 일치도 확인")
+    parser.add_argument("--backend", choices=[b for b in ENCODER_BACKENDS if b != ENCODER_TORCH],
+                        default=EnvVariables.ENCODER_BACKEND if EnvVariables.ENCODER_BACKEND != ENCODER_TORCH
+                        else ENCODER_TORCH_INT8)
+    parser.add_argument("--model-dir", default=EnvVariables.ENCODER_MODEL_DIR, help="후보 인코더를 읽을 로컬 모델 디렉토리")
+    parser.add_argument("--limit", type=int, default=500, help="artifact 컬럼별로 사용할 최대 문장 수")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--min-cosine", type=float, default=0.99, help="cosine_min 이 이 값 미만이면 종료 코드 1")
+    args = parser.parse_args()
+
+    model_name = EnvVariables.EMBEDDING_MODEL_NAME
+    started = time.perf_counter()
+    reference = load_encoder(model_name, ENCODER_TORCH, args.model_dir)
+    reference_load = time.perf_counter() - started
+    started = time.perf_counter()
+    # 대체된 torch 인코더끼리 비교해 통과하지 않도록, 요청한 백엔드를 못 쓰면 바로 실패합니다
+    candidate = load_encoder(model_name, args.backend, args.model_dir, fallback=False)
+    candidate_load = time.perf_counter() - started
+
+    report = {
+        "backend": args.backend,
+        "reference_load_sec": round(reference_load, 3),
+        "candidate_load_sec": round(candidate_load, 3),
+        **compare(reference, candidate, load_texts(args.limit), args.k),
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    sys.exit(0 if report["cosine_min"] >= args.min_cosine else 1)
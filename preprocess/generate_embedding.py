@@ -1,13 +1,28 @@
-import re
-import os
+import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, Optional
+
 import faiss
-import pickle
+import numpy as np
 from sentence_transformers import SentenceTransformer
 
+from constants.env_variables import EnvVariables
+
 from model.tag_info import TagInfo
 from model.ptfo_info import PtfoInfo
 
 from util.database import *
+from util.artifact_store import (
+    Artifact, ArtifactWriter, PORTFOLIO_ARTIFACT, TAG_ARTIFACT, TAG_NAME_EMBEDDINGS_FILE, TAG_SIMILARITY_FILE,
+    write_artifact, read_artifact,
+)
+from util.index_factory import INDEX_FILE, INDEX_FLAT, IndexParams, build_index, write_index
+from preprocess.benchmark_index import sample_queries
+from util.lexical_index import LexicalIndexBuilder
+from util.quantization import STORAGE_FLOAT32, EmbeddingMatrix, accuracy_report
+from util.text_tool import preprocess_text
 
 
 def get_db():
@@ -18,80 +33,346 @@ def get_db():
         db.close()
 
 
-# 전처리 함수: 소문자 변환, 특수문자 제거, 다중 공백 정리
-def preprocess_text(text: str) -> str:
-    text = text.lower()
-    text = re.sub(r"[^가-힣a-zA-Z0-9\s]", " ", text)
-    text = re.sub(r"\s+", " ", text)
-    return text.strip()
+def normalize(embeddings: np.ndarray) -> np.ndarray:
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
 
 
-def build_faiss_indices():
-    # 임베딩 모델 초기화 (예: all-MiniLM-L6-v2)
-    embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+def content_hash(text: str) -> int:
+    """전처리된 텍스트의 64비트 해시. 포폴 내용 변경 감지에 사용합니다."""
+    return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little", signed=True)
 
-    # DB에서 데이터 로드
-    db = next(get_db())
 
-    # 1. tb_tag_info: 태그명 전처리 (TAG_NM만 사용)
-    tags = db.query(TagInfo).all()
-    tag_texts = [preprocess_text(tag.TAG_NM) for tag in tags if tag.TAG_NM]
+def preprocess_portfolio(name: str, desc: str):
+    """포폴명과 포폴설명을 결합 후 전처리하고 내용 해시를 함께 반환합니다 (프로세스 풀에서 실행)."""
+    text = preprocess_text(f"{name} {desc}")
+    return text, content_hash(text)
+
+
+def load_previous_portfolio_artifact(model_name: str) -> Optional[Artifact]:
+    """증분 빌드에 재사용할 이전 generation. 모델이 다르거나 내용 해시가 없으면 재사용하지 않습니다."""
+    try:
+        previous = read_artifact(EnvVariables.ARTIFACTS_DIR, PORTFOLIO_ARTIFACT)
+    except FileNotFoundError:
+        return None
+    if previous.manifest["model_name"] != model_name or "CONTENT_HASH" not in previous.columns:
+        return None
+    return previous
+
+
+class IncrementalPlan:
+    """
+    (PTFO_SEQNO, 내용 해시)가 이전 generation 과 같은 행은 이전 벡터를 재사용하도록 배치마다 계획합니다.
+    이전 generation 에 있었지만 끝까지 나타나지 않은 포폴은 삭제된 것으로 집계합니다.
+    """
+
+    def __init__(self, previous: Optional[Artifact]):
+        self.previous = previous
+        self.reused = 0
+        self.encoded = 0
+        self._row_by_seqno = {}
+        self._prev_hashes = np.empty(0, dtype=np.int64)
+        if previous is not None:
+            self._row_by_seqno = {
+                seqno: row for row, seqno in enumerate(np.asarray(previous.columns["PTFO_SEQNO"]).tolist())
+            }
+            self._prev_hashes = np.asarray(previous.columns["CONTENT_HASH"])
+        self._seen = np.zeros(len(self._prev_hashes), dtype=bool)
+
+    def reuse_rows(self, seqnos: np.ndarray, hashes: np.ndarray) -> np.ndarray:
+        """배치의 각 행이 재사용할 이전 행 번호. 재인코딩이 필요하면 -1."""
+        reuse_from = np.full(len(seqnos), -1, dtype=np.int64)
+        for i, seqno in enumerate(seqnos.tolist()):
+            prev_row = self._row_by_seqno.get(seqno)
+            if prev_row is None:
+                continue
+            self._seen[prev_row] = True
+            if self._prev_hashes[prev_row] == hashes[i]:
+                reuse_from[i] = prev_row
+        reused = int((reuse_from >= 0).sum())
+        self.reused += reused
+        self.encoded += len(seqnos) - reused
+        return reuse_from
 
-    # 2. tb_ptfo_info: 포폴명과 포폴설명을 결합 후 전처리
+    def report(self) -> dict:
+        return {
+            "mode": "incremental" if self.previous is not None else "full",
+            "total": self.reused + self.encoded,
+            "reused": self.reused,
+            "encoded": self.encoded,
+            "removed": int((~self._seen).sum()),
+        }
 
-    portfolios = db.query(PtfoInfo).all()
-    portfolio_texts = [
-        preprocess_text(f"{ptfo.PTFO_NM} {ptfo.PTFO_DESC}")
-        for ptfo in portfolios if ptfo.PTFO_NM and ptfo.PTFO_DESC
-    ]
 
-    # 3. 임베딩 생성
+class StageTimer:
+    """파이프라인 단계별 처리 행 수와 소요 시간을 누적하여 처리량(rows/s)을 계산합니다."""
+
+    def __init__(self):
+        self._rows = {}
+        self._seconds = {}
+        self._stage = None
+        self._started = 0.0
+
+    def start(self, stage: str):
+        self._stage = stage
+        self._started = time.perf_counter()
+
+    def stop(self, rows: int):
+        self._rows[self._stage] = self._rows.get(self._stage, 0) + rows
+        self._seconds[self._stage] = self._seconds.get(self._stage, 0.0) + time.perf_counter() - self._started
+
+    def report(self) -> dict:
+        return {
+            stage: {
+                "rows": rows,
+                "seconds": round(self._seconds[stage], 3),
+                "rows_per_sec": round(rows / self._seconds[stage], 1) if self._seconds[stage] > 0 else None,
+            }
+            for stage, rows in self._rows.items()
+        }
+
+
+def iter_portfolio_batches(db, batch_size: int) -> Iterator[list]:
+    """
+    tb_ptfo_info 를 PTFO_SEQNO 기준 keyset pagination 으로 batch_size 행씩 읽습니다.
+    ORM 객체 대신 필요한 컬럼만 조회하고 OFFSET 을 쓰지 않으므로, 뒤쪽 페이지도 PK 탐색 한 번으로 읽습니다.
+    """
+    last_seqno = None
+    while True:
+        query = db.query(PtfoInfo.PTFO_SEQNO, PtfoInfo.PTFO_NM, PtfoInfo.PTFO_DESC)
+        if last_seqno is not None:
+            query = query.filter(PtfoInfo.PTFO_SEQNO > last_seqno)
+        rows = query.order_by(PtfoInfo.PTFO_SEQNO).limit(batch_size).all()
+        if not rows:
+            return
+        yield rows
+        last_seqno = rows[-1].PTFO_SEQNO
+
+
+def build_portfolio_artifact(db, embedding_model: SentenceTransformer, model_name: str,
+                             incremental: bool, batch_size: int, workers: int):
+    """
+    포폴을 배치 단위로 읽기 → 전처리 → 인코딩(또는 이전 벡터 재사용) → artifact 파일에 이어 쓰기 합니다.
+    메모리 사용량은 카탈로그 크기가 아닌 배치 크기에 비례하며, ANN 인덱스는 기록된 mmap 행렬로 학습합니다.
+    전처리된 텍스트로 문자 n-gram BM25 역색인(bm25_*.npy)도 함께 만듭니다 (포스팅 수에 비례하는 메모리 사용).
+
+    :return: (포폴 인덱스, 포폴 artifact generation, 빌드 리포트)
+    """
+    previous = load_previous_portfolio_artifact(model_name) if incremental else None
+    plan = IncrementalPlan(previous)
+    timer = StageTimer()
+    writer = ArtifactWriter(
+        EnvVariables.ARTIFACTS_DIR, PORTFOLIO_ARTIFACT,
+        dim=embedding_model.get_sentence_embedding_dimension(),
+        column_kinds={"PTFO_SEQNO": "int", "PTFO_NM": "str", "PTFO_DESC": "str", "CONTENT_HASH": "int"},
+        model_name=model_name,
+        keep_generations=EnvVariables.ARTIFACT_KEEP_GENERATIONS,
+    )
+    # 전처리는 순수 파이썬(정규식)이라 GIL 에 묶이므로 프로세스 풀로 나눕니다.
+    # 인코딩은 torch 가 자체적으로 멀티스레드를 사용하므로 현재 프로세스에서 수행합니다.
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 0 else None
+    # 하이브리드 검색용 문자 n-gram BM25 역색인 (전처리된 텍스트를 행 순서대로 누적)
+    lexical = LexicalIndexBuilder(
+        ngram=EnvVariables.LEXICAL_NGRAM, k1=EnvVariables.LEXICAL_BM25_K1, b=EnvVariables.LEXICAL_BM25_B,
+    )
+    try:
+        batches = iter_portfolio_batches(db, batch_size)
+        while True:
+            timer.start("fetch")
+            rows = next(batches, None)
+            if rows is None:
+                break
+            portfolios = [row for row in rows if row.PTFO_NM and row.PTFO_DESC]
+            timer.stop(len(rows))
+
+            timer.start("preprocess")
+            names = [row.PTFO_NM for row in portfolios]
+            descs = [row.PTFO_DESC for row in portfolios]
+            if pool is None:
+                processed = list(map(preprocess_portfolio, names, descs))
+            else:
+                processed = list(pool.map(preprocess_portfolio, names, descs,
+                                          chunksize=max(1, len(names) // (workers * 4))))
+            texts = [text for text, _ in processed]
+            hashes = np.array([h for _, h in processed], dtype=np.int64)
+            seqnos = np.array([row.PTFO_SEQNO for row in portfolios], dtype=np.int64)
+            timer.stop(len(texts))
+
+            # 증분 모드이면 바뀐 행만 인코딩하고 나머지는 이전 generation 의 (정규화된) 벡터를 복사
+            timer.start("encode")
+            reuse_from = plan.reuse_rows(seqnos, hashes)
+            embeddings = np.empty((len(texts), writer.dim), dtype=np.float32)
+            reused_rows = np.flatnonzero(reuse_from >= 0)
+            if len(reused_rows):
+                embeddings[reused_rows] = previous.embeddings[reuse_from[reused_rows]]
+            encode_rows = np.flatnonzero(reuse_from < 0)
+            if len(encode_rows):
+                embeddings[encode_rows] = normalize(embedding_model.encode(
+                    [texts[i] for i in encode_rows], batch_size=min(len(encode_rows), 256), convert_to_numpy=True
+                ))
+            timer.stop(len(encode_rows))
+
+            timer.start("write")
+            writer.append(embeddings, {
+                "PTFO_SEQNO": seqnos,
+                "PTFO_NM": names,
+                "PTFO_DESC": descs,
+                "CONTENT_HASH": hashes,
+            })
+            timer.stop(len(texts))
+
+            timer.start("lexical")
+            lexical.add(texts)
+            timer.stop(len(texts))
+
+        # 포폴 인덱스 (INDEX_TYPE 에 따라 flat / IVF-Flat / HNSW / IVF-PQ 를 정규화된 벡터로 학습)
+        timer.start("index")
+        portfolio_embeddings = writer.finish()
+        index_params = IndexParams.from_env()
+        portfolio_index = build_index(portfolio_embeddings, index_params)
+        timer.stop(writer.rows)
+
+        timer.start("lexical")
+        lexical_index = lexical.build()
+        timer.stop(0)
+
+        # 검색용 양자화 행렬 (EMBEDDING_STORAGE). 원본 float32 는 증분 빌드와 ANN 학습을 위해 그대로 둡니다.
+        timer.start("quantize")
+        storage = EmbeddingMatrix.quantize(portfolio_embeddings, EnvVariables.EMBEDDING_STORAGE)
+        timer.stop(writer.rows)
+        storage_meta = storage.manifest()
+        if storage.storage != STORAGE_FLOAT32:
+            storage_meta["accuracy"] = accuracy_report(
+                portfolio_embeddings, storage, sample_queries(portfolio_embeddings, 100, 0.3, 0)
+            )
+
+        # flat 은 서버가 mmap 된 행렬로 직접 계산하므로 인덱스 파일을 따로 저장하지 않습니다.
+        index_files = {} if index_params.index_type == INDEX_FLAT else {
+            INDEX_FILE: lambda path: write_index(portfolio_index, path)
+        }
+        build_report = {**plan.report(), "batch_size": batch_size, "workers": workers, "stages": timer.report()}
+        generation = writer.commit(
+            extra_files={**index_files, **lexical_index.files(), **storage.files()},
+            manifest_extra={
+                "index": {**index_params.to_dict(), "file": INDEX_FILE if index_files else None},
+                "lexical": lexical_index.manifest(),
+                "storage": storage_meta,
+                "build": build_report,
+            },
+        )
+    except BaseException:
+        writer.abort()
+        raise
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return portfolio_index, generation, build_report
+
+
+def build_tag_artifact(db, embedding_model: SentenceTransformer, model_name: str):
+    """
+    tb_tag_info 의 태그 artifact 를 만듭니다. 태그 어휘는 작으므로 한 번에 처리합니다.
+    - embeddings: 전처리한 태그명(TAG_NM)의 임베딩
+    - similarity.npy: 원문 TAG_NM 임베딩 간 코사인 유사도 표 (V, V).
+      LLM 태그와 포폴 태그는 이 목록의 문자열 그대로이므로, 서버는 태그를 임베딩하지 않고 표를 조회합니다.
+    - name_embeddings.npy: 표를 만든 원문 TAG_NM 임베딩. 어휘에 없는 태그와의 유사도 계산에 사용합니다.
+
+    :return: (태그 인덱스, 태그 artifact generation)
+    """
+    tags = [tag for tag in db.query(TagInfo).all() if tag.TAG_NM]
+    tag_texts = [preprocess_text(tag.TAG_NM) for tag in tags]
     tag_embeddings = embedding_model.encode(tag_texts, convert_to_numpy=True)
-    portfolio_embeddings = embedding_model.encode(portfolio_texts, convert_to_numpy=True)
 
-    # 4. FAISS 인덱스 구축
     # 태그 인덱스 (벡터 차원에 맞게 IndexFlatL2 사용)
     d_tag = tag_embeddings.shape[1]
     tag_index = faiss.IndexFlatL2(d_tag)
     tag_index.add(tag_embeddings)
 
-    # 포폴 인덱스
-    d_port = portfolio_embeddings.shape[1]
-    portfolio_index = faiss.IndexFlatL2(d_port)
-    portfolio_index.add(portfolio_embeddings)
+    name_embeddings = normalize(embedding_model.encode([tag.TAG_NM for tag in tags], convert_to_numpy=True))
+    similarity = name_embeddings @ name_embeddings.T
 
-    # 5. DB 레코드의 추가 정보를 포함한 매핑 artifact 생성
-    tag_artifact = {
-        "embeddings": tag_embeddings,
-        "data": [
-            {"TAG_SEQNO": tag.TAG_SEQNO, "TAG_NM": tag.TAG_NM}
-            for tag in tags if tag.TAG_NM
-        ]
-    }
-    portfolio_artifact = {
-        "embeddings": portfolio_embeddings,
-        "data": [
-            {"PTFO_SEQNO": ptfo.PTFO_SEQNO, "PTFO_NM": ptfo.PTFO_NM, "PTFO_DESC": ptfo.PTFO_DESC}
-            for ptfo in portfolios if ptfo.PTFO_NM and ptfo.PTFO_DESC
-        ]
-    }
+    tag_generation = write_artifact(
+        EnvVariables.ARTIFACTS_DIR, TAG_ARTIFACT,
+        embeddings=normalize(tag_embeddings),
+        columns={
+            "TAG_SEQNO": np.array([tag.TAG_SEQNO for tag in tags], dtype=np.int64),
+            "TAG_NM": [tag.TAG_NM for tag in tags],
+        },
+        model_name=model_name,
+        keep_generations=EnvVariables.ARTIFACT_KEEP_GENERATIONS,
+        extra_files={
+            TAG_SIMILARITY_FILE: lambda path: np.save(path, similarity),
+            TAG_NAME_EMBEDDINGS_FILE: lambda path: np.save(path, name_embeddings),
+        },
+        manifest_extra={
+            "similarity": {"file": TAG_SIMILARITY_FILE, "embeddings_file": TAG_NAME_EMBEDDINGS_FILE,
+                           "vocabulary": len(tags)},
+        },
+    )
+    return tag_index, tag_generation
 
-    # 6. artifacts 폴더에 pickle 파일로 저장
-    artifacts_dir = "./artifacts"
-    os.makedirs(artifacts_dir, exist_ok=True)
-    with open(os.path.join(artifacts_dir, "tag_embeddings.pkl"), "wb") as f:
-        pickle.dump(tag_artifact, f)
-    with open(os.path.join(artifacts_dir, "portfolio_embeddings.pkl"), "wb") as f:
-        pickle.dump(portfolio_artifact, f)
 
-    return tag_index, portfolio_index, tag_artifact, portfolio_artifact
+def build_faiss_indices(incremental: bool = False, batch_size: Optional[int] = None, workers: Optional[int] = None):
+    """
+    DB 의 태그/포폴을 임베딩하여 새 artifact generation 을 만듭니다.
 
+    :param incremental: True 이면 이전 generation 에서 (PTFO_SEQNO, 전처리 텍스트 해시)가 같은 포폴의 벡터를 재사용하고
+                        새로 추가되거나 내용이 바뀐 포폴만 인코딩합니다. 삭제된 포폴은 새 generation 에서 빠집니다.
+    :param batch_size: 포폴 읽기/전처리/인코딩/기록 배치 크기 (기본값 PREPROCESS_BATCH_SIZE)
+    :param workers: 전처리 프로세스 수, 0 이면 현재 프로세스에서 수행 (기본값 PREPROCESS_WORKERS)
+    :return: (태그 인덱스, 포폴 인덱스, 태그 artifact, 포폴 artifact, 포폴 빌드 리포트)
+    """
+    batch_size = batch_size or EnvVariables.PREPROCESS_BATCH_SIZE
+    workers = EnvVariables.PREPROCESS_WORKERS if workers is None else workers
 
+    # 임베딩 모델 초기화 (예: all-MiniLM-L6-v2)
+    model_name = EnvVariables.EMBEDDING_MODEL_NAME
+    embedding_model = SentenceTransformer(model_name)
+    artifacts_dir = EnvVariables.ARTIFACTS_DIR
+
+    db = next(get_db())
+    try:
+        # 1. tb_tag_info: 태그 임베딩 + 태그 어휘 유사도 표
+        tag_index, tag_generation = build_tag_artifact(db, embedding_model, model_name)
+
+        # 2. tb_ptfo_info: 배치 스트리밍으로 컬럼형 artifact 저장 (정규화된 float32 행렬 + ID/메타데이터 컬럼 + manifest)
+        #    서버는 이 파일들을 mmap 으로 열어 복사 없이 사용합니다.
+        portfolio_index, portfolio_generation, build_report = build_portfolio_artifact(
+            db, embedding_model, model_name, incremental, batch_size, workers
+        )
+    finally:
+        db.close()
+
+    tag_artifact = read_artifact(artifacts_dir, TAG_ARTIFACT, tag_generation)
+    portfolio_artifact = read_artifact(artifacts_dir, PORTFOLIO_ARTIFACT, portfolio_generation)
 
+    return tag_index, portfolio_index, tag_artifact, portfolio_artifact, build_report
 
 
 if __name__ == "__main__":
-    tag_index, portfolio_index, tag_texts, portfolio_texts = build_faiss_indices()
+    parser = argparse.ArgumentParser(description="DB 데이터를 임베딩하여 artifact generation 생성")
+    parser.add_argument("--incremental", action="store_true",
+                        help="이전 generation 에서 바뀌지 않은 포폴의 벡터를 재사용하고 변경분만 인코딩")
+    parser.add_argument("--batch-size", type=int, default=EnvVariables.PREPROCESS_BATCH_SIZE,
+                        help="포폴 읽기/전처리/인코딩/기록 배치 크기")
+    parser.add_argument("--workers", type=int, default=EnvVariables.PREPROCESS_WORKERS,
+                        help="전처리 프로세스 수 (0 이면 현재 프로세스에서 수행)")
+    args = parser.parse_args()
+
+    tag_index, portfolio_index, tag_artifact, portfolio_artifact, build_report = build_faiss_indices(
+        incremental=args.incremental, batch_size=args.batch_size, workers=args.workers
+    )
     print("태그 FAISS 인덱스 벡터 개수:", tag_index.ntotal)
     print("포폴 FAISS 인덱스 벡터 개수:", portfolio_index.ntotal)
-
+    print("태그 artifact generation:", tag_artifact.generation)
+    print(f"태그 어휘 유사도 표: {tag_artifact.rows} x {tag_artifact.rows}")
+    print("포폴 artifact generation:", portfolio_artifact.generation)
+    print(f"포폴 빌드({build_report['mode']}): 재사용 {build_report['reused']}건, "
+          f"재인코딩 {build_report['encoded']}건, 삭제 {build_report['removed']}건")
+    for stage, stats in build_report["stages"].items():
+        print(f"  {stage}: {stats['rows']}행, {stats['seconds']}초, {stats['rows_per_sec']} rows/s")
+    accuracy = portfolio_artifact.manifest["storage"].get("accuracy")
+    if accuracy:
+        print(f"검색 임베딩 {accuracy['storage']}: {accuracy['compression']}배 압축, float32 대비 "
+              f"recall@10 {accuracy['recall@10']}, 내적 오차 최대 {accuracy['score_abs_error_max']} "
+              f"/ 평균 {accuracy['score_abs_error_mean']}")
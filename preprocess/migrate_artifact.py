@@ -0,0 +1,42 @@
+import os
+
+from constants.env_variables import EnvVariables
+from util.artifact_store import (
+    PORTFOLIO_ARTIFACT,
+    TAG_ARTIFACT,
+    LEGACY_PORTFOLIO_PICKLE,
+    LEGACY_TAG_PICKLE,
+    load_legacy_pickle,
+    write_artifact,
+)
+
+
+def migrate_legacy_artifacts(artifacts_dir: str, model_name: str) -> dict:
+    """
+    이전 형식의 pickle artifact(portfolio_embeddings.pkl, tag_embeddings.pkl)를
+    mmap 가능한 컬럼형 artifact 로 변환합니다. 원본 pickle 파일은 그대로 둡니다.
+
+    :return: artifact 이름 -> 새 generation 이름
+    """
+    migrated = {}
+    for name, file_name in ((PORTFOLIO_ARTIFACT, LEGACY_PORTFOLIO_PICKLE), (TAG_ARTIFACT, LEGACY_TAG_PICKLE)):
+        path = os.path.join(artifacts_dir, file_name)
+        if not os.path.exists(path):
+            continue
+        legacy = load_legacy_pickle(path, model_name)
+        migrated[name] = write_artifact(
+            artifacts_dir, name,
+            embeddings=legacy.embeddings,
+            columns=legacy.columns,
+            model_name=model_name,
+            keep_generations=EnvVariables.ARTIFACT_KEEP_GENERATIONS,
+        )
+    return migrated
+
+
+if __name__ == "__main__":
+    result = migrate_legacy_artifacts(EnvVariables.ARTIFACTS_DIR, EnvVariables.EMBEDDING_MODEL_NAME)
+    if not result:
+        print("변환할 pickle artifact 가 없습니다.")
+    for artifact_name, generation in result.items():
+        print(f"{artifact_name} artifact 변환 완료: generation={generation}")
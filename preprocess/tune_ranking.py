@@ -0,0 +1,251 @@
+import sys
+import json
+import time
+import argparse
+from dataclasses import replace
+from typing import Dict, List
+
+import numpy as np
+
+from constants.env_variables import EnvVariables
+from preprocess.batch_rank import read_jsonl
+from schema.search_dto import SearchDTO
+from service.ranking_params import RankingParams, RankingProfiles
+from service.search_engine import SearchEngine
+from service.search_service import SearchService
+from service.tag_mapping_store import TagMappingStore
+from service.tag_scorer import TagScorer
+
+
+class ComponentCache:
+    """
+    라벨링된 쿼리 집합의 점수 구성 요소를 한 번만 계산해 (쿼리 수 Q, 후보 수 C) 배열로 보관합니다.
+    가중치·벌점과 무관한 값만 저장하므로, 설정마다 모델 인코딩이나 검색을 다시 하지 않고 NumPy 연산으로 재채점합니다.
+    - text: 텍스트 유사도 (Q, C)
+    - best: 사용자 태그별 포폴 태그 최고 유사도 (Q, T, C). 태그가 없는 포폴/패딩은 +inf 라 벌점(임계값 - 유사도)이 0 입니다.
+    - tag_mean: 벌점 전 태그 점수 (Q, C). 태그 점수 = tag_mean - factor * mean(max(threshold - best, 0)) 입니다.
+    - lexical: LEXICAL_WEIGHT * BM25 점수 (Q, C), 하이브리드 검색을 쓰지 않으면 0
+    - gains: 후보의 관련도 (Q, C), valid: 패딩이 아닌 후보 (Q, C)
+    - ideal_dcg: 관련도 목록(후보 밖 포폴 포함)으로 계산한 이상적 DCG@k (Q,)
+    """
+
+    def __init__(self, records: List[dict], relevant_field: str, pool: int, k: int):
+        per_query = [self._components(record, record[relevant_field], pool, k) for record in records]
+        n_queries = len(per_query)
+        n_candidates = max([1] + [len(c["text"]) for c in per_query])
+        n_tags = max([1] + [len(c["best"]) for c in per_query])
+        self.text = np.zeros((n_queries, n_candidates), dtype=np.float64)
+        self.best = np.full((n_queries, n_tags, n_candidates), np.inf, dtype=np.float32)
+        self.tag_mean = np.zeros((n_queries, n_candidates), dtype=np.float64)
+        self.lexical = np.zeros((n_queries, n_candidates), dtype=np.float64)
+        self.gains = np.zeros((n_queries, n_candidates), dtype=np.float64)
+        self.valid = np.zeros((n_queries, n_candidates), dtype=bool)
+        self.tag_counts = np.ones(n_queries, dtype=np.float64)
+        self.ideal_dcg = np.zeros(n_queries, dtype=np.float64)
+        self.relevant_counts = np.zeros(n_queries, dtype=np.float64)
+        for q, c in enumerate(per_query):
+            n = len(c["text"])
+            self.text[q, :n] = c["text"]
+            self.best[q, :len(c["best"]), :n] = c["best"]
+            self.tag_mean[q, :n] = c["tag_mean"]
+            self.lexical[q, :n] = c["lexical"]
+            self.gains[q, :n] = c["gains"]
+            self.valid[q, :n] = True
+            self.tag_counts[q] = max(len(c["best"]), 1)
+            self.ideal_dcg[q] = c["ideal_dcg"]
+            self.relevant_counts[q] = c["relevant_count"]
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    @staticmethod
+    def _components(record: dict, relevant, pool: int, k: int) -> Dict[str, np.ndarray]:
+        """쿼리 하나를 ptfo_search 와 같은 방식으로 채점 대상과 구성 요소까지 계산하고, 후보를 pool 개 안팎으로 줄입니다."""
+        request = SearchDTO.PtfoSearchReqDTO(
+            summary=record["summary"],
+            tags=record.get("tags", []),
+            filter_tags=record.get("filter_tags"),
+            min_tag_similarity=record.get("min_tag_similarity"),
+        )
+        components = SearchService.score_components(request)
+        best, has_tags = TagScorer.best_similarities(components.query_vocab_sims, components.tag_csr())
+        n = len(components.text_similarities)
+        full_best = np.full((0 if best is None else len(best), n), np.inf, dtype=np.float32)
+        if best is not None:
+            full_best[:, has_tags] = best
+        tag_mean = np.zeros(n, dtype=np.float64)
+        if best is not None:
+            tag_mean[has_tags] = best.mean(axis=0)
+        lexical = np.zeros(n, dtype=np.float64) if components.lexical_scores is None \
+            else EnvVariables.LEXICAL_WEIGHT * components.lexical_scores
+
+        # 관련도: PTFO_SEQNO 목록(관련도 1) 또는 {PTFO_SEQNO: 관련도}
+        grades = {int(seqno): float(grade) for seqno, grade in relevant.items()} if isinstance(relevant, dict) \
+            else {int(seqno): 1.0 for seqno in relevant}
+        seqnos = components.seqnos
+        gains = np.array([grades.get(int(seqno), 0.0) for seqno in seqnos], dtype=np.float64)
+
+        # 전체 채점(flat)이면 텍스트/태그/어휘 점수 중 하나라도 상위 pool 안에 드는 포폴만 남깁니다.
+        if n > pool:
+            keep = np.zeros(n, dtype=bool)
+            for values in (components.text_similarities, tag_mean, lexical):
+                if values.any():
+                    keep[np.argpartition(-values, pool - 1)[:pool]] = True
+            full_best, tag_mean, lexical, gains = full_best[:, keep], tag_mean[keep], lexical[keep], gains[keep]
+            text = components.text_similarities[keep]
+        else:
+            text = components.text_similarities
+
+        ideal = np.sort(np.array(list(grades.values()), dtype=np.float64))[::-1][:k]
+        return {
+            "text": text,
+            "best": full_best,
+            "tag_mean": tag_mean,
+            "lexical": lexical,
+            "gains": gains,
+            "ideal_dcg": float(ideal @ (1.0 / np.log2(np.arange(len(ideal)) + 2))),
+            "relevant_count": float(sum(grade > 0 for grade in grades.values())),
+        }
+
+
+def sweep(cache: ComponentCache, configs: np.ndarray, k: int, max_cells: int) -> np.ndarray:
+    """
+    설정별 (alpha, beta, penalty_threshold, penalty_factor) 평균 NDCG@k, recall@k 를 계산합니다, shape (K, 2).
+    임계값이 같은 설정끼리 벌점 평균을 한 번만 계산하고, (설정 수 × Q × C) 가 max_cells 이하가 되도록 나눠 채점합니다.
+    관련 포폴이 없는 쿼리는 평균에서 제외합니다.
+    """
+    n_queries, n_candidates = cache.text.shape
+    k = min(k, n_candidates)
+    discounts = 1.0 / np.log2(np.arange(k) + 2)
+    labelled = cache.relevant_counts > 0
+    all_valid = bool(cache.valid.all())
+    metrics = np.zeros((len(configs), 2), dtype=np.float64)
+    chunk = max(1, max_cells // max(n_queries * n_candidates, 1))
+    for threshold in np.unique(configs[:, 2]):
+        # (Q, C) 사용자 태그별 벌점 폭의 평균. +inf(태그 없음/패딩)는 0 입니다.
+        shortfall = np.maximum(np.float32(threshold) - cache.best, 0).sum(axis=1) / cache.tag_counts[:, None]
+        group = np.flatnonzero(configs[:, 2] == threshold)
+        for start in range(0, len(group), chunk):
+            ids = group[start:start + chunk]
+            alpha, beta, factor = (configs[ids, col][:, None, None] for col in (0, 1, 3))
+            # alpha * text + beta * (tag_mean - factor * shortfall) + lexical 을 임시 배열을 줄여 제자리 연산으로
+            scores = alpha * cache.text
+            scores += beta * cache.tag_mean
+            scores -= (beta * factor) * shortfall
+            scores += cache.lexical
+            if not all_valid:
+                scores[:, ~cache.valid] = -np.inf
+            top = _top_k(scores, k)
+            gains = np.take_along_axis(np.broadcast_to(cache.gains, scores.shape), top, axis=-1)
+            dcg = gains @ discounts
+            ndcg = np.divide(dcg, cache.ideal_dcg, out=np.zeros_like(dcg), where=cache.ideal_dcg > 0)
+            recall = np.count_nonzero(gains > 0, axis=-1) / np.maximum(cache.relevant_counts, 1)
+            metrics[ids, 0] = ndcg[:, labelled].mean(axis=1) if labelled.any() else 0.0
+            metrics[ids, 1] = recall[:, labelled].mean(axis=1) if labelled.any() else 0.0
+    return metrics
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    마지막 축의 점수 상위 k 개 위치를 점수 내림차순으로, shape (..., k).
+    select_top_k 와 같이 동점은 위치(행 번호)가 작은 쪽이 앞서므로 서빙 순위와 같습니다.
+    """
+    n = scores.shape[-1]
+    kth = np.partition(scores, n - k, axis=-1)[..., n - k:n - k + 1]
+    greater = scores > kth
+    # 경계값과 동점인 위치는 앞에서부터 남은 자리만큼 채웁니다.
+    tied = scores == kth
+    need = k - greater.sum(axis=-1, keepdims=True)
+    selected = greater | (tied & (np.cumsum(tied, axis=-1) <= need))
+    top = np.nonzero(selected)[-1].reshape(scores.shape[:-1] + (k,))
+    order = np.argsort(-np.take_along_axis(scores, top, axis=-1), axis=-1, kind="stable")
+    return np.take_along_axis(top, order, axis=-1)
+
+
+def parse_grid(spec: str) -> np.ndarray:
+    """"start:stop:step" (stop 포함) 또는 "0.1,0.2" 형식."""
+    if ":" in spec:
+        start, stop, step = (float(v) for v in spec.split(":"))
+        return np.round(np.arange(start, stop + step / 2, step), 6)
+    return np.array([float(v) for v in spec.split(",")], dtype=np.float64)
+
+
+def config_grid(args) -> np.ndarray:
+    """(alpha, beta, penalty_threshold, penalty_factor) 조합, shape (K, 4). beta 격자가 없으면 beta = 1 - alpha 입니다."""
+    alphas = parse_grid(args.alpha)
+    thresholds, factors = parse_grid(args.penalty_threshold), parse_grid(args.penalty_factor)
+    if args.beta:
+        grids = np.meshgrid(alphas, parse_grid(args.beta), thresholds, factors, indexing="ij")
+    else:
+        a, t, f = np.meshgrid(alphas, thresholds, factors, indexing="ij")
+        grids = [a, np.round(1 - a, 6), t, f]
+    return np.stack([grid.ravel() for grid in grids], axis=1)
+
+
+def describe(config: np.ndarray, metric: np.ndarray, k: int) -> dict:
+    return {
+        "alpha": float(config[0]),
+        "beta": float(config[1]),
+        "penalty_threshold": float(config[2]),
+        "penalty_factor": float(config[3]),
+        f"ndcg@{k}": round(float(metric[0]), 4),
+        f"recall@{k}": round(float(metric[1]), 4),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="라벨링된 쿼리 집합(JSONL)으로 랭킹 파라미터(alpha, beta, penalty_threshold, penalty_factor) 조합을 "
+                    "한 번에 평가하여 NDCG/recall 순으로 출력"
+    )
+    parser.add_argument("input", help='한 줄에 {"summary", "tags", "relevant": [PTFO_SEQNO...] 또는 {PTFO_SEQNO: 관련도}}')
+    parser.add_argument("--relevant-field", default="relevant")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--alpha", default="0:1:0.05", help='격자 "start:stop:step" 또는 "0.3,0.5"')
+    parser.add_argument("--beta", help="격자 (미지정 시 beta = 1 - alpha)")
+    parser.add_argument("--penalty-threshold", default="0.3:0.7:0.05")
+    parser.add_argument("--penalty-factor", default="0:5:0.5")
+    parser.add_argument("--tenant", help="비교 기준을 이 테넌트의 현재 프로필로 (미지정 시 환경 변수 기본값)")
+    parser.add_argument("--pool", type=int, default=2000,
+                        help="전체 채점(flat) 시 쿼리당 남길 후보 수 (텍스트/태그/어휘 점수 각각의 상위 pool 개 합집합)")
+    parser.add_argument("--max-cells", type=int, default=5_000_000, help="한 번에 계산할 (설정 수 × 쿼리 수 × 후보 수) 상한")
+    parser.add_argument("--top", type=int, default=10, help="출력할 상위 설정 수")
+    args = parser.parse_args()
+
+    records = [record for record in read_jsonl(args.input) if record.get(args.relevant_field)]
+    if not records:
+        sys.exit(f"{args.input} 에 {args.relevant_field} 가 있는 레코드가 없습니다")
+
+    # 모델, 인덱스, 태그 매핑은 실행 시작 시 한 번만 로드
+    engine = SearchEngine.get_instance()
+    engine.model
+    engine.load()
+    TagMappingStore.get_instance().load()
+
+    started = time.perf_counter()
+    cache = ComponentCache(records, args.relevant_field, args.pool, args.k)
+    cache_sec = time.perf_counter() - started
+
+    current = RankingParams.defaults()
+    if args.tenant:
+        current = replace(current, **RankingProfiles.get_instance().get(args.tenant))
+    configs = config_grid(args)
+    started = time.perf_counter()
+    metrics = sweep(cache, configs, args.k, args.max_cells)
+    sweep_sec = time.perf_counter() - started
+    current_config = np.array([[current.alpha, current.beta, current.penalty_threshold, current.penalty_factor]])
+    current_metric = sweep(cache, current_config, args.k, args.max_cells)[0]
+
+    ranked = np.lexsort((-metrics[:, 1], -metrics[:, 0]))[:args.top]
+    report = {
+        "queries": len(cache),
+        "candidates_per_query": cache.text.shape[1],
+        "configs": len(configs),
+        "cache_sec": round(cache_sec, 3),
+        "cache_ms_per_query": round(cache_sec / len(cache) * 1000, 3),
+        "sweep_sec": round(sweep_sec, 3),
+        "sweep_us_per_config": round(sweep_sec / len(configs) * 1e6, 3),
+        "current": describe(current_config[0], current_metric, args.k),
+        "best": [describe(configs[i], metrics[i], args.k) for i in ranked],
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
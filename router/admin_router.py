@@ -0,0 +1,25 @@
+import asyncio
+
+from fastapi import APIRouter, HTTPException
+
+from service.tag_mapping_store import TagMappingStore
+
+admin_router = APIRouter()
+
+@admin_router.post("/tag-mapping/reload")
+async def reload_tag_mapping(force: bool = False):
+    """
+    포폴→태그 매핑 변경을 즉시 확인하여 갱신합니다. force=true 이면 변경 여부와 관계없이 다시 읽습니다.
+    """
+    store = TagMappingStore.get_instance()
+    try:
+        reloaded = await asyncio.to_thread(store.refresh_if_changed, force)
+        snapshot = store.snapshot
+        return {
+            "reloaded": reloaded,
+            "rows": snapshot.rows,
+            "portfolios": len(snapshot.ptfo_seqnos),
+            "tags": len(snapshot.tag_names),
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -2,12 +2,19 @@ from fastapi import APIRouter, HTTPException
 
 from schema.generate_dto import GenerateDTO
 from service.generate_service import GenerateService
+from service.summary_cache import SummaryCache
 
 generate_router = APIRouter()
 
 @generate_router.post("/summary")
 async def generate_summary(request: GenerateDTO.SummaryReqDTO):
     try:
-        return GenerateService.generate_summary(request)
+        return await GenerateService.generate_summary(request)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@generate_router.get("/summary/cache")
+async def summary_cache_stats():
+    """요약 캐시 크기와 메모리/디스크 계층별 hit/miss 카운터"""
+    return SummaryCache.get_instance().stats()
\ No newline at end of file
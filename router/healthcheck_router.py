@@ -1,7 +1,17 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from service.warmup import WarmUp
 
 healthcheck_router = APIRouter()
 
 @healthcheck_router.get("")
 async def healthcheck():
     return {"status": "API is running"}
+
+
+@healthcheck_router.get("/ready")
+async def readiness():
+    """검색 상태(artifact, 태그 매핑)가 로드되고 인코더가 한 번 인코딩했으면 200, 아니면 503 (실패한 단계는 warm-up 이 재시도)."""
+    status = WarmUp.get_instance().status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
@@ -0,0 +1,123 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from service.llm_client import LLMClient
+from service.search_engine import SearchEngine
+from service.speculative_search import SpeculativeSearch
+from service.summary_cache import SummaryCache
+from service.tag_mapping_store import TagMappingStore
+from util.metrics import REQUEST_SECONDS, STAGE_SECONDS, render_samples
+
+metrics_router = APIRouter()
+
+
+def _cache_samples(cache: str, stats: dict):
+    """TTLCache/디스크 캐시 stats 를 (레이블, 값) 샘플로 변환합니다."""
+    labels = {"cache": cache}
+    return {
+        "hits": (labels, stats["hits"]),
+        "misses": (labels, stats["misses"]),
+        "hit_ratio": (labels, stats["hit_rate"]),
+        "size": (labels, stats.get("size")),
+    }
+
+
+@metrics_router.get("", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Prometheus text format 지표를 반환합니다.
+    단계별/HTTP 요청 지연시간 히스토그램, 요약·쿼리 벡터 캐시 적중률, 인덱스 및 태그 매핑 크기, LLM 호출 수,
+    speculative 검색 후보 포함률을 포함합니다.
+    아직 로드되지 않은 항목은 생략하며, 이 요청이 모델이나 artifact 로드를 유발하지 않습니다.
+    """
+    engine_stats = SearchEngine.get_instance().stats()
+    summary_stats = SummaryCache.get_instance().stats()
+    tag_mapping_stats = TagMappingStore.get_instance().stats()
+    llm_stats = LLMClient.get_instance().stats()
+    speculative_stats = SpeculativeSearch.get_instance().stats()
+
+    caches = [_cache_samples("summary_memory", summary_stats["memory"])]
+    if summary_stats["disk"] is not None:
+        caches.append(_cache_samples("summary_disk", summary_stats["disk"]))
+    if engine_stats["query_encoder"] is not None:
+        caches.append(_cache_samples("query_vector", engine_stats["query_encoder"]["cache"]))
+
+    lines = STAGE_SECONDS.render() + REQUEST_SECONDS.render()
+    lines += render_samples("ragvertise_cache_hits_total", "Cache hits", "counter",
+                            [cache["hits"] for cache in caches])
+    lines += render_samples("ragvertise_cache_misses_total", "Cache misses", "counter",
+                            [cache["misses"] for cache in caches])
+    lines += render_samples("ragvertise_cache_hit_ratio", "Cache hit ratio since process start", "gauge",
+                            [cache["hit_ratio"] for cache in caches])
+    lines += render_samples("ragvertise_cache_entries", "Entries currently held in the cache", "gauge",
+                            [cache["size"] for cache in caches])
+    lines += render_samples("ragvertise_summary_inflight", "LLM summary requests in flight (deduplicated)", "gauge",
+                            [({}, summary_stats["inflight"])])
+
+    query_encoder = engine_stats["query_encoder"] or {}
+    lines += render_samples("ragvertise_query_encode_calls_total", "Embedding model encode calls for queries",
+                            "counter", [({}, query_encoder.get("encode_calls"))])
+    lines += render_samples("ragvertise_query_encoded_texts_total", "Query strings encoded by the embedding model",
+                            "counter", [({}, query_encoder.get("encoded_texts"))])
+
+    lines += render_samples("ragvertise_index_portfolios", "Portfolios in the loaded artifact", "gauge",
+                            [({"generation": engine_stats["generation"] or ""}, engine_stats["portfolios"])])
+    lines += render_samples("ragvertise_index_embedding_bytes", "Size of the normalized embedding matrix", "gauge",
+                            [({}, engine_stats["embedding_bytes"])])
+    lines += render_samples("ragvertise_index_ann_vectors", "Vectors in the ANN index", "gauge",
+                            [({}, engine_stats["ann_vectors"])])
+    lines += render_samples("ragvertise_tag_vocabulary", "Distinct tags embedded by the tag scorer", "gauge",
+                            [({}, engine_stats["tag_vocabulary"])])
+    tag_scorer = engine_stats["tag_scorer"] or {}
+    lines += render_samples("ragvertise_tag_vocabulary_precomputed",
+                            "Tags loaded with the precomputed similarity table", "gauge",
+                            [({}, tag_scorer.get("precomputed"))])
+    lines += render_samples("ragvertise_query_tags_total", "Query tags by similarity source", "counter",
+                            [({"source": "table"}, tag_scorer.get("vocab_hits")),
+                             ({"source": "encoded"}, tag_scorer.get("oov_hits"))])
+    lines += render_samples("ragvertise_tag_mapping_rows", "Portfolio-tag rows in memory", "gauge",
+                            [({}, tag_mapping_stats["rows"])])
+    lines += render_samples("ragvertise_tag_mapping_portfolios", "Portfolios with tags in memory", "gauge",
+                            [({}, tag_mapping_stats["portfolios"])])
+    lines += render_samples("ragvertise_tag_mapping_loader",
+                            "1 if this worker loads and publishes the shared tag mapping", "gauge",
+                            [({"generation": tag_mapping_stats["generation"] or ""},
+                              None if tag_mapping_stats["loader"] is None else int(tag_mapping_stats["loader"]))])
+
+    llm_labels = {"model": llm_stats["model"]}
+    lines += render_samples("ragvertise_llm_calls_total", "Successful LLM calls", "counter",
+                            [(llm_labels, llm_stats["calls"])])
+    lines += render_samples("ragvertise_llm_retries_total", "LLM call retries", "counter",
+                            [(llm_labels, llm_stats["retries"])])
+    lines += render_samples("ragvertise_llm_failures_total", "LLM calls failed after retries", "counter",
+                            [(llm_labels, llm_stats["failures"])])
+    lines += render_samples("ragvertise_llm_prompt_tokens_total",
+                            "Prompt tokens evaluated by the LLM (tokens reused from the prompt cache are not counted)",
+                            "counter", [(llm_labels, llm_stats["prompt_tokens"])])
+    lines += render_samples("ragvertise_llm_generated_tokens_total", "Tokens generated by the LLM", "counter",
+                            [(llm_labels, llm_stats["generated_tokens"])])
+    lines += render_samples("ragvertise_llm_eval_seconds_total", "Time the LLM spent generating tokens", "counter",
+                            [(llm_labels, llm_stats["eval_seconds"])])
+    lines += render_samples("ragvertise_llm_tokens_per_second", "Generated tokens per second since process start",
+                            "gauge", [(llm_labels, llm_stats["tokens_per_second"])])
+    lines += render_samples("ragvertise_llm_truncated_total", "LLM responses cut off by num_predict", "counter",
+                            [(llm_labels, llm_stats["truncated"])])
+    lines += render_samples("ragvertise_llm_summary_repairs_total",
+                            "Structured summaries re-requested with the repair schema", "counter",
+                            [(llm_labels, llm_stats["repairs"])])
+    lines += render_samples("ragvertise_llm_summary_fallbacks_total",
+                            "Structured summaries that fell back to the user prompt", "counter",
+                            [(llm_labels, llm_stats["fallbacks"])])
+
+    lines += render_samples("ragvertise_speculative_requests_total", "Speculative rank searches by outcome", "counter",
+                            [({"outcome": "rescored"}, speculative_stats["rescored"]),
+                             ({"outcome": "fallback"}, speculative_stats["fallbacks"])])
+    lines += render_samples("ragvertise_speculative_verified_total",
+                            "Speculative searches checked against a full search", "counter",
+                            [({}, speculative_stats["verified"])])
+    lines += render_samples("ragvertise_speculative_containment_ratio",
+                            "Share of verified searches whose final top-k was inside the speculative candidates",
+                            "gauge", [({}, speculative_stats["containment_rate"])])
+    lines += render_samples("ragvertise_speculative_recall", "Mean share of the final top-k inside the candidates",
+                            "gauge", [({}, speculative_stats["mean_recall"])])
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
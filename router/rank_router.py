@@ -1,13 +1,68 @@
+import json
+import logging
+from typing import Literal
+
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 
 from schema.rank_dto import RankDTO
 from service.rank_service import RankService
 
+logger = logging.getLogger(__name__)
+
 rank_router = APIRouter()
 
+STREAM_MEDIA_TYPES = {"sse": "text/event-stream", "ndjson": "application/x-ndjson"}
+
+
+def _format_event(fmt: str, event: str, data) -> str:
+    payload = json.dumps(data, ensure_ascii=False)
+    if fmt == "sse":
+        return f"event: {event}\ndata: {payload}\n\n"
+    return f'{{"event": "{event}", "data": {payload}}}\n'
+
+
 @rank_router.post("/ptfo")
-def get_rank_ptfo(request: RankDTO.GetRankPtfoReqDTO):
+async def get_rank_ptfo(request: RankDTO.GetRankPtfoReqDTO):
     try:
-        return RankService.get_rank_ptfo(request)
+        return await RankService.get_rank_ptfo(request)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@rank_router.post("/ptfo/stream")
+async def stream_rank_ptfo(request: RankDTO.GetRankPtfoReqDTO, format: Literal["sse", "ndjson"] = "sse"):
+    """
+    /ptfo 의 스트리밍 버전. LLM 토큰(token), 요약(summary), 순위 결과 묶음(results), 종료(done) 이벤트를
+    준비되는 대로 SSE(text/event-stream) 또는 NDJSON 으로 보냅니다. 도중에 실패하면 error 이벤트로 끝납니다.
+    """
+    async def events():
+        try:
+            async for event, data in RankService.stream_rank_ptfo(request):
+                yield _format_event(format, event, data)
+        except Exception as e:
+            logger.exception("rank stream failed")
+            yield _format_event(format, "error", {"detail": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type=STREAM_MEDIA_TYPES[format],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@rank_router.post("/ptfo/batch")
+async def rank_ptfo_batch(request: RankDTO.GetRankPtfoBatchReqDTO):
+    """
+    여러 랭크 요청을 한 번에 처리하여 입력 순서대로 한 줄씩 NDJSON 으로 보냅니다.
+    각 줄은 {"index", "generated", "search_results"} 이며, 요약에 실패한 요청은 {"index", "error"} 입니다.
+    """
+    async def lines():
+        try:
+            async for item in RankService.rank_ptfo_batch(request.requests, request.llm_concurrency):
+                yield json.dumps(item, ensure_ascii=False) + "\n"
+        except Exception as e:
+            logger.exception("rank batch failed")
+            yield json.dumps({"error": str(e)}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type=STREAM_MEDIA_TYPES["ndjson"])
\ No newline at end of file
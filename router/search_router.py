@@ -0,0 +1,39 @@
+import json
+import asyncio
+import logging
+
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+
+from constants.env_variables import EnvVariables
+from schema.search_dto import SearchDTO
+from service.search_service import SearchService
+
+logger = logging.getLogger(__name__)
+
+search_router = APIRouter()
+
+
+@search_router.post("/ptfo/batch")
+async def ptfo_search_batch(request: SearchDTO.PtfoSearchBatchReqDTO):
+    """
+    요약/태그가 이미 있는 여러 검색 요청을 LLM 없이 한 번에 처리하여, 입력 순서대로 {"index", "search_results"} 를
+    한 줄씩 NDJSON 으로 보냅니다. BATCH_WINDOW 개씩 SearchService.ptfo_search_batch 로 검색합니다.
+    """
+    async def lines():
+        try:
+            window = EnvVariables.BATCH_WINDOW
+            for start in range(0, len(request.requests), window):
+                results = await asyncio.to_thread(
+                    SearchService.ptfo_search_batch, request.requests[start:start + window]
+                )
+                for i, search_results in enumerate(results):
+                    yield json.dumps({
+                        "index": start + i,
+                        "search_results": [result.model_dump() for result in search_results],
+                    }, ensure_ascii=False) + "\n"
+        except Exception as e:
+            logger.exception("search batch failed")
+            yield json.dumps({"error": str(e)}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
@@ -1,8 +1,10 @@
-import ollama
+import asyncio
+
 from fastapi import APIRouter, HTTPException, Depends
 
 from schema.search_dto import SearchDTO
 from schema.test_dto import GenerateTestReqDTO
+from service.llm_client import LLMClient
 from service.search_service import SearchService
 from util.database import get_db
 from sqlalchemy.orm import Session
@@ -34,7 +36,7 @@ async def generate_text(request: GenerateTestReqDTO):
             {"role": "system", "content": request.system_prompt},
             {"role": "user", "content": request.user_prompt}
         ]
-        response = ollama.chat(model="mistral", messages=messages)
+        response = await LLMClient.get_instance().chat(messages)
         return {"response": response["message"]["content"]}
 
     except Exception as e:
@@ -43,6 +45,6 @@ async def generate_text(request: GenerateTestReqDTO):
 @test_api_router.post("/search_ptfo")
 async def search_ptfo(request: SearchDTO.PtfoSearchReqDTO):
     try:
-        return SearchService.ptfo_search(request)
+        return await asyncio.to_thread(SearchService.ptfo_search, request)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
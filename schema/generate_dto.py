@@ -1,4 +1,4 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 from pydantic import BaseModel
 
@@ -13,8 +13,32 @@ class GenerateDTO:
         summary: str
         tags: List[str]
 
-        def to_ptfo_search_req_dto(self) -> SearchDTO.PtfoSearchReqDTO:
+        def to_ptfo_search_req_dto(
+            self,
+            top_k: Optional[int] = None,
+            offset: int = 0,
+            min_score: Optional[float] = None,
+            filter_tags: Optional[List[str]] = None,
+            min_tag_similarity: Optional[float] = None,
+            tenant: Optional[str] = None,
+            alpha: Optional[float] = None,
+            beta: Optional[float] = None,
+            penalty_threshold: Optional[float] = None,
+            penalty_factor: Optional[float] = None,
+            explain: bool = False,
+        ) -> SearchDTO.PtfoSearchReqDTO:
             return SearchDTO.PtfoSearchReqDTO(
                 summary=self.summary,
                 tags=self.tags,
+                top_k=top_k,
+                offset=offset,
+                min_score=min_score,
+                filter_tags=filter_tags,
+                min_tag_similarity=min_tag_similarity,
+                tenant=tenant,
+                alpha=alpha,
+                beta=beta,
+                penalty_threshold=penalty_threshold,
+                penalty_factor=penalty_factor,
+                explain=explain,
             )
@@ -1,6 +1,6 @@
-from typing import List
+from typing import List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from schema.generate_dto import GenerateDTO
 from schema.search_dto import SearchDTO
@@ -9,12 +9,60 @@ from schema.search_dto import SearchDTO
 class RankDTO:
     class GetRankPtfoReqDTO(BaseModel):
         user_prompt: str
+        top_k: Optional[int] = Field(default=None, ge=1, description="반환할 최대 포폴 수 (미지정 시 전체)")
+        offset: int = Field(default=0, ge=0, description="건너뛸 상위 포폴 수 (페이지네이션)")
+        min_score: Optional[float] = Field(default=None, description="final_score 가 이 값 미만인 포폴 제외")
+        filter_tags: Optional[List[str]] = Field(
+            default=None, description="이 태그 중 하나 이상을 가진 포폴만 검색 (카테고리 필터)"
+        )
+        min_tag_similarity: Optional[float] = Field(
+            default=None, ge=-1.0, le=1.0,
+            description="LLM 태그 중 하나와 유사도가 이 값 이상인 태그를 가진 포폴만 채점 (미지정 시 TAG_PREFILTER_THRESHOLD)",
+        )
+        speculative: Optional[bool] = Field(
+            default=None,
+            description="LLM 요약과 동시에 원문 프롬프트로 후보를 미리 검색 (미지정 시 RANK_SPECULATIVE, top_k 필요)",
+        )
+        tenant: Optional[str] = Field(
+            default=None, description="RANKING_PROFILES_PATH 에 등록된 테넌트의 랭킹 파라미터 사용 (미등록이면 기본값)"
+        )
+        alpha: Optional[float] = Field(default=None, ge=0.0, description="텍스트 유사도 가중치 (미지정 시 테넌트/SEARCH_ALPHA)")
+        beta: Optional[float] = Field(default=None, ge=0.0, description="태그 유사도 가중치 (미지정 시 테넌트/SEARCH_BETA)")
+        penalty_threshold: Optional[float] = Field(
+            default=None, ge=-1.0, le=1.0, description="태그 벌점 임계값 (미지정 시 테넌트/TAG_PENALTY_THRESHOLD)"
+        )
+        penalty_factor: Optional[float] = Field(
+            default=None, ge=0.0, description="태그 벌점 배수 (미지정 시 테넌트/TAG_PENALTY_FACTOR)"
+        )
+        explain: bool = Field(default=False, description="결과마다 점수 구성과 태그 매칭(explanation)을 함께 반환")
 
         def to_summary_req_dto(self) -> GenerateDTO.SummaryReqDTO:
             return GenerateDTO.SummaryReqDTO(
                 user_prompt=self.user_prompt,
             )
 
+        def to_ptfo_search_req_dto(self, generated: GenerateDTO.SummaryServDTO) -> SearchDTO.PtfoSearchReqDTO:
+            """LLM 요약/태그에 이 요청의 검색 조건과 랭킹 파라미터를 붙입니다."""
+            return generated.to_ptfo_search_req_dto(
+                top_k=self.top_k,
+                offset=self.offset,
+                min_score=self.min_score,
+                filter_tags=self.filter_tags,
+                min_tag_similarity=self.min_tag_similarity,
+                tenant=self.tenant,
+                alpha=self.alpha,
+                beta=self.beta,
+                penalty_threshold=self.penalty_threshold,
+                penalty_factor=self.penalty_factor,
+                explain=self.explain,
+            )
+
+    class GetRankPtfoBatchReqDTO(BaseModel):
+        requests: List["RankDTO.GetRankPtfoReqDTO"]
+        llm_concurrency: Optional[int] = Field(
+            default=None, ge=1, description="이 배치의 동시 LLM 호출 수 (미지정 시 BATCH_LLM_CONCURRENCY)"
+        )
+
     class GetRankPtfoRespDTO(BaseModel):
         generated: GenerateDTO.SummaryServDTO
         search_results: List[SearchDTO.PtfoSearchRespDTO]
\ No newline at end of file
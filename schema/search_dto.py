@@ -1,16 +1,61 @@
-from pydantic import BaseModel
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
 
 
 class SearchDTO:
     class PtfoSearchReqDTO(BaseModel):
         summary: str
         tags: list
+        top_k: Optional[int] = Field(default=None, ge=1, description="반환할 최대 포폴 수 (미지정 시 전체)")
+        offset: int = Field(default=0, ge=0, description="건너뛸 상위 포폴 수 (페이지네이션)")
+        min_score: Optional[float] = Field(default=None, description="final_score 가 이 값 미만인 포폴 제외")
+        filter_tags: Optional[List[str]] = Field(
+            default=None, description="이 태그 중 하나 이상을 가진 포폴만 검색 (카테고리 필터)"
+        )
+        min_tag_similarity: Optional[float] = Field(
+            default=None, ge=-1.0, le=1.0,
+            description="요청 태그 중 하나와 유사도가 이 값 이상인 태그를 가진 포폴만 채점 (미지정 시 TAG_PREFILTER_THRESHOLD)",
+        )
+        tenant: Optional[str] = Field(
+            default=None, description="RANKING_PROFILES_PATH 에 등록된 테넌트의 랭킹 파라미터 사용 (미등록이면 기본값)"
+        )
+        alpha: Optional[float] = Field(default=None, ge=0.0, description="텍스트 유사도 가중치 (미지정 시 테넌트/SEARCH_ALPHA)")
+        beta: Optional[float] = Field(default=None, ge=0.0, description="태그 유사도 가중치 (미지정 시 테넌트/SEARCH_BETA)")
+        penalty_threshold: Optional[float] = Field(
+            default=None, ge=-1.0, le=1.0, description="태그 벌점 임계값 (미지정 시 테넌트/TAG_PENALTY_THRESHOLD)"
+        )
+        penalty_factor: Optional[float] = Field(
+            default=None, ge=0.0, description="태그 벌점 배수 (미지정 시 테넌트/TAG_PENALTY_FACTOR)"
+        )
+        explain: bool = Field(default=False, description="결과마다 점수 구성과 태그 매칭(explanation)을 함께 반환")
+
+    class PtfoSearchBatchReqDTO(BaseModel):
+        requests: List["SearchDTO.PtfoSearchReqDTO"]
+
+    class TagMatchDTO(BaseModel):
+        query_tag: str
+        ptfo_tag: str = Field(description="query_tag 와 유사도가 가장 높은 포폴 태그")
+        similarity: float
+        score: float = Field(description="벌점 적용 후 값 (태그 점수는 사용자 태그별 이 값의 평균)")
+
+    class ScoreExplainDTO(BaseModel):
+        alpha: float
+        beta: float
+        penalty_threshold: float
+        penalty_factor: float
+        text_contribution: float = Field(description="alpha * text_score")
+        tag_contribution: float = Field(description="beta * tag_score")
+        lexical_contribution: Optional[float] = Field(default=None, description="LEXICAL_WEIGHT * lexical_score")
+        tag_matches: List["SearchDTO.TagMatchDTO"] = Field(description="사용자 태그별 매칭 (포폴에 태그가 없으면 빈 목록)")
 
     class PtfoSearchRespDTO(BaseModel):
         final_score: float
         text_score: float
         tag_score: float
+        lexical_score: Optional[float] = Field(default=None, description="BM25 점수 (LEXICAL_WEIGHT > 0 일 때만)")
         ptfo_seqno: int
         ptfo_nm: str
         ptfo_desc: str
-        tag_names: list
\ No newline at end of file
+        tag_names: list
+        explanation: Optional["SearchDTO.ScoreExplainDTO"] = Field(default=None, description="explain 요청 시에만")
\ No newline at end of file
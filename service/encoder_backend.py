@@ -0,0 +1,56 @@
+import logging
+import importlib.util
+from typing import Optional
+
+from constants.env_variables import EnvVariables
+
+logger = logging.getLogger(__name__)
+
+ENCODER_TORCH = "torch"
+ENCODER_ONNX = "onnx"
+ENCODER_TORCH_INT8 = "torch_int8"
+ENCODER_BACKENDS = (ENCODER_TORCH, ENCODER_ONNX, ENCODER_TORCH_INT8)
+# onnx 백엔드의 선택 의존성 (sentence-transformers 는 없으면 ImportError 가 아닌 일반 Exception 을 냅니다)
+ONNX_REQUIREMENTS = ("optimum", "onnxruntime")
+
+
+def load_encoder(model_name: str, backend: Optional[str] = None, model_dir: Optional[str] = None,
+                 fallback: bool = True):
+    """
+    SentenceTransformer 호환 인코더(encode, get_sentence_embedding_dimension)를 만듭니다.
+    sentence_transformers/torch 는 여기서 처음 import 하므로, 서버 import 시점이 아닌 warm-up 에서 비용을 냅니다.
+
+    - torch: 기본 SentenceTransformer
+    - onnx: sentence-transformers 의 ONNX Runtime 백엔드 (optimum[onnxruntime] 필요, 없으면 torch 로 대체).
+            ENCODER_ONNX_FILE 로 model_dir 안의 파일(예: onnx/model_qint8_avx512_vnni.onnx)을 고를 수 있습니다.
+    - torch_int8: Linear 층을 동적 int8 양자화한 CPU torch 모델
+
+    :param model_dir: 지정하면 허브에서 내려받지 않고 이 로컬 디렉토리에서 읽습니다 (미지정 시 ENCODER_MODEL_DIR).
+    :param fallback: False 면 요청한 백엔드를 쓸 수 없을 때 torch 로 대체하지 않고 RuntimeError 를 냅니다.
+    기본과 임베딩이 충분히 같은지는 `python -m preprocess.check_encoder` 로 확인합니다.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    backend = backend or EnvVariables.ENCODER_BACKEND
+    path = model_dir or EnvVariables.ENCODER_MODEL_DIR or model_name
+    if backend == ENCODER_ONNX:
+        missing = [name for name in ONNX_REQUIREMENTS if importlib.util.find_spec(name) is None]
+        if missing:
+            if not fallback:
+                raise RuntimeError(f"onnx encoder backend requires {', '.join(missing)} "
+                                   f"(pip install optimum[onnxruntime])")
+            logger.warning("onnx encoder backend is not installed (missing %s, pip install optimum[onnxruntime]); "
+                           "using torch", ", ".join(missing))
+            return SentenceTransformer(path)
+        onnx_file = EnvVariables.ENCODER_ONNX_FILE
+        return SentenceTransformer(
+            path, device="cpu", backend="onnx", model_kwargs={"file_name": onnx_file} if onnx_file else None,
+        )
+    if backend == ENCODER_TORCH_INT8:
+        import torch
+
+        model = SentenceTransformer(path, device="cpu")
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    if backend != ENCODER_TORCH:
+        raise ValueError(f"unknown encoder backend: {backend} (expected one of {ENCODER_BACKENDS})")
+    return SentenceTransformer(path)
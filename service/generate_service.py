@@ -1,24 +1,80 @@
 import json
+import logging
+from typing import Any, AsyncIterator, Optional, Sequence, Tuple
 
-import ollama
-
+from constants.env_variables import EnvVariables
 from schema.generate_dto import GenerateDTO
+from service.llm_client import LLMClient
+from service.summary_cache import SummaryCache, summary_namespace
+from util.json_stream import IncrementalJsonObject
+from util.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# 광고 카테고리 (tb_tag_info 의 태그 어휘)
+SUMMARY_TAGS = [
+    "홍보영상", "행사 스케치", "TV CF", "관공서", "앱/서비스", "식음료", "공간/인테리어", "교육/기관", "자동차", "뷰티",
+    "의료/제약", "음악/리드미컬", "기록/정보전달", "코믹/흥미유발", "공감형성", "신뢰형성", "브랜딩", "모션/인포그래픽",
+    "드론", "배우/모델", "숏폼", "3D", "제품/기술",
+]
+
+SUMMARY_SYSTEM_PROMPT = f"""
+        persona: 너는 유저의 광고 요청을 정리해주는 최고의 AI비서야.
+        instruction:
+             - 모든 답은 한국어로.
+             - 답변 방식은 JSON 형식으로.
+        JSON 필드:
+            tags: 입력된 텍스트에서 광고 카테고리 추출. 
+            summary: 키워드 위주로 요약.
+        태그종류:
+            {",".join(SUMMARY_TAGS)}
+        """
+
+
+def summary_schema(max_tags: int, max_summary_chars: Optional[int] = None) -> dict:
+    """구조화 출력 모드에서 Ollama format 으로 넘기는 JSON schema. tags 는 SUMMARY_TAGS 중에서만 고르게 합니다."""
+    summary = {"type": "string"}
+    if max_summary_chars:
+        summary["maxLength"] = max_summary_chars
+    return {
+        "type": "object",
+        "properties": {
+            "tags": {"type": "array", "items": {"type": "string", "enum": SUMMARY_TAGS}, "maxItems": max_tags},
+            "summary": summary,
+        },
+        "required": ["tags", "summary"],
+    }
+
+
+SUMMARY_SCHEMA = summary_schema(max_tags=5)
+# 첫 응답이 num_predict 에서 잘리거나 검증에 실패하면, 요약 길이와 태그 수를 줄인 schema 로 한 번 더 요청합니다.
+SUMMARY_REPAIR_SCHEMA = summary_schema(max_tags=3, max_summary_chars=80)
+
+
+class SummaryFallback(Exception):
+    """구조화 출력 재시도까지 실패했을 때 돌려줄 대체 요약. 예외로 전달하여 SummaryCache 에 저장되지 않게 합니다."""
+
+    def __init__(self, llm_data: dict):
+        super().__init__("LLM summary fell back to the user prompt")
+        self.llm_data = llm_data
 
 
 class GenerateService:
     @staticmethod
-    def generate_summary(request: GenerateDTO.SummaryReqDTO) -> GenerateDTO.SummaryServDTO:
+    @timed("generate_summary")
+    async def generate_summary(request: GenerateDTO.SummaryReqDTO) -> GenerateDTO.SummaryServDTO:
         """
             사용자가 광고 촬영에 대해 자유롭게 입력한 텍스트를 기반으로 LLM(mistral 모델)을 호출하여,
             광고 요청을 정리한 JSON 결과를 얻습니다.
             이 JSON 결과는 "tags"와 "summary" 필드를 포함하며, 이를 통해 SearchService에 전달할 DTO를 생성합니다.
 
         동작 과정:
-            1. 시스템 프롬프트 정의
+            1. 시스템 프롬프트 정의 (모듈 상수 SUMMARY_SYSTEM_PROMPT)
 
             2. 메시지 구성 및 LLM 호출:
                 - 시스템 프롬프트와 사용자 입력(request.user_prompt)을 포함하는 메시지 리스트를 구성합니다.
-                - ollama.chat()을 호출하여 LLM(mistral 모델)에 요청을 보냅니다.
+                - 공유 LLMClient(ollama.AsyncClient)로 LLM(LLM_MODEL, 기본 mistral)에 요청을 보냅니다.
+                - 동시 호출 수 제한, 타임아웃, 재시도는 LLMClient 가 처리하며 이벤트 루프를 막지 않습니다.
 
             3. LLM 응답 처리 및 JSON 파싱:
                 - LLM 응답에서 "message" 필드의 "content" 값을 추출합니다.
@@ -29,37 +85,196 @@ class GenerateService:
                 - 파싱된 딕셔너리에서 "tags"와 "summary" 값을 추출합니다.
                 - 추출한 값을 이용해 GenerateDTO.SummaryServDTO 객체를 생성하여 반환합니다.
 
+            5. 캐시:
+                - (모델명 + 시스템 프롬프트 해시, 정규화된 user_prompt) 키로 결과를 SummaryCache 에 저장합니다.
+                - 같은(표기만 다른) 요청은 LLM 을 호출하지 않고 캐시된 결과를 사용합니다.
+                - 모델이나 시스템 프롬프트가 바뀌면 키가 달라지므로 이전 항목은 자동으로 무효화됩니다.
+
+            6. 구조화 출력 모드 (LLM_STRUCTURED_OUTPUT):
+                - Ollama format 에 SUMMARY_SCHEMA 를 넘겨 tags 가 SUMMARY_TAGS 안의 값인 JSON 만 생성되게 하고,
+                  LLM_NUM_PREDICT 로 생성 토큰 수를 제한합니다.
+                - 응답이 잘리거나 검증에 실패하면 SUMMARY_REPAIR_SCHEMA 로 한 번 더 요청하고,
+                  그래도 실패하면 예외 대신 user_prompt 기반 대체 요약을 반환합니다 (캐시하지 않음).
+
         반환값:
             GenerateDTO.SummaryServDTO 객체로, LLM이 생성한 요약(summary)과 태그(tags)를 포함합니다.
         """
+        try:
+            llm_data = await SummaryCache.get_instance().get_or_create(
+                GenerateService._cache_namespace(),
+                request.user_prompt,
+                lambda: GenerateService._request_summary(request.user_prompt),
+            )
+        except SummaryFallback as fallback:
+            llm_data = fallback.llm_data
 
-        system_prompt = """
-        persona: 너는 유저의 광고 요청을 정리해주는 최고의 AI비서야.
-        instruction:
-             - 모든 답은 한국어로.
-             - 답변 방식은 JSON 형식으로.
-        JSON 필드:
-            tags: 입력된 텍스트에서 광고 카테고리 추출. 
-            summary: 키워드 위주로 요약.
-        태그종류:
-            홍보영상,행사 스케치,TV CF,관공서,앱/서비스,식음료,공간/인테리어,교육/기관,자동차,뷰티,의료/제약,음악/리드미컬,기록/정보전달,코믹/흥미유발,공감형성,신뢰형성,브랜딩,모션/인포그래픽,드론,배우/모델,숏폼,3D,제품/기술
+        return GenerateDTO.SummaryServDTO(
+            summary=llm_data["summary"],
+            tags=llm_data["tags"]
+        )
+
+    @staticmethod
+    def is_cached(request: GenerateDTO.SummaryReqDTO) -> bool:
+        """요약이 메모리 캐시에 있어 LLM 호출 없이 바로 반환되는지 확인합니다."""
+        return SummaryCache.get_instance().contains(GenerateService._cache_namespace(), request.user_prompt)
+
+    @staticmethod
+    def _cache_namespace() -> str:
+        """구조화 출력 모드는 응답 형식이 다르므로 schema 까지 포함한 별도 네임스페이스를 씁니다."""
+        prompt = SUMMARY_SYSTEM_PROMPT
+        if EnvVariables.LLM_STRUCTURED_OUTPUT:
+            prompt += json.dumps(SUMMARY_SCHEMA, ensure_ascii=False) + f"num_predict={EnvVariables.LLM_NUM_PREDICT}"
+        return summary_namespace(LLMClient.get_instance().model, prompt)
+
+    @staticmethod
+    async def stream_summary(request: GenerateDTO.SummaryReqDTO) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        LLM 을 stream 모드로 호출하여 (이벤트, 값) 을 순서대로 내보냅니다.
+            ("token", str): LLM 응답 조각
+            ("fields", GenerateDTO.SummaryServDTO): 스트림 도중 summary 와 tags 값이 모두 완성된 시점 (한 번, 검색 선행 시작용)
+            ("summary", GenerateDTO.SummaryServDTO): 스트림 종료 후 전체 응답을 파싱한 최종 결과
+        요약이 캐시에 있으면 LLM 을 호출하지 않고 "summary" 만 내보내며, 새 결과는 generate_summary 와 같은 키로 캐시합니다.
         """
+        llm_client = LLMClient.get_instance()
+        cache = SummaryCache.get_instance()
+        namespace = GenerateService._cache_namespace()
+        llm_data = await cache.aget(namespace, request.user_prompt) if cache.enabled else None
+        if llm_data is not None:
+            yield "summary", GenerateDTO.SummaryServDTO(summary=llm_data["summary"], tags=llm_data["tags"])
+            return
 
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": request.user_prompt}
+        parser = IncrementalJsonObject()
+        fields_sent = False
+        with timed("llm"):
+            async for part in llm_client.chat_stream(GenerateService._summary_messages(request.user_prompt),
+                                                     **GenerateService._chat_options(SUMMARY_SCHEMA)):
+                content = part["message"]["content"]
+                if not content:
+                    continue
+                yield "token", content
+                if parser.feed(content) and not fields_sent and {"summary", "tags"} <= parser.fields.keys():
+                    fields_sent = True
+                    try:
+                        early = GenerateDTO.SummaryServDTO(summary=parser.fields["summary"], tags=parser.fields["tags"])
+                    except ValueError:
+                        continue
+                    yield "fields", early
+
+        if not EnvVariables.LLM_STRUCTURED_OUTPUT:
+            llm_data = GenerateService._parse_summary(parser.text)
+        else:
+            try:
+                llm_data = GenerateService._validate_summary(parser.text)
+            except ValueError as e:
+                logger.warning("structured LLM stream failed validation (%s); retrying with the repair schema", e)
+                llm_client.repairs += 1
+                try:
+                    llm_data = await GenerateService._request_summary(request.user_prompt, (SUMMARY_REPAIR_SCHEMA,))
+                except SummaryFallback as fallback:
+                    yield "summary", GenerateDTO.SummaryServDTO(**fallback.llm_data)
+                    return
+        if cache.enabled:
+            await cache.aset(namespace, request.user_prompt, llm_data)
+        yield "summary", GenerateDTO.SummaryServDTO(summary=llm_data["summary"], tags=llm_data["tags"])
+
+    @staticmethod
+    def _summary_messages(user_prompt: str) -> list:
+        return [
+            {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt}
         ]
-        llm_resp  = ollama.chat(model="mistral", messages=messages)
 
+    @staticmethod
+    def _parse_summary(content: str) -> dict:
+        """LLM 응답 본문(JSON)에서 {"summary", "tags"} 를 꺼냅니다. 파싱 실패 시 예외를 발생시킵니다."""
         try:
-            llm_data = json.loads(llm_resp["message"]["content"])
+            llm_data = json.loads(content)
         except Exception as e:
             raise Exception("LLM 응답 파싱 실패: " + str(e))
 
-        tags = llm_data.get("tags", [])
-        summary = llm_data.get("summary", "")
+        return {
+            "summary": llm_data.get("summary", ""),
+            "tags": llm_data.get("tags", []),
+        }
+
+    @staticmethod
+    def _validate_summary(content: str) -> dict:
+        """구조화 출력 응답을 파싱/검증합니다. 잘린 JSON, 필드 누락, 타입 오류는 ValueError 입니다."""
+        llm_data = json.loads(content)  # JSONDecodeError 는 ValueError
+        if not isinstance(llm_data, dict):
+            raise ValueError("response is not a JSON object")
+        summary, tags = llm_data.get("summary"), llm_data.get("tags")
+        if not isinstance(summary, str) or not summary.strip():
+            raise ValueError("missing summary")
+        if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+            raise ValueError("tags is not a list of strings")
+        # schema 를 무시하는 모델/서버에 대비해 어휘 밖 태그와 중복을 제거합니다.
+        return {"summary": summary.strip(), "tags": [tag for tag in dict.fromkeys(tags) if tag in SUMMARY_TAGS]}
+
+    @staticmethod
+    def _chat_options(schema: dict) -> dict:
+        """
+        LLMClient.chat 에 넘길 추가 인자.
+        LLM_KEEP_ALIVE 동안 모델을 메모리에 유지하면 Ollama 가 이전 요청과 같은 프롬프트 앞부분(시스템 프롬프트)의 KV 캐시를
+        재사용하므로, 시스템 프롬프트와 options 는 요청마다 바꾸지 않습니다 (options 가 바뀌면 모델을 다시 로드할 수 있음).
+        """
+        kwargs = {}
+        keep_alive = EnvVariables.LLM_KEEP_ALIVE
+        if keep_alive is not None:
+            # Ollama 는 숫자(초)와 단위가 있는 문자열(30m)을 받으며, "-1" 같은 단위 없는 문자열은 거부합니다.
+            kwargs["keep_alive"] = float(keep_alive) if keep_alive.lstrip("-").replace(".", "", 1).isdigit() else keep_alive
+        if EnvVariables.LLM_STRUCTURED_OUTPUT:
+            kwargs["format"] = schema
+            kwargs["options"] = {"num_predict": EnvVariables.LLM_NUM_PREDICT}
+        return kwargs
+
+    @staticmethod
+    async def prime_prompt_cache():
+        """
+        모델을 로드하고 시스템 프롬프트를 한 번 평가해 둡니다 (LLM_KEEP_ALIVE 설정 시 서버 시작 때 호출).
+        첫 요청부터 Ollama 가 같은 프롬프트 앞부분의 KV 캐시를 재사용하며, 실패해도 요청 처리에는 영향이 없습니다.
+        """
+        kwargs = GenerateService._chat_options(SUMMARY_SCHEMA)
+        kwargs["options"] = {**kwargs.get("options", {}), "num_predict": 1}
+        try:
+            messages = [{"role": "system", "content": SUMMARY_SYSTEM_PROMPT}]
+            response = await LLMClient.get_instance().chat(messages, **kwargs)
+            logger.info("LLM prompt cache primed (%s prompt tokens)", response.get("prompt_eval_count"))
+        except Exception:
+            logger.exception("LLM prompt cache priming failed")
+
+    @staticmethod
+    def _fallback_summary(user_prompt: str) -> dict:
+        """LLM 없이 만든 요약: 공백을 정리한 user_prompt 와 그 안에 그대로 등장하는 태그."""
+        summary = " ".join(user_prompt.split())
+        return {"summary": summary, "tags": [tag for tag in SUMMARY_TAGS if tag.casefold() in summary.casefold()]}
+
+    @staticmethod
+    async def _request_summary(
+        user_prompt: str,
+        schemas: Sequence[dict] = (SUMMARY_SCHEMA, SUMMARY_REPAIR_SCHEMA),
+    ) -> dict:
+        """
+        LLM 을 호출하여 {"summary", "tags"} 를 얻습니다.
+        기본 모드는 파싱 실패 시 예외를 발생시키고, 구조화 출력 모드는 schemas 를 차례로 시도한 뒤 SummaryFallback 을 발생시킵니다.
+        """
+        llm_client = LLMClient.get_instance()
+        messages = GenerateService._summary_messages(user_prompt)
+        if not EnvVariables.LLM_STRUCTURED_OUTPUT:
+            with timed("llm"):
+                llm_resp = await llm_client.chat(messages, **GenerateService._chat_options(SUMMARY_SCHEMA))
+            return GenerateService._parse_summary(llm_resp["message"]["content"])
+
+        for attempt, schema in enumerate(schemas):
+            if attempt > 0:
+                llm_client.repairs += 1
+            with timed("llm"):
+                llm_resp = await llm_client.chat(messages, **GenerateService._chat_options(schema))
+            try:
+                return GenerateService._validate_summary(llm_resp["message"]["content"])
+            except ValueError as e:
+                logger.warning("structured LLM response failed validation (%s, done_reason=%s)",
+                               e, llm_resp.get("done_reason"))
+        llm_client.fallbacks += 1
+        raise SummaryFallback(GenerateService._fallback_summary(user_prompt))
 
-        return GenerateDTO.SummaryServDTO(
-            summary=summary,
-            tags=tags
-        )
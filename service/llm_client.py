@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import threading
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+
+from constants.env_variables import EnvVariables
+
+logger = logging.getLogger(__name__)
+
+# 재시도할 HTTP 상태 코드 (과부하 / 일시적 서버 오류)
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class LLMClient:
+    """
+    프로세스당 하나의 Ollama 비동기 클라이언트입니다.
+    httpx 커넥션 풀을 공유하고, 세마포어로 동시 LLM 호출 수를 제한하며,
+    호출마다 타임아웃과 재시도(지수 백오프)를 적용합니다.
+    이벤트 루프를 막지 않으므로 여러 요청의 LLM 호출이 겹쳐서 진행됩니다.
+    """
+    _instance: Optional["LLMClient"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(
+        self,
+        host: Optional[str],
+        model: str,
+        max_concurrency: int,
+        timeout: float,
+        connect_timeout: float,
+        max_retries: int,
+        retry_backoff: float,
+    ):
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.calls = 0  # 성공한 호출 수
+        self.retries = 0
+        self.failures = 0  # 재시도 후에도 실패한 호출 수
+        # Ollama 응답의 토큰 통계 누적 (prompt_eval_count 는 KV 캐시를 재사용하지 못하고 새로 계산한 프롬프트 토큰 수)
+        self.prompt_tokens = 0
+        self.generated_tokens = 0
+        self.eval_seconds = 0.0  # 생성(eval)에 걸린 시간
+        self.truncated = 0  # num_predict 에 걸려 잘린 응답 수 (done_reason == "length")
+        # 구조화 출력 모드의 요약 재요청(repair) 수와 대체 요약(fallback) 수 (GenerateService 가 기록)
+        self.repairs = 0
+        self.fallbacks = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        import ollama  # import 가 무거우므로 클라이언트를 처음 만들 때(warm-up) 불러옵니다.
+
+        self._client = ollama.AsyncClient(
+            host=host,
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+        )
+
+    @classmethod
+    def get_instance(cls) -> "LLMClient":
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls(
+                        host=EnvVariables.OLLAMA_HOST,
+                        model=EnvVariables.LLM_MODEL,
+                        max_concurrency=EnvVariables.LLM_MAX_CONCURRENCY,
+                        timeout=EnvVariables.LLM_TIMEOUT,
+                        connect_timeout=EnvVariables.LLM_CONNECT_TIMEOUT,
+                        max_retries=EnvVariables.LLM_MAX_RETRIES,
+                        retry_backoff=EnvVariables.LLM_RETRY_BACKOFF,
+                    )
+        return cls._instance
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        import ollama
+
+        if isinstance(error, ollama.ResponseError):
+            return error.status_code in RETRYABLE_STATUS_CODES
+        return isinstance(error, (httpx.TransportError, asyncio.TimeoutError))
+
+    async def chat(self, messages: List[Dict[str, str]], model: Optional[str] = None, **kwargs) -> Any:
+        """
+        ollama /api/chat 을 호출합니다. 연결 오류, 타임아웃, 429/5xx 응답은 max_retries 번까지 재시도합니다.
+        대기열(세마포어) 대기 시간은 타임아웃에 포함하지 않습니다.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    response = await asyncio.wait_for(
+                        self._client.chat(model=model or self.model, messages=messages, **kwargs),
+                        timeout=self.timeout,
+                    )
+                self.calls += 1
+                self._record_usage(response)
+                return response
+            except Exception as e:
+                if attempt >= self.max_retries or not self._is_retryable(e):
+                    self.failures += 1
+                    raise
+                self.retries += 1
+                delay = self.retry_backoff * (2 ** attempt)
+                logger.warning("LLM call failed (%s: %s); retry %d/%d in %.1fs",
+                               type(e).__name__, e, attempt + 1, self.max_retries, delay)
+                await asyncio.sleep(delay)
+
+    async def chat_stream(self, messages: List[Dict[str, str]], model: Optional[str] = None,
+                          **kwargs) -> AsyncIterator[Any]:
+        """
+        ollama /api/chat 을 stream=True 로 호출하여 응답 조각을 순서대로 내보냅니다.
+        첫 조각을 받기 전의 실패만 chat() 과 같은 기준으로 재시도하고, 이후에는 조각 사이 대기에 timeout 을 적용합니다.
+        스트림이 끝날 때까지(또는 소비자가 중단할 때까지) 동시 호출 슬롯 하나를 점유합니다.
+        """
+        for attempt in range(self.max_retries + 1):
+            await self._semaphore.acquire()
+            stream = None
+            try:
+                stream = await asyncio.wait_for(
+                    self._client.chat(model=model or self.model, messages=messages, stream=True, **kwargs),
+                    timeout=self.timeout,
+                )
+                first = await asyncio.wait_for(anext(stream), timeout=self.timeout)
+                break
+            except Exception as e:
+                if stream is not None:
+                    await stream.aclose()
+                self._semaphore.release()
+                if attempt >= self.max_retries or not self._is_retryable(e):
+                    self.failures += 1
+                    raise
+                self.retries += 1
+                delay = self.retry_backoff * (2 ** attempt)
+                logger.warning("LLM stream failed (%s: %s); retry %d/%d in %.1fs",
+                               type(e).__name__, e, attempt + 1, self.max_retries, delay)
+                await asyncio.sleep(delay)
+
+        try:
+            yield first
+            while True:
+                try:
+                    part = await asyncio.wait_for(anext(stream), timeout=self.timeout)
+                except StopAsyncIteration:
+                    break
+                yield part
+                if part.get("done"):
+                    self._record_usage(part)
+            self.calls += 1
+        except Exception:
+            self.failures += 1
+            raise
+        finally:
+            await stream.aclose()
+            self._semaphore.release()
+
+    def _record_usage(self, response: Any):
+        """응답(스트림이면 마지막 조각)의 토큰 수와 생성 시간을 누적합니다."""
+        self.prompt_tokens += response.get("prompt_eval_count") or 0
+        self.generated_tokens += response.get("eval_count") or 0
+        self.eval_seconds += (response.get("eval_duration") or 0) / 1e9
+        if response.get("done_reason") == "length":
+            self.truncated += 1
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model,
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "prompt_tokens": self.prompt_tokens,
+            "generated_tokens": self.generated_tokens,
+            "eval_seconds": round(self.eval_seconds, 3),
+            "tokens_per_second": round(self.generated_tokens / self.eval_seconds, 2) if self.eval_seconds else None,
+            "truncated": self.truncated,
+            "repairs": self.repairs,
+            "fallbacks": self.fallbacks,
+        }
+
+    async def aclose(self):
+        # ollama.AsyncClient 는 close 를 제공하지 않으므로 내부 httpx 클라이언트를 직접 닫습니다.
+        await self._client._client.aclose()
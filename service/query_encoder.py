@@ -0,0 +1,116 @@
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from util.ttl_cache import TTLCache
+
+
+class QueryEncoder:
+    """
+    검색 요청의 요약/태그 문자열을 정규화된 벡터로 인코딩합니다.
+
+    - 같은 문자열(특히 태그)은 LRU 캐시에서 바로 가져옵니다.
+    - 캐시에 없는 문자열은 배치 스레드로 보내고, 대기열에 쌓인 다른 요청의 문자열과 모아
+      최대 max_batch 개씩 한 번의 encode 로 처리합니다 (작은 forward pass 여러 번 → 큰 한 번).
+      다른 요청이 동시에 인코딩 중일 때만 그 요청들을 최대 max_wait 초 기다리므로, 단독 요청에는 지연이 추가되지 않습니다.
+    max_batch 가 1 이하이거나 max_wait 가 0 이면 호출한 스레드에서 바로 인코딩합니다.
+    """
+
+    def __init__(self, embedding_model, cache_size: int, max_batch: int, max_wait: float):
+        self._model = embedding_model
+        self.cache = TTLCache(cache_size)
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.encode_calls = 0
+        self.encoded_texts = 0
+        self._queue: "queue.Queue[Tuple[List[str], Future]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+        self._callers = 0  # 대기열에 넣었거나 넣으려는(결과를 기다리는) 호출 수
+        self._callers_lock = threading.Lock()
+
+    @property
+    def batching(self) -> bool:
+        return self.max_batch > 1 and self.max_wait > 0
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        """texts 의 정규화된 임베딩, shape (len(texts), d)."""
+        if not texts:
+            return np.zeros((0, self._model.get_sentence_embedding_dimension()), dtype=np.float32)
+        vectors = [self.cache.get(text) for text in texts]
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+        if missing:
+            encoded = self._submit(missing) if self.batching else self._encode_batch(missing)
+            new_vectors = {}
+            for text, vector in zip(missing, encoded):
+                vector.setflags(write=False)
+                self.cache.set(text, vector)
+                new_vectors[text] = vector
+            vectors = [new_vectors[text] if vector is None else vector for text, vector in zip(texts, vectors)]
+        return np.vstack(vectors)
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        embeddings = self._model.encode(texts, convert_to_numpy=True).astype(np.float32)
+        self.encode_calls += 1
+        self.encoded_texts += len(texts)
+        return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+    def _submit(self, texts: List[str]) -> np.ndarray:
+        if self._worker is None:
+            with self._worker_lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name="query-encoder", daemon=True)
+                    self._worker.start()
+        future: Future = Future()
+        with self._callers_lock:
+            self._callers += 1
+        try:
+            self._queue.put((texts, future))
+            return future.result()
+        finally:
+            with self._callers_lock:
+                self._callers -= 1
+
+    def _run(self):
+        while True:
+            jobs = [self._queue.get()]
+            size = len(jobs[0][0])
+            # 이전 encode 동안 쌓인 요청을 모두 모으고, 아직 대기열에 넣지 않은 동시 호출이 있으면
+            # 첫 요청 이후 max_wait 까지 기다립니다. max_batch 개가 차면 바로 처리합니다.
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch:
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or len(jobs) >= self._callers:
+                        break
+                    try:
+                        job = self._queue.get(timeout=min(remaining, 0.0005))
+                    except queue.Empty:
+                        continue
+                jobs.append(job)
+                size += len(job[0])
+
+            unique = list(dict.fromkeys(text for texts, _ in jobs for text in texts))
+            try:
+                embeddings = self._encode_batch(unique)
+            except Exception as e:
+                for _, future in jobs:
+                    future.set_exception(e)
+                continue
+            row_by_text = {text: i for i, text in enumerate(unique)}
+            for texts, future in jobs:
+                future.set_result(embeddings[[row_by_text[text] for text in texts]])
+
+    def stats(self) -> dict:
+        return {
+            "cache": self.cache.stats(),
+            "encode_calls": self.encode_calls,
+            "encoded_texts": self.encoded_texts,
+            "avg_batch_size": round(self.encoded_texts / self.encode_calls, 2) if self.encode_calls else None,
+        }
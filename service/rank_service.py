@@ -1,19 +1,167 @@
+import asyncio
+import logging
+from contextlib import aclosing
+from typing import Any, AsyncIterator, List, Optional, Tuple
+
+from constants.env_variables import EnvVariables
+from schema.generate_dto import GenerateDTO
 from schema.rank_dto import RankDTO
 from service.generate_service import GenerateService
 from service.search_service import SearchService
+from service.speculative_search import SpeculativeSearch
+from util.metrics import timed
+
+logger = logging.getLogger(__name__)
 
 
 class RankService:
     @staticmethod
-    def get_rank_ptfo(request: RankDTO.GetRankPtfoReqDTO) -> RankDTO.GetRankPtfoRespDTO:
+    async def get_rank_ptfo(request: RankDTO.GetRankPtfoReqDTO) -> RankDTO.GetRankPtfoRespDTO:
         """
         사용자의 광고 요청을 바탕으로 포트폴리오(포폴) 순위를 산출하는 기능을 수행합니다.
         이 함수는 LLM(GenerateService)을 통해 광고 요청을 요약하고, 해당 요약 정보를
         기반으로 벡터 기반 포트폴리오 검색(SearchService)을 수행하여 최종 결과를 조합하여 반환합니다.
+        LLM 호출은 비동기로, CPU 를 쓰는 검색은 스레드에서 수행하여 다른 요청의 LLM 호출과 겹쳐 진행됩니다.
+
+        speculative 모드(request.speculative 또는 RANK_SPECULATIVE)에서는 LLM 호출과 동시에 원문 프롬프트로
+        후보를 미리 검색해 두고, 요약이 도착하면 후보만 재채점합니다 (_get_rank_ptfo_speculative).
+        top_k 가 없거나(전체 순위) 요약이 이미 캐시에 있으면 기존 방식으로 처리합니다.
+        """
+        summary_req_dto = request.to_summary_req_dto()
+        speculative = EnvVariables.RANK_SPECULATIVE if request.speculative is None else request.speculative
+        if speculative and request.top_k is not None and not GenerateService.is_cached(summary_req_dto):
+            return await RankService._get_rank_ptfo_speculative(request)
+
+        summary_serv_dto = await GenerateService.generate_summary(summary_req_dto)
+        with timed("search"):
+            search_results = await asyncio.to_thread(
+                SearchService.ptfo_search, request.to_ptfo_search_req_dto(summary_serv_dto)
+            )
+
+        return RankDTO.GetRankPtfoRespDTO(
+            generated = summary_serv_dto,
+            search_results = search_results,
+        )
+
+    @staticmethod
+    async def stream_rank_ptfo(request: RankDTO.GetRankPtfoReqDTO) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        get_rank_ptfo 의 스트리밍 버전입니다. 결과가 준비되는 대로 (이벤트, 데이터) 를 내보냅니다.
+            ("token", {"content"}): LLM 응답 조각 (요약이 캐시에 있으면 생략)
+            ("summary", GenerateDTO.SummaryServDTO): 파싱된 요약과 태그
+            ("results", {"offset", "results"}): 순위 결과를 RANK_STREAM_CHUNK_SIZE 개씩
+            ("done", {"count"}): 전체 결과 수
+        LLM 스트림 도중 summary 와 tags 가 완성되면 나머지 토큰을 받는 동안 검색을 먼저 시작하고,
+        최종 파싱 결과가 다르면 그 결과로 다시 검색합니다.
+        """
+        def start_search(summary_serv_dto: GenerateDTO.SummaryServDTO) -> asyncio.Future:
+            return asyncio.ensure_future(asyncio.to_thread(
+                SearchService.ptfo_search, request.to_ptfo_search_req_dto(summary_serv_dto)
+            ))
+
+        early: Optional[GenerateDTO.SummaryServDTO] = None
+        search: Optional[asyncio.Future] = None
+        try:
+            # 클라이언트가 중간에 끊으면 LLM 스트림(동시 호출 슬롯)도 바로 닫히도록 aclosing
+            async with aclosing(GenerateService.stream_summary(request.to_summary_req_dto())) as events:
+                async for event, data in events:
+                    if event == "token":
+                        yield "token", {"content": data}
+                    elif event == "fields":
+                        early, search = data, start_search(data)
+                    elif event == "summary":
+                        summary_serv_dto = data
+                        yield "summary", summary_serv_dto.model_dump()
+
+            if search is None or early != summary_serv_dto:
+                if search is not None:
+                    RankService._discard(search)
+                search = start_search(summary_serv_dto)
+            with timed("search"):
+                search_results = await search
+        finally:
+            if search is not None and not search.done():
+                RankService._discard(search)
+
+        chunk_size = EnvVariables.RANK_STREAM_CHUNK_SIZE
+        for start in range(0, len(search_results), chunk_size):
+            yield "results", {
+                "offset": request.offset + start,
+                "results": [result.model_dump() for result in search_results[start:start + chunk_size]],
+            }
+        yield "done", {"count": len(search_results)}
+
+    @staticmethod
+    async def rank_ptfo_batch(
+        requests: List[RankDTO.GetRankPtfoReqDTO],
+        llm_concurrency: Optional[int] = None,
+    ) -> AsyncIterator[dict]:
+        """
+        여러 랭크 요청을 처리하여 입력 순서대로 {"index", "generated", "search_results"} 를 내보냅니다 (오프라인 재랭킹용).
+        요약은 llm_concurrency(기본 BATCH_LLM_CONCURRENCY) 개까지 동시에 생성하고,
+        BATCH_WINDOW 개씩 모이면 SearchService.ptfo_search_batch 로 한 번에 검색합니다.
+        다음 구간의 요약은 검색과 출력 중에도 계속 생성됩니다. 요약이 실패한 요청은 {"index", "error"} 로 내보냅니다.
+        """
+        semaphore = asyncio.Semaphore(llm_concurrency or EnvVariables.BATCH_LLM_CONCURRENCY)
+
+        async def summarize(request: RankDTO.GetRankPtfoReqDTO) -> GenerateDTO.SummaryServDTO:
+            async with semaphore:
+                return await GenerateService.generate_summary(request.to_summary_req_dto())
+
+        tasks = [asyncio.ensure_future(summarize(request)) for request in requests]
+        try:
+            window = EnvVariables.BATCH_WINDOW
+            for start in range(0, len(requests), window):
+                summaries = await asyncio.gather(*tasks[start:start + window], return_exceptions=True)
+                succeeded = [i for i, summary in enumerate(summaries) if not isinstance(summary, BaseException)]
+                search_requests = [requests[start + i].to_ptfo_search_req_dto(summaries[i]) for i in succeeded]
+                with timed("batch_search"):
+                    search_results = await asyncio.to_thread(SearchService.ptfo_search_batch, search_requests)
+                results_by_position = dict(zip(succeeded, search_results))
+
+                for i, summary in enumerate(summaries):
+                    if i not in results_by_position:
+                        yield {"index": start + i, "error": str(summary)}
+                        continue
+                    yield {"index": start + i, **RankDTO.GetRankPtfoRespDTO(
+                        generated=summary,
+                        search_results=results_by_position[i],
+                    ).model_dump()}
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    @staticmethod
+    def _discard(future: asyncio.Future):
+        """더 이상 필요 없는 검색 스레드의 결과(예외)를 소비합니다. 스레드 자체는 끝까지 실행됩니다."""
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+    @staticmethod
+    async def _get_rank_ptfo_speculative(request: RankDTO.GetRankPtfoReqDTO) -> RankDTO.GetRankPtfoRespDTO:
+        """
+        LLM 요약과 후보 검색을 겹쳐서 실행합니다.
+        후보 검색(임베딩 + ANN/내적)은 LLM 응답 시간 뒤에 숨겨지고, 요약 이후에는 후보 재채점만 남습니다.
         """
+        speculative = SpeculativeSearch.get_instance()
+        retrieval = asyncio.ensure_future(
+            asyncio.to_thread(speculative.retrieve, request.user_prompt, request.top_k, request.offset)
+        )
+        try:
+            summary_serv_dto = await GenerateService.generate_summary(request.to_summary_req_dto())
+        except BaseException:
+            # 요약이 실패해도 후보 검색 스레드는 끝까지 실행되므로 결과(예외)만 소비합니다.
+            RankService._discard(retrieval)
+            raise
+        try:
+            candidates = await retrieval
+        except Exception:
+            logger.exception("speculative retrieval failed; falling back to full search")
+            candidates = None
 
-        summary_serv_dto = GenerateService.generate_summary(request.to_summary_req_dto())
-        search_results = SearchService.ptfo_search(summary_serv_dto.to_ptfo_search_req_dto())
+        with timed("search"):
+            search_results = await asyncio.to_thread(
+                speculative.search, request.to_ptfo_search_req_dto(summary_serv_dto), candidates
+            )
 
         return RankDTO.GetRankPtfoRespDTO(
             generated = summary_serv_dto,
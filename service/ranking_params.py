@@ -0,0 +1,112 @@
+import os
+import json
+import logging
+import threading
+from dataclasses import dataclass, fields, replace
+from typing import Dict, Optional
+
+from constants.env_variables import EnvVariables
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RankingParams:
+    """
+    최종 점수 가중치와 태그 점수 벌점 파라미터입니다.
+    최종 점수 = alpha * 텍스트 유사도 + beta * 태그 유사도 (+ LEXICAL_WEIGHT * BM25 점수)
+    태그 점수는 사용자 태그별 최고 유사도 s 가 penalty_threshold 미만이면 s - penalty_factor * (penalty_threshold - s) 로
+    깎은 뒤 평균한 값입니다.
+    """
+    alpha: float
+    beta: float
+    penalty_threshold: float
+    penalty_factor: float
+
+    @classmethod
+    def defaults(cls) -> "RankingParams":
+        return cls(
+            alpha=EnvVariables.SEARCH_ALPHA,
+            beta=EnvVariables.SEARCH_BETA,
+            penalty_threshold=EnvVariables.TAG_PENALTY_THRESHOLD,
+            penalty_factor=EnvVariables.TAG_PENALTY_FACTOR,
+        )
+
+    @classmethod
+    def resolve(cls, request) -> "RankingParams":
+        """
+        검색 요청에 적용할 파라미터. 요청에 지정한 값 > 테넌트 프로필(RANKING_PROFILES_PATH) > 환경 변수 기본값 순입니다.
+        프로필에 없는 테넌트는 기본값을 씁니다.
+        """
+        params = cls.defaults()
+        if request.tenant:
+            profile = RankingProfiles.get_instance().get(request.tenant)
+            if profile:
+                params = replace(params, **profile)
+        overrides = {name: getattr(request, name) for name in PARAM_NAMES if getattr(request, name) is not None}
+        return replace(params, **overrides) if overrides else params
+
+
+PARAM_NAMES = tuple(field.name for field in fields(RankingParams))
+
+
+class RankingProfiles:
+    """
+    RANKING_PROFILES_PATH 의 테넌트별 랭킹 파라미터를 보관합니다.
+    파일의 수정 시각이 바뀌면 다음 조회에서 다시 읽으므로, 배포 없이 파일만 바꿔 가중치를 조정할 수 있습니다.
+    다시 읽다가 실패하면 이전 프로필을 계속 사용합니다.
+    """
+    _instance: Optional["RankingProfiles"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self._profiles: Dict[str, Dict[str, float]] = {}
+
+    @classmethod
+    def get_instance(cls) -> "RankingProfiles":
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls(EnvVariables.RANKING_PROFILES_PATH)
+        return cls._instance
+
+    def get(self, tenant: str) -> Dict[str, float]:
+        """테넌트 프로필(지정된 파라미터만). 없으면 빈 dict."""
+        return self._load().get(tenant, {})
+
+    def _load(self) -> Dict[str, Dict[str, float]]:
+        if not self.path:
+            return self._profiles
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return self._profiles
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    try:
+                        self._profiles = self._read(self.path)
+                        logger.info("loaded ranking profiles for %d tenants from %s", len(self._profiles), self.path)
+                    except (OSError, TypeError, ValueError):
+                        logger.exception("failed to load ranking profiles from %s; keeping previous profiles", self.path)
+                    self._mtime = mtime
+        return self._profiles
+
+    @staticmethod
+    def _read(path: str) -> Dict[str, Dict[str, float]]:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError("ranking profiles must be a JSON object of {tenant: {parameter: value}}")
+        profiles = {}
+        for tenant, profile in data.items():
+            if not isinstance(profile, dict):
+                raise ValueError(f"ranking profile for tenant {tenant} must be a JSON object")
+            unknown = set(profile) - set(PARAM_NAMES)
+            if unknown:
+                raise ValueError(f"unknown ranking parameters for tenant {tenant}: {sorted(unknown)}")
+            profiles[tenant] = {name: float(value) for name, value in profile.items()}
+        return profiles
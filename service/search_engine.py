@@ -0,0 +1,262 @@
+import os
+import logging
+import threading
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Optional
+
+import numpy as np
+
+from constants.env_variables import EnvVariables
+from service.encoder_backend import load_encoder
+from service.tag_scorer import TagScorer
+from service.query_encoder import QueryEncoder
+from util.lexical_index import LexicalIndex
+from util.quantization import EmbeddingMatrix
+from util.metrics import timed
+from util.artifact_store import (
+    Artifact,
+    StringColumn,
+    PORTFOLIO_ARTIFACT,
+    TAG_ARTIFACT,
+    LEGACY_PORTFOLIO_PICKLE,
+    current_generation,
+    read_artifact,
+    load_legacy_pickle,
+)
+
+# faiss 와 sentence_transformers(torch)는 import 가 무거우므로 처음 사용할 때(warm-up) 불러옵니다.
+if TYPE_CHECKING:
+    import faiss
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class SearchEngineState:
+    """
+    한 시점의 검색 상태 스냅샷입니다.
+    요청은 시작할 때 참조한 스냅샷만 사용하므로, 교체 중에도 반쯤 로드된 인덱스를 보지 않습니다.
+    배열은 artifact 파일을 읽기 전용 mmap 한 것이라 worker 끼리 페이지 캐시를 공유합니다.
+    """
+    generation: str  # 로드한 artifact generation
+    embeddings: EmbeddingMatrix  # 정규화된 포폴 임베딩 (float32 또는 양자화된 float16/int8), shape (N, d)
+    ptfo_seqnos: np.ndarray  # PTFO_SEQNO, shape (N,)
+    ptfo_names: StringColumn  # PTFO_NM
+    ptfo_descs: StringColumn  # PTFO_DESC
+    ann_index: Optional["faiss.Index"]  # preprocess 에서 학습한 ANN 인덱스 (flat 이면 None)
+    seqno_order: Optional[np.ndarray]  # ptfo_seqnos 를 정렬하는 행 순서 (이미 오름차순이면 None)
+    lexical_index: Optional[LexicalIndex] = None  # preprocess 에서 만든 BM25 역색인 (이전 generation 이면 None)
+
+    @property
+    def portfolio_count(self) -> int:
+        return len(self.ptfo_seqnos)
+
+    def rows_for(self, seqnos: np.ndarray) -> np.ndarray:
+        """PTFO_SEQNO 배열에 해당하는 행 번호(오름차순). artifact 에 없는 PTFO_SEQNO 는 제외합니다."""
+        if self.portfolio_count == 0 or len(seqnos) == 0:
+            return np.zeros(0, dtype=np.int64)
+        sorted_seqnos = self.ptfo_seqnos if self.seqno_order is None else self.ptfo_seqnos[self.seqno_order]
+        pos = np.minimum(np.searchsorted(sorted_seqnos, seqnos), self.portfolio_count - 1)
+        pos = pos[sorted_seqnos[pos] == seqnos]
+        return pos if self.seqno_order is None else np.sort(self.seqno_order[pos])
+
+
+class SearchEngine:
+    """
+    프로세스당 한 번만 로드되는 상주 검색 엔진입니다.
+    임베딩 모델, 정규화된 포폴 임베딩, 포폴 메타데이터 컬럼을 보관하며,
+    artifact 의 CURRENT generation 이 바뀌면 새 상태를 모두 만든 뒤 참조 하나만 바꿔치기(hot-swap)합니다.
+    """
+    _instance: Optional["SearchEngine"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, artifacts_dir: str, model_name: str):
+        self.artifacts_dir = artifacts_dir
+        self.model_name = model_name
+        self._model: Optional[Any] = None  # SentenceTransformer 호환 인코더 (encoder_backend)
+        self._tag_scorer: Optional[TagScorer] = None
+        self._query_encoder: Optional[QueryEncoder] = None
+        self._state: Optional[SearchEngineState] = None
+        self._model_lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls) -> "SearchEngine":
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls(EnvVariables.ARTIFACTS_DIR, EnvVariables.EMBEDDING_MODEL_NAME)
+        return cls._instance
+
+    @property
+    def model(self):
+        """임베딩 모델. ENCODER_BACKEND 에 따라 torch / ONNX Runtime / 동적 int8 torch 로 로드합니다."""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = load_encoder(self.model_name)
+        return self._model
+
+    @property
+    def tag_scorer(self) -> TagScorer:
+        """
+        태그 어휘 유사도 표를 보관하는 태그 점수 계산기. 모델과 수명이 같습니다.
+        태그 artifact 에 유사도 표가 있으면 그것으로 시작하고, 없으면 처음 보는 태그부터 임베딩하여 표를 만듭니다.
+        """
+        if self._tag_scorer is None:
+            model = self.model
+            with self._model_lock:
+                if self._tag_scorer is None:
+                    self._tag_scorer = self._build_tag_scorer(model)
+        return self._tag_scorer
+
+    def _build_tag_scorer(self, model) -> TagScorer:
+        try:
+            artifact = read_artifact(self.artifacts_dir, TAG_ARTIFACT, verify=EnvVariables.ARTIFACT_VERIFY_CHECKSUM)
+        except FileNotFoundError:
+            return TagScorer(model)
+        table = artifact.manifest.get("similarity")
+        if not table:
+            logger.info("tag artifact %s has no similarity table; tags will be embedded on first use",
+                        artifact.generation)
+            return TagScorer(model)
+        if artifact.manifest["model_name"] != self.model_name:
+            logger.warning("tag similarity table was built with %s, not %s; ignoring it",
+                           artifact.manifest["model_name"], self.model_name)
+            return TagScorer(model)
+        return TagScorer.from_table(
+            model,
+            artifact.columns["TAG_NM"].tolist(),
+            np.load(os.path.join(artifact.path, table["embeddings_file"]), mmap_mode="r"),
+            np.load(os.path.join(artifact.path, table["file"]), mmap_mode="r"),
+        )
+
+    @property
+    def query_encoder(self) -> QueryEncoder:
+        """요약/태그 쿼리 벡터 캐시 + 동시 요청 micro-batching 인코더. 모델과 수명이 같습니다."""
+        if self._query_encoder is None:
+            model = self.model
+            with self._model_lock:
+                if self._query_encoder is None:
+                    self._query_encoder = QueryEncoder(
+                        model,
+                        cache_size=EnvVariables.QUERY_CACHE_SIZE,
+                        max_batch=EnvVariables.ENCODE_MAX_BATCH,
+                        max_wait=EnvVariables.ENCODE_MAX_WAIT_MS / 1000,
+                    )
+        return self._query_encoder
+
+    @property
+    def loaded(self) -> bool:
+        """검색 상태(artifact)가 로드되었는지. 로드를 유발하지 않습니다."""
+        return self._state is not None
+
+    @property
+    def encoder_warmed(self) -> bool:
+        """쿼리 인코더가 한 번 이상 인코딩했는지 (첫 forward pass 비용을 이미 냈는지)."""
+        return self._query_encoder is not None and self._query_encoder.encode_calls > 0
+
+    @property
+    def state(self) -> SearchEngineState:
+        state = self._state
+        if state is None:
+            state = self.load()
+        return state
+
+    def stats(self) -> dict:
+        """현재 로드된 상태의 크기 정보. 로드되지 않은 항목은 None 이며, 이 호출로 로드를 유발하지 않습니다."""
+        state, query_encoder, tag_scorer = self._state, self._query_encoder, self._tag_scorer
+        return {
+            "generation": None if state is None else state.generation,
+            "portfolios": None if state is None else state.portfolio_count,
+            "embedding_bytes": None if state is None else state.embeddings.nbytes,
+            "embedding_storage": None if state is None else state.embeddings.storage,
+            "ann_vectors": None if state is None or state.ann_index is None else int(state.ann_index.ntotal),
+            "lexical_postings": None if state is None or state.lexical_index is None else len(state.lexical_index.rows),
+            "tag_vocabulary": None if tag_scorer is None else len(tag_scorer.vocab_embeddings),
+            "tag_scorer": None if tag_scorer is None else tag_scorer.stats(),
+            "query_encoder": None if query_encoder is None else query_encoder.stats(),
+        }
+
+    @property
+    def legacy_artifact_path(self) -> str:
+        return os.path.join(self.artifacts_dir, LEGACY_PORTFOLIO_PICKLE)
+
+    def _source_generation(self) -> str:
+        """현재 디스크의 artifact generation. 새 형식이 없으면 legacy pickle 의 수정 시각으로 식별합니다."""
+        generation = current_generation(self.artifacts_dir, PORTFOLIO_ARTIFACT)
+        if generation is not None:
+            return generation
+        return f"legacy-{os.path.getmtime(self.legacy_artifact_path)}"
+
+    def load(self) -> SearchEngineState:
+        """
+        artifact 를 읽어 새 상태를 만든 뒤 원자적으로 교체합니다.
+        동시에 여러 요청이 첫 로드를 유발해도 실제 로드는 한 번만 수행됩니다.
+        """
+        with self._load_lock:
+            generation = self._source_generation()
+            if self._state is not None and self._state.generation == generation:
+                return self._state
+            state = self._build_state(generation)
+            self._state = state
+            logger.info("search engine loaded: %d portfolios (generation=%s)", state.portfolio_count, generation)
+            return state
+
+    def reload_if_changed(self) -> bool:
+        """artifact generation 이 바뀌었으면 다시 로드합니다. 교체했으면 True 를 반환합니다."""
+        try:
+            generation = self._source_generation()
+        except OSError:
+            return False
+        if self._state is not None and self._state.generation == generation:
+            return False
+        self.load()
+        return True
+
+    def _read_artifact(self, generation: str) -> Artifact:
+        if generation.startswith("legacy-"):
+            logger.warning("loading legacy pickle artifact %s; run preprocess.migrate_artifact to convert it",
+                           self.legacy_artifact_path)
+            return load_legacy_pickle(self.legacy_artifact_path, self.model_name)
+        return read_artifact(self.artifacts_dir, PORTFOLIO_ARTIFACT, generation,
+                             verify=EnvVariables.ARTIFACT_VERIFY_CHECKSUM)
+
+    @timed("artifact_load")
+    def _build_state(self, generation: str) -> SearchEngineState:
+        artifact = self._read_artifact(generation)
+        if artifact.manifest["model_name"] != self.model_name:
+            raise ValueError(f"artifact model {artifact.manifest['model_name']} does not match "
+                             f"embedding model {self.model_name}")
+
+        norm_embeddings = artifact.embeddings
+        if not artifact.manifest["normalized"]:
+            norm_embeddings = norm_embeddings / np.linalg.norm(norm_embeddings, axis=1, keepdims=True)
+        # preprocess 가 양자화 행렬을 함께 저장했으면 검색에는 그것만 사용합니다 (float32 파일은 mmap 만 하고 읽지 않음).
+        embeddings = EmbeddingMatrix.load(artifact.path, artifact.manifest.get("storage"), norm_embeddings)
+
+        # ANN 인덱스가 함께 저장된 generation 이면 로드 (검색 파라미터는 EnvVariables 기준)
+        ann_index = None
+        index_meta = artifact.manifest.get("index") or {}
+        if index_meta.get("file"):
+            from util.index_factory import IndexParams, read_index
+            ann_index = read_index(os.path.join(artifact.path, index_meta["file"]), IndexParams.from_env())
+
+        # BM25 역색인이 함께 저장된 generation 이면 로드
+        lexical_meta = artifact.manifest.get("lexical")
+        lexical_index = LexicalIndex.load(artifact.path, lexical_meta) if lexical_meta else None
+
+        # preprocess 는 PTFO_SEQNO 순으로 기록하므로 보통 정렬되어 있습니다 (legacy pickle 은 아닐 수 있음).
+        ptfo_seqnos = artifact.columns["PTFO_SEQNO"]
+        seqno_order = None if np.all(np.diff(ptfo_seqnos) > 0) else np.argsort(ptfo_seqnos, kind="stable")
+
+        return SearchEngineState(
+            generation=generation,
+            embeddings=embeddings,
+            ptfo_seqnos=ptfo_seqnos,
+            ptfo_names=artifact.columns["PTFO_NM"],
+            ptfo_descs=artifact.columns["PTFO_DESC"],
+            ann_index=ann_index,
+            seqno_order=seqno_order,
+            lexical_index=lexical_index,
+        )
@@ -1,19 +1,93 @@
-from typing import List
-import os
-import pickle
+import math
+from dataclasses import dataclass
+from typing import List, Optional
 import numpy as np
 
-import faiss
-from sentence_transformers import SentenceTransformer
-
-from util.database import get_db
-from model.ptfo_tag_merged import PtfoTagMerged
+from constants.env_variables import EnvVariables
+from service.ranking_params import RankingParams
+from service.search_engine import SearchEngine, SearchEngineState
+from service.tag_mapping_store import TagMappingSnapshot, TagMappingStore
+from service.tag_scorer import PortfolioTagCSR, TagScorer
+from util.lexical_index import LexicalHits
+from util.metrics import timed
+from util.topk_tool import select_top_k
 from schema.search_dto import SearchDTO
 
 
+@dataclass(frozen=True)
+class CandidateSet:
+    """
+    LLM 요약 전에 원문 프롬프트로 미리 뽑아 둔 후보 포폴 행 번호입니다 (SearchService.retrieve_candidates).
+    만든 시점의 artifact generation 과 다른 상태에는 적용하지 않습니다.
+    """
+    generation: str
+    rows: np.ndarray  # 정렬된 행 번호
+
+
+@dataclass(frozen=True)
+class ScoreComponents:
+    """
+    랭킹 파라미터(RankingParams)를 적용하기 전, 검색 요청 하나의 채점 대상과 점수 구성 요소입니다.
+    위치 i 는 포폴 행 rows[i] 이고, rows 가 None 이면 전체 포폴의 행 순서입니다.
+    """
+    state: SearchEngineState
+    tag_mapping: TagMappingSnapshot
+    rows: Optional[np.ndarray]
+    vocab_ids: np.ndarray  # tag_mapping.tag_names 순서의 TagScorer 어휘 ID
+    query_vocab_sims: Optional[np.ndarray]  # 사용자 태그 × 태그 어휘 유사도 (T, V), 태그가 없으면 None
+    text_similarities: np.ndarray  # (C,) float64
+    lexical_scores: Optional[np.ndarray] = None  # (C,) BM25 점수, 하이브리드 검색을 쓸 때만
+
+    @property
+    def seqnos(self) -> np.ndarray:
+        return self.state.ptfo_seqnos if self.rows is None else self.state.ptfo_seqnos[self.rows]
+
+    def tag_csr(self) -> PortfolioTagCSR:
+        """채점 대상 포폴 태그를 태그 어휘 ID 의 CSR 로 변환합니다 (어휘에 없는 포폴 태그는 프로세스당 한 번만 임베딩)."""
+        return self.tag_mapping.csr_for(self.seqnos, self.vocab_ids)
+
+
+@dataclass(frozen=True)
+class TagMatchExplainer:
+    """explain 요청에서 반환할 포폴마다 점수 구성과, 사용자 태그별로 가장 유사한 포폴 태그를 계산합니다."""
+    query_tags: list
+    query_vocab_sims: Optional[np.ndarray]  # 이 요청의 사용자 태그 × 태그 어휘 유사도 (T, V)
+    tag_csr: PortfolioTagCSR  # 점수 배열 위치 순서의 포폴 태그
+    params: RankingParams
+
+    def explain(self, position: int, ptfo_tags: List[str], text_score: float, tag_score: float,
+                lexical_score: Optional[float]) -> SearchDTO.ScoreExplainDTO:
+        """ptfo_tags 는 tag_mapping.tags_of 의 결과로, CSR 의 해당 구간과 순서가 같습니다."""
+        params = self.params
+        tag_ids = self.tag_csr.indices[self.tag_csr.indptr[position]:self.tag_csr.indptr[position + 1]]
+        tag_matches = []
+        if self.query_vocab_sims is not None and len(tag_ids):
+            sims = self.query_vocab_sims[:, tag_ids]
+            for query_tag, row, best in zip(self.query_tags, sims, sims.argmax(axis=1)):
+                similarity = float(row[best])
+                score = similarity if similarity >= params.penalty_threshold \
+                    else similarity - params.penalty_factor * (params.penalty_threshold - similarity)
+                tag_matches.append(SearchDTO.TagMatchDTO(
+                    query_tag=str(query_tag), ptfo_tag=ptfo_tags[best], similarity=similarity, score=score,
+                ))
+        return SearchDTO.ScoreExplainDTO(
+            alpha=params.alpha,
+            beta=params.beta,
+            penalty_threshold=params.penalty_threshold,
+            penalty_factor=params.penalty_factor,
+            text_contribution=params.alpha * text_score,
+            tag_contribution=params.beta * tag_score,
+            lexical_contribution=None if lexical_score is None else EnvVariables.LEXICAL_WEIGHT * lexical_score,
+            tag_matches=tag_matches,
+        )
+
+
 class SearchService:
     @staticmethod
-    def ptfo_search(request: SearchDTO.PtfoSearchReqDTO) -> List[SearchDTO.PtfoSearchRespDTO]:
+    def ptfo_search(
+        request: SearchDTO.PtfoSearchReqDTO,
+        candidates: Optional[CandidateSet] = None,
+    ) -> List[SearchDTO.PtfoSearchRespDTO]:
         """
         포트폴리오(포폴) 검색을 수행하는 함수입니다.
         사용자 입력(요약 및 태그)을 기반으로, 포폴의 텍스트와 태그 유사도를 각각 계산한 후,
@@ -21,148 +95,435 @@ class SearchService:
         그 후, 최종 점수를 기준으로 정렬된 포폴 결과를 SearchDTO.PtfoSearchRespDTO 객체 리스트로 반환합니다.
 
         동작 과정:
-        1. artifacts 디렉토리의 "portfolio_embeddings.pkl" 파일에서 포폴 임베딩과 매핑 정보를 로드합니다.
-           - portfolio_embeddings: 각 포폴의 임베딩 벡터 (numpy array, shape: (N, d)).
-           - portfolio_data: 각 포폴의 상세 정보 (예: PTFO_SEQNO, PTFO_NM, PTFO_DESC 등).
+        1. 프로세스에 상주하는 SearchEngine 에서 현재 검색 상태 스냅샷을 가져옵니다.
+           - embeddings: 정규화된 각 포폴의 임베딩 벡터 (shape: (N, d)).
+             preprocess 의 EMBEDDING_STORAGE 에 따라 float32 원본 또는 float16/int8 양자화 행렬(EmbeddingMatrix)입니다.
+           - index: preprocess 단계에서 학습한 ANN 인덱스 (flat 이면 없음).
+           - ptfo_seqnos, ptfo_names, ptfo_descs: 각 포폴의 상세 정보 컬럼 (PTFO_SEQNO, PTFO_NM, PTFO_DESC).
 
-        2. 데이터베이스에서 tb_ptfo_tag_merged 테이블을 조회하여,
-           각 포폴의 태그 목록을 매핑(딕셔너리) 형태로 생성합니다.
+        2. TagMappingStore 가 메모리에 캐시한 tb_ptfo_tag_merged 의 포폴→태그 매핑 스냅샷을 참조합니다.
+           - 매핑은 (PTFO_SEQNO, TAG_NM) 만 압축 배열로 보관하며, 주기적 변경 확인 또는 reload API 로 갱신됩니다.
 
-        3. 임베딩 모델(SentenceTransformer 'all-MiniLM-L6-v2')을 초기화하여,
-           사용자 입력 요약과 태그를 임베딩합니다.
+        3. SearchEngine 이 보관 중인 임베딩 모델(SentenceTransformer 'all-MiniLM-L6-v2')로
+           사용자 입력 요약과 태그 어휘에 없는 태그를 임베딩합니다.
+           - QueryEncoder 가 문자열별 벡터를 LRU 캐시하고, 캐시에 없는 문자열은 동시 요청들과 묶어
+             최대 ENCODE_MAX_BATCH 개씩, 최대 ENCODE_MAX_WAIT_MS 만큼 기다려 한 번에 인코딩합니다.
 
-           3-1. 텍스트 유사도 계산 (FAISS 사용):
-                - 포폴 임베딩 벡터들을 정규화한 후, FAISS IndexFlatIP (내적 기반 인덱스)를 생성합니다.
-                - 사용자 입력 요약을 임베딩하고 정규화하여, 전체 포폴 임베딩과의 내적(유사도)을 계산합니다.
+           3-1. 텍스트 유사도 계산:
+                - 사용자 입력 요약을 임베딩하고 정규화합니다.
+                - preprocess 단계에서 ANN 인덱스(IVF, HNSW, IVF-PQ)를 만든 경우, 인덱스로 상위 ANN_CANDIDATES 개 후보를
+                  먼저 가져오고 이후 단계는 이 후보만 채점합니다. flat 이면 전체 포폴이 대상입니다.
+                - 태그 사전 필터(filter_tags, min_tag_similarity)를 쓰면 태그→포폴 역색인으로 조건을 만족하는 포폴만 남기고,
+                  그 포폴만 채점합니다. 통과한 포폴이 PREFILTER_EXACT_MAX 를 넘으면 필터 안에서만 ANN 검색합니다.
+                - 대상 포폴의 정규화된 임베딩 행렬과의 내적(유사도)을 한 번에 계산합니다.
                 - 계산된 유사도를 기반으로 각 포폴의 텍스트 유사도 점수를 산출합니다.
 
-           3-2. 태그 유사도 계산 (포폴별 FAISS 사용):
-                - 사용자 요청에 태그가 존재하는 경우, 해당 태그들을 임베딩하고 정규화합니다.
-                - 각 포폴의 태그 리스트를 임베딩하여 FAISS 인덱스를 생성하고,
-                  각 사용자 태그와 포폴 태그 간 최고 유사도를 계산합니다.
+           3-2. 태그 유사도 계산 (TagScorer 를 이용한 일괄 계산):
+                - 사용자 태그가 태그 어휘에 있으면 preprocess 가 저장한 어휘 유사도 표(V×V)의 행을 그대로 쓰고,
+                  어휘에 없는 태그만 임베딩하여 어휘 임베딩과의 유사도를 계산합니다.
+                - 포폴 태그 리스트를 태그 어휘 ID 의 CSR 배열로 변환하고,
+                  사용자 태그 × 태그 어휘 유사도 행렬에서 포폴별로 각 사용자 태그의 최고 유사도를 계산합니다.
                 - 임계값 이하의 유사도에는 벌점(penalty_factor)을 적용하여 조정한 후,
                   평균 유사도를 산출해 각 포폴의 태그 유사도 점수를 결정합니다.
 
+           3-3. 어휘 점수 계산 (LEXICAL_WEIGHT > 0 이고 artifact 에 BM25 역색인이 있을 때):
+                - 요약과 태그를 preprocess 와 같은 방식으로 전처리하여 문자 n-gram BM25 점수를 역색인 포스팅에서 구하고,
+                  쿼리 안 최고점으로 나눠 [0, 1] 로 맞춥니다.
+                - 채점 대상이 후보로 좁혀진 경우 BM25 상위 LEXICAL_CANDIDATES 개를 후보에 더합니다.
+                  고유명사나 상품명처럼 임베딩이 놓치는 키워드 일치를 보완합니다.
+
         4. 텍스트 유사도와 태그 유사도에 각각 가중치(alpha, beta)를 부여하여 최종 점수를 산출합니다.
+           어휘 점수를 쓰면 LEXICAL_WEIGHT 를 곱해 더합니다.
+           alpha, beta, penalty_threshold, penalty_factor 는 요청에 지정한 값, 테넌트 프로필, 환경 변수 기본값 순으로
+           정합니다 (RankingParams.resolve).
 
-        5. 각 포폴에 대해 텍스트 유사도, 태그 유사도, 최종 점수 및 추가 정보를 포함하는 결과를 생성하고,
-           최종 점수를 기준으로 내림차순 정렬한 후, SearchDTO.PtfoSearchRespDTO 객체 리스트로 반환합니다.
+        5. 최종 점수 내림차순 기준으로 요청된 구간(offset, top_k, min_score)만 부분 선택(argpartition)하고,
+           선택된 포폴에 대해서만 SearchDTO.PtfoSearchRespDTO 객체를 생성하여 반환합니다.
 
         매개변수:
         - request: SearchDTO.PtfoSearchReqDTO 객체
-           - 사용자 입력 요약과 선택된 태그 정보를 포함합니다.
+           - 사용자 입력 요약과 선택된 태그 정보, 그리고 페이지네이션 정보(top_k, offset, min_score)를 포함합니다.
+        - candidates: 지정하면 ANN/전체 대신 이 후보 행만 채점합니다 (speculative 검색, RankService 참고).
+           현재 artifact generation 과 다르면 무시합니다.
 
         반환값:
         - List[SearchDTO.PtfoSearchRespDTO]:
            - 각 객체는 최종 점수, 텍스트 유사도, 태그 유사도, 포폴 일련번호(PTFO_SEQNO), 포폴명(PTFO_NM),
              포폴 설명(PTFO_DESC), 그리고 해당 포폴에 매핑된 태그 리스트(tag_names)를 포함합니다.
+           - request.explain 이면 적용된 파라미터, 점수 구성, 사용자 태그별로 매칭된 포폴 태그(explanation)도 포함합니다.
         """
-        artifacts_dir = "./artifacts"
+        components = SearchService.score_components(request, candidates)
+        params = RankingParams.resolve(request)
 
-        # 1. pickle 파일에서 포폴 임베딩 및 매핑 정보 로드
-        with open(os.path.join(artifacts_dir, "portfolio_embeddings.pkl"), "rb") as f:
-            portfolio_artifact = pickle.load(f)
-        portfolio_embeddings = portfolio_artifact["embeddings"]  # numpy array, shape (N, d)
-        portfolio_data = portfolio_artifact["data"]  # 각 원소: dict {PTFO_SEQNO, PTFO_NM, PTFO_DESC}
+        #############################
+        # 3-2. 태그 유사도 계산 (전체 포폴을 한 번의 행렬 연산으로)
+        #############################
+        with timed("tag_score"):
+            tag_csr = components.tag_csr()
+            tag_scores = TagScorer.score_from_similarities(
+                components.query_vocab_sims, tag_csr, params.penalty_threshold, params.penalty_factor
+            )
 
-        # 2. DB에서 tb_ptfo_tag_merged 테이블 조회하여 각 포폴의 태그 리스트 매핑 생성
-        db = next(get_db())
-        tag_rows = db.query(PtfoTagMerged).all()
-        portfolio_tag_mapping = {}
-        for row in tag_rows:
-            portfolio_tag_mapping.setdefault(row.PTFO_SEQNO, []).append(row.TAG_NM)
+        #############################
+        # 3-3. 최종 점수 산출 및 정렬
+        #############################
+        final_scores = params.alpha * components.text_similarities + params.beta * tag_scores
+        if components.lexical_scores is not None:
+            final_scores += EnvVariables.LEXICAL_WEIGHT * components.lexical_scores
+
+        # 최종 점수 내림차순으로 요청된 구간만 부분 선택 (전체 정렬 없이 argpartition)
+        with timed("select"):
+            selected = select_top_k(final_scores, request.top_k, request.offset, request.min_score)
 
-        # 3. 임베딩 모델 초기화 (텍스트 및 태그 모두 동일 모델 사용)
-        embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        # 반환할 행만 DTO 로 변환
+        explainer = TagMatchExplainer(request.tags, components.query_vocab_sims, tag_csr, params) \
+            if request.explain else None
+        with timed("serialize"):
+            return SearchService._to_response(
+                components.state, components.tag_mapping, components.rows, selected, final_scores,
+                components.text_similarities, tag_scores, components.lexical_scores, explainer,
+            )
+
+    @staticmethod
+    def score_components(
+        request: SearchDTO.PtfoSearchReqDTO,
+        candidates: Optional[CandidateSet] = None,
+    ) -> ScoreComponents:
+        """
+        ptfo_search 의 1~3-1, 3-3(어휘) 단계입니다. 채점 대상 행과 가중치·벌점과 무관한 점수 구성 요소를 계산합니다.
+        랭킹 파라미터를 바꿔 가며 같은 요청을 다시 채점할 때(preprocess.tune_ranking) 이 결과를 재사용합니다.
+        """
+        # 1. 상주 검색 엔진에서 현재 스냅샷 참조 (요청 도중 교체되어도 이 스냅샷을 계속 사용)
+        engine = SearchEngine.get_instance()
+        with timed("artifact"):
+            state = engine.state
+
+        # 2. 메모리에 캐시된 포폴→태그 매핑 스냅샷 참조 (검색 요청마다 DB 를 조회하지 않음)
+        with timed("tag_mapping"):
+            tag_mapping = TagMappingStore.get_instance().snapshot
+
+        # 3. 요약과 어휘에 없는 태그를 한 번에 인코딩(정규화). 어휘에 있는 태그는 유사도 표를 조회하므로 인코딩하지 않으며,
+        #    캐시에 없는 문자열은 동시에 들어온 다른 요청과 묶어 한 번의 encode 로 처리됩니다.
+        tag_scorer = engine.tag_scorer
+        query_tag_ids = tag_scorer.lookup(request.tags)
+        with timed("encode"):
+            query_embeddings = engine.query_encoder.encode(
+                [request.summary] + [tag for tag, tag_id in zip(request.tags, query_tag_ids) if tag_id < 0]
+            )
 
         #############################
-        # 3-1. 텍스트 유사도 계산 (FAISS)
+        # 3-1. 텍스트 유사도 계산
         #############################
-        # 포폴 임베딩 정규화
-        norm_portfolio_embeddings = portfolio_embeddings / np.linalg.norm(portfolio_embeddings, axis=1, keepdims=True)
-        d = norm_portfolio_embeddings.shape[1]
-        # FAISS 인덱스 (내적 기반 – 정규화된 벡터이면 내적=코사인 유사도)
-        index_text = faiss.IndexFlatIP(d)
-        index_text.add(norm_portfolio_embeddings)
         # 사용자 입력 요약 임베딩(정규화)
-        summary_embedding = embedding_model.encode([request.summary], convert_to_numpy=True)
-        summary_embedding = summary_embedding / np.linalg.norm(summary_embedding, axis=1, keepdims=True)
-        # 전체 포폴에 대해 k = 전체 개수 검색
-        k_text = len(portfolio_data)
-        D_text, I_text = index_text.search(summary_embedding, k_text)
-        # 각 포폴의 텍스트 유사도 점수 배열 생성 (내적 값이 높을수록 유사)
-        text_similarities = np.zeros(len(portfolio_data))
-        for rank, idx in enumerate(I_text[0]):
-            text_similarities[idx] = D_text[0][rank]
+        summary_embedding = query_embeddings[:1]
 
-        #############################
-        # 3-2. 태그 유사도 계산 (각 포폴별로 FAISS 사용)
-        #############################
-        if request.tags:
-            query_tag_embeddings = embedding_model.encode(request.tags, convert_to_numpy=True)
-            query_tag_embeddings = query_tag_embeddings / np.linalg.norm(query_tag_embeddings, axis=1, keepdims=True)
-        else:
-            query_tag_embeddings = np.array([])
-
-        # 벌점 적용 파라미터, 임계값 이하이면 factor 만큼 가중 벌점 적용
-        penalty_threshold = 0.5
-        penalty_factor = 3.0
-
-        tag_scores = []
-        for portfolio in portfolio_data:
-            ptfo_seqno = portfolio["PTFO_SEQNO"]
-            portfolio_tags = portfolio_tag_mapping.get(ptfo_seqno, [])
-            if not portfolio_tags or len(request.tags) == 0:
-                tag_score = 0.0
+        # 사용자 태그 × 태그 어휘 유사도 (어휘에 있는 태그는 유사도 표 조회)와 매핑 태그의 어휘 ID
+        with timed("tag_lookup"):
+            vocab_ids = tag_scorer.tag_ids(tag_mapping.tag_names)
+            query_vocab_sims = tag_scorer.query_similarities(query_tag_ids, query_embeddings[1:])
+
+        # 태그 사전 필터(선택): 태그→포폴 역색인으로 조건을 만족하는 포폴 행만 남깁니다.
+        with timed("prefilter"):
+            filter_rows = SearchService._prefilter_rows(state, tag_mapping, vocab_ids, query_vocab_sims, request)
+
+        # ANN 인덱스가 있으면 상위 ANN_CANDIDATES 개 후보만, 없으면 전체 포폴을 채점 대상으로 삼습니다.
+        # 사전 필터를 쓰면 필터를 통과한 포폴만 채점합니다 (_filtered_candidate_rows).
+        with timed("ann_search"):
+            if candidates is not None and candidates.generation == state.generation:
+                rows = candidates.rows if filter_rows is None else \
+                    np.intersect1d(candidates.rows, filter_rows, assume_unique=True)
+            elif filter_rows is not None:
+                rows = SearchService._filtered_candidate_rows(state, summary_embedding, filter_rows)
             else:
-                portfolio_tag_emb = embedding_model.encode(portfolio_tags, convert_to_numpy=True)
-                portfolio_tag_emb = portfolio_tag_emb / np.linalg.norm(portfolio_tag_emb, axis=1, keepdims=True)
-                d_tag = portfolio_tag_emb.shape[1]
-                index_tag = faiss.IndexFlatIP(d_tag)
-                index_tag.add(portfolio_tag_emb)
-                sims = []
-                for qt_emb in query_tag_embeddings:
-                    qt_emb = np.expand_dims(qt_emb, axis=0)
-                    D_tag, _ = index_tag.search(qt_emb, 1)  # k=1: 각 query tag 당 최고 유사도
-                    sim = D_tag[0][0]
-                    # 벌점 적용: 임계값 미만이면 벌점 차감
-                    if sim < penalty_threshold:
-                        sim_adjusted = sim - penalty_factor * (penalty_threshold - sim)
-                    else:
-                        sim_adjusted = sim
-                    sims.append(sim_adjusted)
-                tag_score = float(np.mean(sims))
-            tag_scores.append(tag_score)
-        tag_scores = np.array(tag_scores)
+                rows = SearchService._candidate_rows(state, summary_embedding)
 
-        #############################
-        # 3-3. 최종 점수 산출 및 정렬
-        #############################
-        alpha = 0.5
-        beta = 0.5
-        final_scores = alpha * text_similarities + beta * tag_scores
-
-        results = []
-        for i, portfolio in enumerate(portfolio_data):
-            res = portfolio.copy()
-            res["text_score"] = float(text_similarities[i])
-            res["tag_score"] = float(tag_scores[i])
-            res["final_score"] = float(final_scores[i])
-            res["tags"] = portfolio_tag_mapping.get(portfolio["PTFO_SEQNO"], [])
-            results.append(res)
-
-        # 최종 점수 내림차순 정렬
-        results_sorted = sorted(results, key=lambda x: x["final_score"], reverse=True)
+        # BM25 하이브리드(선택): 어휘 점수 상위 포폴을 채점 대상에 더합니다.
+        lexical_hits = None
+        if EnvVariables.LEXICAL_WEIGHT > 0 and state.lexical_index is not None:
+            with timed("lexical"):
+                lexical_hits = state.lexical_index.search(SearchService._lexical_query(request))
+                rows = SearchService._merge_lexical_rows(rows, lexical_hits, filter_rows)
+        # 정규화된 임베딩 행렬과 한 번에 내적합니다 (IndexFlatIP 와 동일한 코사인 유사도).
+        # ANN(PQ 등) 근사 점수 대신 저장된 벡터로 재채점합니다 (양자화 행렬이면 블록 단위로 역양자화하며 계산).
+        with timed("text_score"):
+            text_similarities = state.embeddings.dot(summary_embedding[0], rows).astype(np.float64)
+
+        return ScoreComponents(
+            state=state,
+            tag_mapping=tag_mapping,
+            rows=rows,
+            vocab_ids=vocab_ids,
+            query_vocab_sims=query_vocab_sims,
+            text_similarities=text_similarities,
+            lexical_scores=None if lexical_hits is None else lexical_hits.scores_for(rows, state.portfolio_count),
+        )
+
+    @staticmethod
+    def ptfo_search_batch(requests: List[SearchDTO.PtfoSearchReqDTO]) -> List[List[SearchDTO.PtfoSearchRespDTO]]:
+        """
+        여러 검색 요청을 한 번에 처리합니다 (오프라인 재랭킹용).
+        결과는 ptfo_search 를 요청마다 호출한 것과 float32 반올림 차이(1e-7) 이내로 같습니다.
+        - 모든 요약과 태그 어휘에 없는 태그(중복 제거)를 한 번의 encode 로 임베딩합니다.
+        - ANN 인덱스가 있으면 요약 행렬 하나로 후보를 검색합니다.
+        - 텍스트/태그 점수를 (요청 수 × 포폴 수) 행렬 연산으로 계산합니다. BM25 점수는 요청별로 역색인에서 구합니다.
+          행렬 크기가 SEARCH_BATCH_MAX_CELLS 를 넘지 않도록 요청을 나눠 처리합니다.
+        """
+        if not requests:
+            return []
+        engine = SearchEngine.get_instance()
+        state = engine.state
+        tag_mapping = TagMappingStore.get_instance().snapshot
+
+        tag_scorer = engine.tag_scorer
+        query_tags = [tag for request in requests for tag in request.tags]
+        query_tag_ids = tag_scorer.lookup(query_tags)
+        oov_tags = [tag for tag, tag_id in zip(query_tags, query_tag_ids) if tag_id < 0]
+        with timed("batch_encode"):
+            texts = list(dict.fromkeys([request.summary for request in requests] + oov_tags))
+            embeddings = engine.query_encoder.encode(texts)
+        row_of = {text: i for i, text in enumerate(texts)}
+        summary_embeddings = embeddings[[row_of[request.summary] for request in requests]]
+        tag_counts = [len(request.tags) for request in requests]
+        tag_indptr = np.zeros(len(requests) + 1, dtype=np.int64)
+        np.cumsum(tag_counts, out=tag_indptr[1:])
 
+        # 요청별 랭킹 파라미터. 가중치는 요청 행별로, 벌점은 사용자 태그 행별로 펼쳐 한 번에 적용합니다.
+        params = [RankingParams.resolve(request) for request in requests]
+        alphas = np.array([p.alpha for p in params], dtype=np.float64)
+        betas = np.array([p.beta for p in params], dtype=np.float64)
+        penalty_thresholds = np.repeat([p.penalty_threshold for p in params], tag_counts)
+        penalty_factors = np.repeat([p.penalty_factor for p in params], tag_counts)
+
+        vocab_ids = tag_scorer.tag_ids(tag_mapping.tag_names)
+        # 모든 요청의 사용자 태그 × 태그 어휘 유사도 (T, V). 어휘에 있는 태그는 유사도 표 조회입니다.
+        query_vocab_sims = tag_scorer.query_similarities(query_tag_ids, embeddings[[row_of[tag] for tag in oov_tags]])
+
+        with timed("batch_ann_search"):
+            candidate_rows = SearchService._candidate_rows_many(state, summary_embeddings)
+        # 태그 사전 필터를 쓰는 요청은 필터를 통과한 행만 후보로 삼습니다 (ptfo_search 와 동일).
+        with timed("batch_prefilter"):
+            filter_rows = [
+                SearchService._prefilter_rows(
+                    state, tag_mapping, vocab_ids,
+                    None if query_vocab_sims is None else query_vocab_sims[tag_indptr[b]:tag_indptr[b + 1]],
+                    request,
+                )
+                for b, request in enumerate(requests)
+            ]
+            filtered = any(rows is not None for rows in filter_rows)
+            if filtered:
+                all_rows = np.arange(state.portfolio_count, dtype=np.int64)
+                candidate_rows = [
+                    SearchService._filtered_candidate_rows(state, summary_embeddings[b:b + 1], rows)
+                    if rows is not None else all_rows if candidate_rows is None else candidate_rows[b]
+                    for b, rows in enumerate(filter_rows)
+                ]
+
+        # BM25 하이브리드(선택): 요청별 어휘 점수 상위 포폴을 후보에 더합니다 (ptfo_search 와 동일).
+        lexical_hits = None
+        if EnvVariables.LEXICAL_WEIGHT > 0 and state.lexical_index is not None:
+            with timed("batch_lexical"):
+                lexical_hits = [state.lexical_index.search(SearchService._lexical_query(request))
+                                for request in requests]
+                if candidate_rows is not None:
+                    candidate_rows = [
+                        SearchService._merge_lexical_rows(rows, hits, filter_rows[b])
+                        for b, (rows, hits) in enumerate(zip(candidate_rows, lexical_hits))
+                    ]
+
+        # 블록당 (요청 수 × 채점 포폴 수) 가 SEARCH_BATCH_MAX_CELLS 이하가 되도록 나눕니다.
+        # ANN 후보 합집합은 요청 수 × (ANN_CANDIDATES + BM25 후보) 를 넘지 않으므로 B² × k ≤ cells 도 안전합니다.
+        max_cells = EnvVariables.SEARCH_BATCH_MAX_CELLS
+        block_size = max_cells // max(state.portfolio_count, 1)
+        if candidate_rows is not None and not filtered:
+            per_request = EnvVariables.ANN_CANDIDATES + (EnvVariables.LEXICAL_CANDIDATES if lexical_hits else 0)
+            block_size = max(block_size, math.isqrt(max_cells // per_request))
+        block_size = max(block_size, 1)
+        results: List[List[SearchDTO.PtfoSearchRespDTO]] = []
+        for start in range(0, len(requests), block_size):
+            end = min(start + block_size, len(requests))
+            # 블록 안 요청들의 후보 합집합만 채점합니다 (ANN 이 없으면 전체 포폴).
+            rows = None if candidate_rows is None else np.unique(np.concatenate(candidate_rows[start:end]))
+            block_seqnos = state.ptfo_seqnos if rows is None else state.ptfo_seqnos[rows]
+
+            with timed("batch_text_score"):
+                text_similarities = state.embeddings.dot_many(summary_embeddings[start:end], rows).astype(np.float64)
+            with timed("batch_tag_score"):
+                tag_csr = tag_mapping.csr_for(block_seqnos, vocab_ids)
+                tag_scores = TagScorer.score_many_from_similarities(
+                    None if query_vocab_sims is None else query_vocab_sims[tag_indptr[start]:tag_indptr[end]],
+                    tag_indptr[start:end + 1] - tag_indptr[start], tag_csr,
+                    penalty_thresholds[tag_indptr[start]:tag_indptr[end]],
+                    penalty_factors[tag_indptr[start]:tag_indptr[end]],
+                )
+            final_scores = alphas[start:end, None] * text_similarities + betas[start:end, None] * tag_scores
+            lexical_scores = None
+            if lexical_hits is not None:
+                lexical_scores = np.stack([hits.scores_for(rows, state.portfolio_count)
+                                           for hits in lexical_hits[start:end]])
+                final_scores += EnvVariables.LEXICAL_WEIGHT * lexical_scores
+
+            with timed("batch_select"):
+                for b, request in enumerate(requests[start:end]):
+                    # 각 요청은 자기 ANN 후보 안에서만 순위를 매깁니다 (ptfo_search 와 동일).
+                    positions = None if rows is None else np.searchsorted(rows, candidate_rows[start + b])
+                    scores = final_scores[b] if positions is None else final_scores[b, positions]
+                    selected = select_top_k(scores, request.top_k, request.offset, request.min_score)
+                    explainer = None
+                    if request.explain:
+                        tag_start, tag_end = tag_indptr[start + b], tag_indptr[start + b + 1]
+                        explainer = TagMatchExplainer(
+                            request.tags,
+                            None if query_vocab_sims is None or tag_end == tag_start
+                            else query_vocab_sims[tag_start:tag_end],
+                            tag_csr, params[start + b],
+                        )
+                    results.append(SearchService._to_response(
+                        state, tag_mapping, rows, selected if positions is None else positions[selected],
+                        final_scores[b], text_similarities[b], tag_scores[b],
+                        None if lexical_scores is None else lexical_scores[b], explainer,
+                    ))
+        return results
+
+    @staticmethod
+    def _to_response(
+        state: SearchEngineState,
+        tag_mapping: TagMappingSnapshot,
+        rows: Optional[np.ndarray],
+        selected: np.ndarray,
+        final_scores: np.ndarray,
+        text_similarities: np.ndarray,
+        tag_scores: np.ndarray,
+        lexical_scores: Optional[np.ndarray] = None,
+        explainer: Optional[TagMatchExplainer] = None,
+    ) -> List[SearchDTO.PtfoSearchRespDTO]:
+        """
+        점수 배열의 selected 위치를 DTO 로 변환합니다. rows 가 있으면 위치 i 는 포폴 행 rows[i] 입니다.
+        explainer 가 있으면 반환하는 포폴에 대해서만 explanation 을 계산합니다.
+        """
         ret: List[SearchDTO.PtfoSearchRespDTO] = []
-        for res in results_sorted:
+        for i in selected:
+            row = i if rows is None else rows[i]
+            ptfo_seqno = int(state.ptfo_seqnos[row])
+            tag_names = tag_mapping.tags_of(ptfo_seqno)
+            lexical_score = None if lexical_scores is None else float(lexical_scores[i])
             ret.append(SearchDTO.PtfoSearchRespDTO(
-                final_score=res["final_score"],
-                text_score=res["text_score"],
-                tag_score=res["tag_score"],
-                ptfo_seqno=res["PTFO_SEQNO"],
-                ptfo_nm=res["PTFO_NM"],
-                ptfo_desc=res["PTFO_DESC"],
-                tag_names=res["tags"]
+                final_score=float(final_scores[i]),
+                text_score=float(text_similarities[i]),
+                tag_score=float(tag_scores[i]),
+                lexical_score=lexical_score,
+                ptfo_seqno=ptfo_seqno,
+                ptfo_nm=state.ptfo_names[row],
+                ptfo_desc=state.ptfo_descs[row],
+                tag_names=tag_names,
+                explanation=None if explainer is None else explainer.explain(
+                    i, tag_names, float(text_similarities[i]), float(tag_scores[i]), lexical_score
+                ),
             ))
-        return ret
\ No newline at end of file
+        return ret
+
+    @staticmethod
+    def _candidate_rows(state: SearchEngineState, summary_embedding: np.ndarray) -> Optional[np.ndarray]:
+        """
+        ANN 인덱스로 텍스트 유사도 상위 후보 행 번호를 가져옵니다.
+        ANN 인덱스가 없거나 후보 수가 전체 포폴 수 이상이면 None(전체 채점)을 반환합니다.
+        """
+        candidate_rows = SearchService._candidate_rows_many(state, summary_embedding)
+        return None if candidate_rows is None else candidate_rows[0]
+
+    @staticmethod
+    def _candidate_rows_many(state: SearchEngineState, summary_embeddings: np.ndarray) -> Optional[List[np.ndarray]]:
+        """요약 행렬(Q, d) 한 번의 ANN 검색으로 요청별 후보 행 번호(정렬됨)를 가져옵니다."""
+        k = EnvVariables.ANN_CANDIDATES
+        if state.ann_index is None or k >= state.portfolio_count:
+            return None
+        _, I = state.ann_index.search(np.ascontiguousarray(summary_embeddings, dtype=np.float32), k)
+        return [np.sort(candidates[candidates >= 0]) for candidates in I]
+
+    @staticmethod
+    def _lexical_query(request: SearchDTO.PtfoSearchReqDTO) -> str:
+        """BM25 쿼리 텍스트: 요약과 태그 (전처리는 LexicalIndex.search 에서)."""
+        return " ".join([request.summary] + [str(tag) for tag in request.tags])
+
+    @staticmethod
+    def _merge_lexical_rows(rows: Optional[np.ndarray], lexical_hits: LexicalHits,
+                            filter_rows: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        """
+        채점 대상 행(rows)에 BM25 상위 LEXICAL_CANDIDATES 개 행을 더합니다 (오름차순).
+        rows 가 None(전체 채점)이면 그대로이고, 사전 필터가 있으면 필터를 통과한 행만 더합니다.
+        """
+        if rows is None:
+            return None
+        lexical_rows = lexical_hits.top_rows(EnvVariables.LEXICAL_CANDIDATES)
+        if filter_rows is not None:
+            lexical_rows = np.intersect1d(lexical_rows, filter_rows, assume_unique=True)
+        return np.union1d(rows, lexical_rows)
+
+    @staticmethod
+    def _prefilter_rows(
+        state: SearchEngineState,
+        tag_mapping: TagMappingSnapshot,
+        vocab_ids: np.ndarray,
+        query_vocab_sims: Optional[np.ndarray],
+        request: SearchDTO.PtfoSearchReqDTO,
+    ) -> Optional[np.ndarray]:
+        """
+        태그 사전 필터를 통과한 포폴 행 번호(오름차순). 필터를 쓰지 않으면 None 입니다.
+        - filter_tags: 이 태그 중 하나 이상을 가진 포폴
+        - min_tag_similarity (미지정 시 TAG_PREFILTER_THRESHOLD): 요청 태그 중 하나와 유사도가 이 값 이상인 태그를 가진 포폴.
+          요청 태그가 없으면 적용하지 않습니다.
+        둘 다 지정하면 두 조건을 모두 만족해야 합니다. 포폴 집합은 태그→PTFO_SEQNO 역색인에서 구합니다.
+        """
+        threshold = EnvVariables.TAG_PREFILTER_THRESHOLD if request.min_tag_similarity is None \
+            else request.min_tag_similarity
+        seqnos = None
+        if request.filter_tags:
+            seqnos = tag_mapping.seqnos_with_tags(tag_mapping.codes_of(request.filter_tags))
+        if threshold is not None and query_vocab_sims is not None and len(query_vocab_sims):
+            # 매핑 태그별로 요청 태그와의 최고 유사도
+            best = query_vocab_sims.max(axis=0)[vocab_ids]
+            similar = tag_mapping.seqnos_with_tags(np.flatnonzero(best >= threshold).tolist())
+            seqnos = similar if seqnos is None else np.intersect1d(seqnos, similar, assume_unique=True)
+        return None if seqnos is None else state.rows_for(seqnos)
+
+    @staticmethod
+    def _filtered_candidate_rows(state: SearchEngineState, summary_embedding: np.ndarray,
+                                 filter_rows: np.ndarray) -> np.ndarray:
+        """
+        사전 필터를 통과한 행 중 채점할 행 번호(오름차순).
+        PREFILTER_EXACT_MAX 이하이거나 ANN 인덱스가 없으면 전부를 부분 행렬 곱으로 정확히 채점하고,
+        초과하면 ANN 인덱스를 필터 안에서만 검색(IDSelector)하여 상위 ANN_CANDIDATES 개만 남깁니다.
+        """
+        k = EnvVariables.ANN_CANDIDATES
+        if state.ann_index is None or len(filter_rows) <= max(EnvVariables.PREFILTER_EXACT_MAX, k):
+            return filter_rows
+        from util.index_factory import search_subset  # ANN 인덱스가 있으면 faiss 는 이미 로드되어 있습니다.
+        _, I = search_subset(state.ann_index, summary_embedding, k, filter_rows)
+        return np.sort(I[0][I[0] >= 0])
+
+    @staticmethod
+    def retrieve_candidates(user_prompt: str, k: int) -> Optional[CandidateSet]:
+        """
+        LLM 요약을 기다리지 않고 원문 프롬프트 임베딩으로 텍스트 유사도 상위 k 개 후보를 가져옵니다.
+        ANN 인덱스가 있으면 인덱스로, 없으면 전체 내적 후 argpartition 으로 고릅니다.
+        태그 점수도 최종 점수의 절반을 차지하므로, 프롬프트에 태그명이 그대로 등장하면 그 태그를 가진 포폴도 후보에 더합니다.
+        k 가 전체 포폴 수 이상이면 후보를 줄일 이유가 없으므로 None 을 반환합니다.
+        """
+        engine = SearchEngine.get_instance()
+        state = engine.state
+        if k >= state.portfolio_count:
+            return None
+        query_embedding = engine.query_encoder.encode([user_prompt])
+        if state.ann_index is not None:
+            _, I = state.ann_index.search(np.ascontiguousarray(query_embedding, dtype=np.float32), k)
+            rows = I[0][I[0] >= 0]
+        else:
+            similarities = state.embeddings.dot(query_embedding[0])
+            rows = np.argpartition(-similarities, k - 1)[:k]
+
+        tag_mapping = TagMappingStore.get_instance().snapshot
+        prompt_tags = [code for code, tag in enumerate(tag_mapping.tag_names) if tag in user_prompt]
+        if prompt_tags:
+            tagged_rows = np.flatnonzero(np.isin(state.ptfo_seqnos, tag_mapping.seqnos_with_tags(prompt_tags)))
+            rows = np.union1d(rows, tagged_rows)
+        return CandidateSet(generation=state.generation, rows=np.sort(rows))
\ No newline at end of file
@@ -0,0 +1,120 @@
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from constants.env_variables import EnvVariables
+from schema.search_dto import SearchDTO
+from service.search_engine import SearchEngine
+from service.search_service import CandidateSet, SearchService
+from util.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+
+class SpeculativeSearch:
+    """
+    LLM 요약과 겹쳐서 실행하는 speculative 검색입니다 (RankService 의 pipelined 모드).
+
+    1. LLM 호출과 동시에 원문 user_prompt 임베딩으로 넉넉한 후보 집합(retrieve)을 뽑아 둡니다.
+    2. 요약/태그가 도착하면 후보 집합만 기존 텍스트/태그 점수로 재채점(search)합니다.
+    3. 후보가 요청 구간(offset + top_k)보다 적거나, 재채점 결과가 top_k 를 채우지 못하면 전체 검색으로 대체합니다.
+
+    verify_rate 비율의 요청은 백그라운드 스레드에서 전체 검색도 수행하여,
+    전체 검색의 최종 top-k 가 후보 집합에 모두 포함되었는지(containment)와 포함 비율(recall)을 집계합니다.
+    """
+    _instance: Optional["SpeculativeSearch"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, candidates: int, oversample: int, verify_rate: float):
+        self.candidates = candidates
+        self.oversample = oversample
+        self.verify_rate = verify_rate
+        self.requests = 0
+        self.rescored = 0  # 후보 집합만 재채점한 요청 수
+        self.fallbacks = 0  # 전체 검색으로 대체한 요청 수
+        self.verified = 0
+        self.contained = 0  # 전체 검색 top-k 가 후보 집합에 모두 포함된 검증 수
+        self.recall_sum = 0.0
+        self._lock = threading.Lock()
+        # 검증은 응답 지연에 영향이 없도록 별도 스레드 하나에서, 밀려 있으면 건너뜁니다.
+        self._verifier = ThreadPoolExecutor(max_workers=1, thread_name_prefix="speculative-verify")
+        self._verifying = threading.Semaphore(1)
+
+    @classmethod
+    def get_instance(cls) -> "SpeculativeSearch":
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls(
+                        candidates=EnvVariables.SPECULATIVE_CANDIDATES,
+                        oversample=EnvVariables.SPECULATIVE_OVERSAMPLE,
+                        verify_rate=EnvVariables.SPECULATIVE_VERIFY_RATE,
+                    )
+        return cls._instance
+
+    def candidate_count(self, top_k: int, offset: int) -> int:
+        return max(self.candidates, (offset + top_k) * self.oversample)
+
+    @timed("speculative_retrieve")
+    def retrieve(self, user_prompt: str, top_k: int, offset: int) -> Optional[CandidateSet]:
+        """LLM 호출과 동시에 실행합니다. 후보를 줄일 필요가 없는 작은 카탈로그면 None 입니다."""
+        return SearchService.retrieve_candidates(user_prompt, self.candidate_count(top_k, offset))
+
+    def search(self, request: SearchDTO.PtfoSearchReqDTO,
+               candidates: Optional[CandidateSet]) -> List[SearchDTO.PtfoSearchRespDTO]:
+        """후보 집합만 재채점하고, 후보가 부족하면 전체 검색으로 대체합니다."""
+        with self._lock:
+            self.requests += 1
+        if candidates is not None and len(candidates.rows) >= request.offset + request.top_k \
+                and candidates.generation == SearchEngine.get_instance().state.generation:
+            results = SearchService.ptfo_search(request, candidates)
+            if len(results) >= request.top_k:
+                with self._lock:
+                    self.rescored += 1
+                if self.verify_rate > 0 and random.random() < self.verify_rate:
+                    self._verify_later(request, candidates)
+                return results
+
+        with self._lock:
+            self.fallbacks += 1
+        return SearchService.ptfo_search(request)
+
+    def _verify_later(self, request: SearchDTO.PtfoSearchReqDTO, candidates: CandidateSet):
+        if not self._verifying.acquire(blocking=False):
+            return
+        future = self._verifier.submit(self._verify, request, candidates)
+        future.add_done_callback(lambda _: self._verifying.release())
+
+    def _verify(self, request: SearchDTO.PtfoSearchReqDTO, candidates: CandidateSet):
+        try:
+            state = SearchEngine.get_instance().state
+            if state.generation != candidates.generation:
+                return
+            final_seqnos = {result.ptfo_seqno for result in SearchService.ptfo_search(request)}
+            candidate_seqnos = set(state.ptfo_seqnos[candidates.rows].tolist())
+            hits = len(final_seqnos & candidate_seqnos)
+            with self._lock:
+                self.verified += 1
+                self.contained += hits == len(final_seqnos)
+                self.recall_sum += hits / len(final_seqnos) if final_seqnos else 1.0
+        except Exception:
+            logger.exception("speculative search verification failed")
+
+    def wait_for_verification(self):
+        """진행 중인 검증이 끝날 때까지 기다립니다."""
+        with self._verifying:
+            pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "rescored": self.rescored,
+                "fallbacks": self.fallbacks,
+                "verified": self.verified,
+                "contained": self.contained,
+                "containment_rate": round(self.contained / self.verified, 4) if self.verified else None,
+                "mean_recall": round(self.recall_sum / self.verified, 4) if self.verified else None,
+            }
@@ -0,0 +1,202 @@
+import re
+import time
+import json
+import asyncio
+import sqlite3
+import hashlib
+import logging
+import threading
+import unicodedata
+from typing import Awaitable, Callable, Dict, Optional
+
+from constants.env_variables import EnvVariables
+from util.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_prompt(prompt: str) -> str:
+    """유니코드 정규화(NFKC), 대소문자 통일, 공백 정리. 표기만 다른 같은 요청이 같은 키를 갖도록 합니다."""
+    prompt = unicodedata.normalize("NFKC", prompt).casefold()
+    return re.sub(r"\s+", " ", prompt).strip()
+
+
+def summary_namespace(model: str, system_prompt: str) -> str:
+    """모델명 + 시스템 프롬프트 해시. 둘 중 하나라도 바뀌면 이전 캐시 항목은 더 이상 조회되지 않습니다."""
+    return hashlib.sha256(f"{model}\0{system_prompt}".encode("utf-8")).hexdigest()[:16]
+
+
+class SqliteSummaryStore:
+    """
+    재시작 후에도 유지되는 SQLite 요약 캐시 계층입니다.
+    namespace 가 현재와 다르거나 TTL 이 지난 행은 namespace 를 처음 사용할 때 삭제합니다.
+    """
+
+    def __init__(self, path: str, ttl: float):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS summary_cache ("
+            " cache_key TEXT PRIMARY KEY, namespace TEXT NOT NULL, value TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM summary_cache WHERE cache_key = ? AND created_at > ?",
+                (key, time.time() - self.ttl),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, namespace: str, value: dict):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summary_cache (cache_key, namespace, value, created_at) VALUES (?, ?, ?, ?)",
+                (key, namespace, json.dumps(value, ensure_ascii=False), time.time()),
+            )
+            self._conn.commit()
+
+    def purge(self, namespace: str) -> int:
+        """다른 namespace(이전 모델/시스템 프롬프트)와 만료된 행을 삭제하고 삭제 건수를 반환합니다."""
+        with self._lock:
+            deleted = self._conn.execute(
+                "DELETE FROM summary_cache WHERE namespace != ? OR created_at <= ?",
+                (namespace, time.time() - self.ttl),
+            ).rowcount
+            self._conn.commit()
+        return deleted
+
+
+class SummaryCache:
+    """
+    LLM 요약 결과 캐시입니다. 키는 (모델명 + 시스템 프롬프트 해시, 정규화된 사용자 프롬프트) 입니다.
+    프로세스 내 LRU+TTL 캐시를 먼저 보고, 설정된 경우 SQLite 계층을 봅니다.
+    async 경로(aget/aset, get_or_create)에서는 SQLite 조회/저장을 스레드에서 실행하고, 메모리 계층은 그대로 동기로 봅니다.
+    같은 키의 요청이 동시에 들어오면 LLM 호출은 한 번만 하고 결과를 공유합니다.
+    """
+    _instance: Optional["SummaryCache"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, maxsize: int, ttl: float, db_path: Optional[str] = None, disk_ttl: Optional[float] = None):
+        self.memory = TTLCache(maxsize, ttl)
+        self.store = SqliteSummaryStore(db_path, disk_ttl or ttl) if db_path else None
+        self.disk_hits = 0
+        self.disk_misses = 0
+        self._purged_namespaces = set()
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    @classmethod
+    def get_instance(cls) -> "SummaryCache":
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls(
+                        maxsize=EnvVariables.SUMMARY_CACHE_SIZE,
+                        ttl=EnvVariables.SUMMARY_CACHE_TTL,
+                        db_path=EnvVariables.SUMMARY_CACHE_DB_PATH,
+                        disk_ttl=EnvVariables.SUMMARY_CACHE_DISK_TTL,
+                    )
+        return cls._instance
+
+    @property
+    def enabled(self) -> bool:
+        return self.memory.maxsize > 0 or self.store is not None
+
+    @staticmethod
+    def key(namespace: str, prompt: str) -> str:
+        return namespace + ":" + hashlib.sha256(normalize_prompt(prompt).encode("utf-8")).hexdigest()
+
+    def get(self, namespace: str, prompt: str) -> Optional[dict]:
+        key = self.key(namespace, prompt)
+        value = self.memory.get(key)
+        if value is not None or self.store is None:
+            return value
+        return self._remember(key, self._load(namespace, key))
+
+    async def aget(self, namespace: str, prompt: str) -> Optional[dict]:
+        """get() 과 같지만 SQLite 조회(첫 조회 시 purge 포함)는 이벤트 루프를 막지 않도록 스레드에서 실행합니다."""
+        key = self.key(namespace, prompt)
+        value = self.memory.get(key)
+        if value is not None or self.store is None:
+            return value
+        return self._remember(key, await asyncio.to_thread(self._load, namespace, key))
+
+    def _load(self, namespace: str, key: str) -> Optional[dict]:
+        """SQLite 계층에서 조회합니다. namespace 를 처음 사용할 때 이전 namespace 와 만료된 행을 삭제합니다."""
+        if namespace not in self._purged_namespaces:
+            self._purged_namespaces.add(namespace)
+            deleted = self.store.purge(namespace)
+            if deleted:
+                logger.info("summary cache: purged %d stale entries", deleted)
+        return self.store.get(key)
+
+    def _remember(self, key: str, value: Optional[dict]) -> Optional[dict]:
+        """디스크 조회 결과를 통계에 반영하고, 적중했으면 메모리 캐시에 올립니다."""
+        if value is None:
+            self.disk_misses += 1
+            return None
+        self.disk_hits += 1
+        self.memory.set(key, value)
+        return value
+
+    def contains(self, namespace: str, prompt: str) -> bool:
+        """메모리 캐시에 결과가 있는지만 확인합니다 (통계에 반영하지 않고, 디스크는 조회하지 않음)."""
+        return self.key(namespace, prompt) in self.memory
+
+    def set(self, namespace: str, prompt: str, value: dict):
+        key = self.key(namespace, prompt)
+        self.memory.set(key, value)
+        if self.store is not None:
+            self.store.set(key, namespace, value)
+
+    async def aset(self, namespace: str, prompt: str, value: dict):
+        """set() 과 같지만 SQLite 저장(commit)은 스레드에서 실행합니다."""
+        key = self.key(namespace, prompt)
+        self.memory.set(key, value)
+        if self.store is not None:
+            await asyncio.to_thread(self.store.set, key, namespace, value)
+
+    async def get_or_create(self, namespace: str, prompt: str, factory: Callable[[], Awaitable[dict]]) -> dict:
+        """
+        캐시에 있으면 바로 반환하고, 없으면 factory()(LLM 호출) 결과를 저장 후 반환합니다.
+        실패한 결과는 캐시하지 않습니다.
+        """
+        if not self.enabled:
+            return await factory()
+        value = await self.aget(namespace, prompt)
+        if value is not None:
+            return value
+
+        key = self.key(namespace, prompt)
+        task = self._inflight.get(key)
+        if task is None:
+            async def create() -> dict:
+                try:
+                    created = await factory()
+                    await self.aset(namespace, prompt, created)
+                    return created
+                finally:
+                    self._inflight.pop(key, None)
+
+            task = asyncio.ensure_future(create())
+            self._inflight[key] = task
+        # 먼저 온 요청이 취소되어도 같은 키를 기다리는 다른 요청의 LLM 호출은 계속되도록 shield
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        disk_total = self.disk_hits + self.disk_misses
+        return {
+            "memory": self.memory.stats(),
+            "disk": None if self.store is None else {
+                "path": self.store.path,
+                "hits": self.disk_hits,
+                "misses": self.disk_misses,
+                "hit_rate": round(self.disk_hits / disk_total, 4) if disk_total else None,
+            },
+            "inflight": len(self._inflight),
+        }
@@ -0,0 +1,283 @@
+import os
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import func
+
+from constants.env_variables import EnvVariables
+from model.ptfo_tag_merged import PtfoTagMerged
+from service.tag_scorer import PortfolioTagCSR
+from util.artifact_store import StringColumn, current_generation, read_array_artifact, write_array_artifact
+from util.database import SessionLocal
+from util.loader_lock import LoaderLock
+from util.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+TAG_MAPPING_ARTIFACT = "tag_mapping"
+LOADER_LOCK_FILE = ".loader.lock"
+
+
+@dataclass(frozen=True)
+class TagMappingSnapshot:
+    """
+    tb_ptfo_tag_merged 의 (PTFO_SEQNO, TAG_NM) 을 압축 배열로 보관하는 한 시점의 스냅샷입니다.
+    포폴 i(ptfo_seqnos 정렬 순서)의 태그는 tag_names[tag_codes[indptr[i]:indptr[i + 1]]] 입니다.
+    역색인: 태그 c 를 가진 PTFO_SEQNO 는 posting_seqnos[posting_indptr[c]:posting_indptr[c + 1]] (오름차순) 입니다.
+    """
+    version: Tuple  # 변경 감지용 (행 수, 최대 PTFO_SEQNO, 체크섬...)
+    ptfo_seqnos: np.ndarray  # 태그가 있는 PTFO_SEQNO, 오름차순, shape (P,)
+    indptr: np.ndarray  # shape (P + 1,)
+    tag_codes: np.ndarray  # tag_names 의 인덱스, shape (nnz,)
+    tag_names: List[str]  # 서로 다른 태그명
+    tag_code_of: Dict[str, int]  # 태그명 -> tag_names 인덱스
+    posting_indptr: np.ndarray  # shape (len(tag_names) + 1,)
+    posting_seqnos: np.ndarray  # 태그별로 모은 PTFO_SEQNO, shape (nnz,)
+
+    @property
+    def rows(self) -> int:
+        return len(self.tag_codes)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """write_array_artifact 로 게시할 배열들. 태그명은 UTF-8 바이트/오프셋 배열로 저장합니다."""
+        names = StringColumn.from_list(self.tag_names)
+        return {
+            "ptfo_seqnos": self.ptfo_seqnos,
+            "indptr": self.indptr,
+            "tag_codes": self.tag_codes,
+            "posting_indptr": self.posting_indptr,
+            "posting_seqnos": self.posting_seqnos,
+            "tag_name_offsets": names.offsets,
+            "tag_name_data": names.data,
+        }
+
+    @classmethod
+    def from_arrays(cls, version: Tuple, arrays: Dict[str, np.ndarray]) -> "TagMappingSnapshot":
+        """게시된 배열(mmap)로 스냅샷을 만듭니다. 배열은 복사하지 않고, 태그명(V 개)만 파이썬 문자열로 읽습니다."""
+        tag_names = StringColumn(arrays["tag_name_offsets"], arrays["tag_name_data"]).tolist()
+        return cls(
+            version=version,
+            ptfo_seqnos=arrays["ptfo_seqnos"],
+            indptr=arrays["indptr"],
+            tag_codes=arrays["tag_codes"],
+            tag_names=tag_names,
+            tag_code_of={name: code for code, name in enumerate(tag_names)},
+            posting_indptr=arrays["posting_indptr"],
+            posting_seqnos=arrays["posting_seqnos"],
+        )
+
+    def _positions(self, seqnos: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """seqnos 각각의 스냅샷 내 위치와 존재 여부."""
+        if len(self.ptfo_seqnos) == 0:
+            return np.zeros(len(seqnos), dtype=np.int64), np.zeros(len(seqnos), dtype=bool)
+        pos = np.minimum(np.searchsorted(self.ptfo_seqnos, seqnos), len(self.ptfo_seqnos) - 1)
+        return pos, self.ptfo_seqnos[pos] == seqnos
+
+    def tags_of(self, ptfo_seqno: int) -> List[str]:
+        pos, found = self._positions(np.array([ptfo_seqno], dtype=np.int64))
+        if not found[0]:
+            return []
+        codes = self.tag_codes[self.indptr[pos[0]]:self.indptr[pos[0] + 1]]
+        return [self.tag_names[code] for code in codes.tolist()]
+
+    def codes_of(self, tag_names: Sequence[str]) -> List[int]:
+        """태그명들의 tag_names 인덱스. 매핑에 없는 태그는 제외합니다."""
+        return [self.tag_code_of[name] for name in tag_names if name in self.tag_code_of]
+
+    def seqnos_with_tags(self, tag_codes: Sequence[int]) -> np.ndarray:
+        """tag_codes(tag_names 인덱스) 중 하나라도 가진 PTFO_SEQNO, 오름차순. 역색인의 해당 구간만 합칩니다."""
+        postings = [self.posting_seqnos[self.posting_indptr[code]:self.posting_indptr[code + 1]] for code in tag_codes]
+        if not postings:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate(postings))
+
+    def csr_for(self, seqnos: np.ndarray, vocab_ids: np.ndarray) -> PortfolioTagCSR:
+        """
+        seqnos 순서대로 포폴 태그 CSR 을 만듭니다. 포폴별 파이썬 리스트 없이 배열 연산만 사용합니다.
+
+        :param vocab_ids: tag_names 순서의 TagScorer 어휘 ID
+        """
+        pos, found = self._positions(np.asarray(seqnos, dtype=np.int64))
+        starts = np.where(found, self.indptr[pos], 0)
+        lengths = np.where(found, self.indptr[np.minimum(pos + 1, len(self.indptr) - 1)] - starts, 0)
+        indptr = np.zeros(len(seqnos) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        # 출력 위치 j 의 원본 위치 = 해당 포폴 시작 위치 + (j - 출력 시작 위치)
+        source = np.repeat(starts - indptr[:-1], lengths) + np.arange(indptr[-1], dtype=np.int64)
+        indices = np.asarray(vocab_ids, dtype=np.int64)[self.tag_codes[source]]
+        return PortfolioTagCSR(indptr=indptr, indices=indices)
+
+
+class TagMappingStore:
+    """
+    포폴→태그 매핑을 프로세스 메모리에 캐시합니다. 검색 요청은 DB 를 조회하지 않고 스냅샷만 참조합니다.
+    주기적으로(또는 reload 요청 시) 행 수/최대 PTFO_SEQNO/체크섬 집계 쿼리 한 번으로 변경을 확인하고,
+    바뀐 경우에만 (PTFO_SEQNO, TAG_NM) 두 컬럼을 다시 읽어 스냅샷을 교체합니다.
+
+    shared_dir 를 지정하면(TAG_MAPPING_SHARED) 같은 호스트의 worker 들이 스냅샷 하나를 공유합니다.
+    LoaderLock 을 얻은 worker(loader)만 DB 를 확인하고, 바뀌었으면 <shared_dir>/tag_mapping 에 새 generation 으로 게시합니다.
+    나머지 worker 는 CURRENT 가 가리키는 generation 을 읽기 전용 mmap 으로 붙기만 하므로 worker 당 추가 메모리가 거의 없고,
+    CURRENT 가 바뀌면 (generation 이름이 카운터 역할) 다음 확인 때 새 스냅샷으로 교체합니다.
+    """
+    _instance: Optional["TagMappingStore"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, session_factory=SessionLocal, shared_dir: Optional[str] = None):
+        self._session_factory = session_factory
+        self._snapshot: Optional[TagMappingSnapshot] = None
+        self._generation: Optional[str] = None  # 붙어 있는 게시 generation (공유 모드)
+        self._load_lock = threading.Lock()
+        self._shared_dir = shared_dir
+        self._loader_lock = (
+            LoaderLock(os.path.join(shared_dir, TAG_MAPPING_ARTIFACT, LOADER_LOCK_FILE)) if shared_dir else None
+        )
+
+    @classmethod
+    def get_instance(cls) -> "TagMappingStore":
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls(shared_dir=EnvVariables.ARTIFACTS_DIR if EnvVariables.TAG_MAPPING_SHARED else None)
+        return cls._instance
+
+    @property
+    def loaded(self) -> bool:
+        """매핑 스냅샷이 로드되었는지. 로드를 유발하지 않습니다."""
+        return self._snapshot is not None
+
+    @property
+    def snapshot(self) -> TagMappingSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self.load()
+        return snapshot
+
+    def stats(self) -> dict:
+        """현재 스냅샷의 크기 정보. 로드 전이면 None 이며, 이 호출로 로드를 유발하지 않습니다."""
+        snapshot = self._snapshot
+        loader = None if self._loader_lock is None else self._loader_lock.held
+        if snapshot is None:
+            return {"rows": None, "portfolios": None, "tags": None, "generation": None, "loader": loader}
+        return {
+            "rows": snapshot.rows,
+            "portfolios": len(snapshot.ptfo_seqnos),
+            "tags": len(snapshot.tag_names),
+            "generation": self._generation,
+            "loader": loader,
+        }
+
+    @staticmethod
+    def _query_version(db) -> Tuple:
+        """변경 감지용 집계. 테이블 전체를 읽어 오지 않고 DB 에서 집계 한 행만 받습니다."""
+        row = db.query(
+            func.count(),
+            func.max(PtfoTagMerged.PTFO_SEQNO),
+            func.sum(PtfoTagMerged.PTFO_SEQNO),
+            func.sum(PtfoTagMerged.TAG_SEQNO),
+            func.sum(func.length(PtfoTagMerged.TAG_NM)),
+        ).one()
+        return tuple(None if value is None else int(value) for value in row)
+
+    def load(self, force: bool = False) -> TagMappingSnapshot:
+        """
+        변경이 있으면(또는 force) 매핑을 다시 읽어 스냅샷을 교체하고, 현재 스냅샷을 반환합니다.
+        동시에 여러 요청이 첫 로드를 유발해도 실제 로드는 한 번만 수행됩니다.
+        공유 모드에서 force 는 loader 가 아니어도 DB 에서 읽어 게시합니다 (generation 교체는 원자적이라 동시에 게시해도 안전).
+        """
+        with self._load_lock:
+            if self._loader_lock is None:
+                return self._load_from_db(force)
+            if force or self._loader_lock.try_acquire():
+                return self._publish(force)
+            return self._attach()
+
+    def _load_from_db(self, force: bool) -> TagMappingSnapshot:
+        """DB 에서 읽어 이 프로세스 메모리에 스냅샷을 둡니다."""
+        with self._session_factory() as db:
+            version = self._query_version(db)
+            if not force and self._snapshot is not None and self._snapshot.version == version:
+                return self._snapshot
+            snapshot = self._read_snapshot(db, version)
+        self._snapshot = snapshot
+        self._generation = None
+        logger.info("tag mapping loaded: %d rows, %d portfolios, %d tags",
+                    snapshot.rows, len(snapshot.ptfo_seqnos), len(snapshot.tag_names))
+        return snapshot
+
+    def _publish(self, force: bool) -> TagMappingSnapshot:
+        """(loader) 게시된 버전과 DB 버전이 다르면(또는 force) 새 generation 으로 게시한 뒤 붙습니다."""
+        with self._session_factory() as db:
+            version = self._query_version(db)
+            generation = current_generation(self._shared_dir, TAG_MAPPING_ARTIFACT)
+            published = None if generation is None else read_array_artifact(
+                self._shared_dir, TAG_MAPPING_ARTIFACT, generation
+            )
+            if force or published is None or tuple(published.manifest["version"]) != version:
+                snapshot = self._read_snapshot(db, version)
+                generation = write_array_artifact(
+                    self._shared_dir, TAG_MAPPING_ARTIFACT, snapshot.to_arrays(),
+                    manifest_extra={"version": list(version)},
+                    keep_generations=EnvVariables.ARTIFACT_KEEP_GENERATIONS,
+                )
+                logger.info("tag mapping published: generation=%s, %d rows", generation, snapshot.rows)
+        return self._attach()
+
+    def _attach(self) -> TagMappingSnapshot:
+        """
+        게시된 CURRENT generation 을 mmap 으로 붙습니다. 이미 붙어 있는 generation 이면 그대로 반환합니다.
+        아직 게시된 것이 없으면 (첫 기동에서 loader 가 게시하기 전) DB 에서 직접 읽습니다.
+        """
+        generation = current_generation(self._shared_dir, TAG_MAPPING_ARTIFACT)
+        if generation is None:
+            return self._load_from_db(force=False)
+        if self._snapshot is not None and self._generation == generation:
+            return self._snapshot
+        artifact = read_array_artifact(self._shared_dir, TAG_MAPPING_ARTIFACT, generation)
+        snapshot = TagMappingSnapshot.from_arrays(tuple(artifact.manifest["version"]), artifact.arrays)
+        self._snapshot = snapshot
+        self._generation = generation
+        logger.info("tag mapping attached: generation=%s, %d rows, %d portfolios, %d tags",
+                    generation, snapshot.rows, len(snapshot.ptfo_seqnos), len(snapshot.tag_names))
+        return snapshot
+
+    @staticmethod
+    def _read_snapshot(db, version: Tuple) -> TagMappingSnapshot:
+        with timed("tag_mapping_load"):
+            rows = (
+                db.query(PtfoTagMerged.PTFO_SEQNO, PtfoTagMerged.TAG_NM)
+                .order_by(PtfoTagMerged.PTFO_SEQNO, PtfoTagMerged.TAG_SEQNO)
+                .all()
+            )
+            return TagMappingStore._build_snapshot(version, rows)
+
+    def refresh_if_changed(self, force: bool = False) -> bool:
+        """변경이 있으면(또는 force) 다시 로드합니다 (공유 모드의 loader 가 아닌 worker 는 새 게시만 확인). 교체했으면 True."""
+        previous = self._snapshot
+        return self.load(force) is not previous
+
+    @staticmethod
+    def _build_snapshot(version: Tuple, rows) -> TagMappingSnapshot:
+        rows = [row for row in rows if row.TAG_NM]
+        seqnos = np.array([row.PTFO_SEQNO for row in rows], dtype=np.int64)
+        code_by_name = {}
+        tag_codes = np.array([code_by_name.setdefault(row.TAG_NM, len(code_by_name)) for row in rows], dtype=np.int32)
+        # rows 는 PTFO_SEQNO 순으로 정렬되어 있으므로 값이 바뀌는 위치가 각 포폴의 시작입니다.
+        ptfo_seqnos, starts = np.unique(seqnos, return_index=True)
+        indptr = np.append(starts, len(seqnos)).astype(np.int64)
+        # 역색인: 태그 코드로 안정 정렬하면 태그별 구간 안에서 PTFO_SEQNO 오름차순이 유지됩니다.
+        posting_order = np.argsort(tag_codes, kind="stable")
+        posting_indptr = np.zeros(len(code_by_name) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(tag_codes, minlength=len(code_by_name)), out=posting_indptr[1:])
+        return TagMappingSnapshot(
+            version=version,
+            ptfo_seqnos=ptfo_seqnos,
+            indptr=indptr,
+            tag_codes=tag_codes,
+            tag_names=list(code_by_name),
+            tag_code_of=code_by_name,
+            posting_indptr=posting_indptr,
+            posting_seqnos=seqnos[posting_order],
+        )
@@ -0,0 +1,199 @@
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class PortfolioTagCSR:
+    """
+    포폴별 태그 목록을 CSR(ragged array) 형태로 보관합니다.
+    i 번째 포폴의 태그 어휘 ID 는 indices[indptr[i]:indptr[i + 1]] 입니다.
+    """
+    indptr: np.ndarray  # shape (N + 1,), int64
+    indices: np.ndarray  # shape (nnz,), int64, 태그 어휘 ID
+
+
+class TagScorer:
+    """
+    태그 유사도 점수를 전체 포폴에 대해 한 번의 NumPy 연산으로 계산합니다.
+    태그 어휘는 닫혀 있으므로(tb_tag_info 의 카테고리) 어휘 전체의 V×V 코사인 유사도 표를 보관하고,
+    포폴 태그는 어휘 ID 의 CSR 배열로, 어휘에 있는 사용자 태그는 표의 행 조회로 처리합니다.
+    preprocess 가 태그 artifact 에 저장한 유사도 표가 있으면 그대로 사용하고(from_table),
+    어휘에 없는 포폴 태그는 처음 볼 때 한 번만 임베딩하여 표를 확장합니다.
+    어휘에 없는 사용자 태그는 어휘에 넣지 않고 호출 측이 인코딩(쿼리 캐시)한 벡터로 유사도를 계산합니다.
+    """
+
+    def __init__(self, embedding_model):
+        self._model = embedding_model
+        self._lock = threading.Lock()
+        self._vocab: Dict[str, int] = {}
+        # (정규화된 어휘 임베딩 (V, d), 어휘 유사도 표 (V, V)) 를 함께 교체합니다.
+        self._table: Tuple[np.ndarray, np.ndarray] = (
+            np.zeros((0, 0), dtype=np.float32), np.zeros((0, 0), dtype=np.float32)
+        )
+        self.precomputed = 0  # artifact 에서 읽은 어휘 수
+        self.vocab_hits = 0  # 유사도 표에서 조회한 사용자 태그 수
+        self.oov_hits = 0  # 어휘에 없어 인코딩 벡터로 계산한 사용자 태그 수
+
+    @classmethod
+    def from_table(cls, embedding_model, names: Sequence[str], embeddings: np.ndarray,
+                   similarity: np.ndarray) -> "TagScorer":
+        """preprocess 가 저장한 태그 어휘(이름, 정규화 임베딩, 유사도 표)로 시작합니다. 중복 이름은 첫 행을 씁니다."""
+        scorer = cls(embedding_model)
+        vocab: Dict[str, int] = {}
+        for i, name in enumerate(names):
+            vocab.setdefault(name, i)
+        scorer._table = (embeddings, similarity)
+        scorer._vocab = vocab
+        scorer.precomputed = len(names)
+        return scorer
+
+    @property
+    def vocab_embeddings(self) -> np.ndarray:
+        """정규화된 태그 어휘 임베딩, shape (V, d)."""
+        return self._table[0]
+
+    @property
+    def similarity(self) -> np.ndarray:
+        """태그 어휘 코사인 유사도 표, shape (V, V)."""
+        return self._table[1]
+
+    def tag_ids(self, tags: Sequence[str]) -> np.ndarray:
+        """태그 문자열을 어휘 ID 로 변환합니다. 처음 보는 태그는 한 번의 encode 로 모아서 임베딩하고 표를 확장합니다."""
+        new_tags = [tag for tag in dict.fromkeys(tags) if tag not in self._vocab]
+        if new_tags:
+            with self._lock:
+                new_tags = [tag for tag in new_tags if tag not in self._vocab]
+                if new_tags:
+                    emb = self._model.encode(new_tags, convert_to_numpy=True).astype(np.float32)
+                    emb = emb / np.linalg.norm(emb, axis=1, keepdims=True)
+                    vocab = dict(self._vocab)
+                    for tag in new_tags:
+                        vocab[tag] = len(vocab)
+                    # 표와 임베딩을 먼저 교체한 뒤 어휘를 공개해야, 어휘에 보이는 ID 는 항상 표에 존재합니다.
+                    self._table = self._extend_table(*self._table, emb)
+                    self._vocab = vocab
+        vocab = self._vocab
+        return np.array([vocab[tag] for tag in tags], dtype=np.int64)
+
+    @staticmethod
+    def _extend_table(embeddings: np.ndarray, similarity: np.ndarray,
+                      new_embeddings: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """새 태그 임베딩을 붙이고, 새 행/열의 유사도만 계산하여 표를 확장합니다."""
+        if not embeddings.size:
+            return new_embeddings, new_embeddings @ new_embeddings.T
+        n_old = len(embeddings)
+        all_embeddings = np.vstack([embeddings, new_embeddings])
+        new_rows = new_embeddings @ all_embeddings.T
+        table = np.empty((len(all_embeddings), len(all_embeddings)), dtype=np.float32)
+        table[:n_old, :n_old] = similarity
+        table[n_old:] = new_rows
+        table[:n_old, n_old:] = new_rows[:, :n_old].T
+        return all_embeddings, table
+
+    def lookup(self, tags: Sequence[str]) -> np.ndarray:
+        """사용자 태그의 어휘 ID. 어휘에 없는 태그는 -1 이며, 인코딩하거나 어휘에 추가하지 않습니다."""
+        vocab = self._vocab
+        return np.array([vocab.get(tag, -1) for tag in tags], dtype=np.int64)
+
+    def query_similarities(self, query_tag_ids: np.ndarray, oov_embeddings: np.ndarray) -> Optional[np.ndarray]:
+        """
+        사용자 태그 × 태그 어휘 유사도 행렬 (T, V). 어휘에 있는 태그는 유사도 표의 행을 그대로 쓰고,
+        없는 태그(ID -1)는 순서대로 대응하는 oov_embeddings (정규화) 와 어휘 임베딩의 내적으로 계산합니다.
+        """
+        if len(query_tag_ids) == 0:
+            return None
+        embeddings, similarity = self._table
+        known = query_tag_ids >= 0
+        sims = np.empty((len(query_tag_ids), len(similarity)), dtype=np.float32)
+        sims[known] = similarity[query_tag_ids[known]]
+        if not known.all() and len(embeddings):
+            sims[~known] = oov_embeddings @ embeddings.T
+        n_known = int(known.sum())
+        self.vocab_hits += n_known
+        self.oov_hits += len(query_tag_ids) - n_known
+        return sims
+
+    def build_csr(self, tag_lists: List[List[str]]) -> PortfolioTagCSR:
+        """포폴 순서대로 나열된 태그 목록들로 CSR 을 만듭니다."""
+        lengths = np.array([len(tags) for tags in tag_lists], dtype=np.int64)
+        indptr = np.zeros(len(tag_lists) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        flat_tags = [tag for tags in tag_lists for tag in tags]
+        indices = self.tag_ids(flat_tags) if flat_tags else np.zeros(0, dtype=np.int64)
+        return PortfolioTagCSR(indptr=indptr, indices=indices)
+
+    def stats(self) -> dict:
+        return {
+            "vocabulary": len(self._table[1]),
+            "precomputed": self.precomputed,
+            "vocab_hits": self.vocab_hits,
+            "oov_hits": self.oov_hits,
+        }
+
+    @staticmethod
+    def score_from_similarities(
+        query_vocab_sims,
+        csr: PortfolioTagCSR,
+        penalty_threshold: float,
+        penalty_factor: float,
+    ) -> np.ndarray:
+        """사용자 태그 × 태그 어휘 유사도 행렬(Q, V)로부터 포폴별 태그 점수를 계산합니다."""
+        if query_vocab_sims is None or len(query_vocab_sims) == 0:
+            return np.zeros(len(csr.indptr) - 1, dtype=np.float64)
+        query_indptr = np.array([0, len(query_vocab_sims)], dtype=np.int64)
+        return TagScorer.score_many_from_similarities(
+            query_vocab_sims, query_indptr, csr, penalty_threshold, penalty_factor
+        )[0]
+
+    @staticmethod
+    def score_many_from_similarities(
+        query_vocab_sims,
+        query_indptr: np.ndarray,
+        csr: PortfolioTagCSR,
+        penalty_threshold,
+        penalty_factor,
+    ) -> np.ndarray:
+        """
+        사용자 태그 × 태그 어휘 유사도 행렬(T, V)과 요청별 태그 구간(query_indptr)으로 (B, N) 태그 점수를 계산합니다.
+        penalty_threshold / penalty_factor 는 전체 공통 값이거나 사용자 태그 행별 값(shape (T,))입니다.
+        """
+        n_portfolios = len(csr.indptr) - 1
+        tag_scores = np.zeros((len(query_indptr) - 1, n_portfolios), dtype=np.float64)
+        best, has_tags = TagScorer.best_similarities(query_vocab_sims, csr)
+        if best is None:
+            return tag_scores
+
+        # 벌점 적용: 임계값 미만이면 벌점 차감 (유사도 행렬과 같은 dtype 으로 계산)
+        penalty_threshold = np.asarray(penalty_threshold, dtype=best.dtype)
+        penalty_factor = np.asarray(penalty_factor, dtype=best.dtype)
+        if penalty_threshold.ndim:
+            penalty_threshold = penalty_threshold[:, None]
+        if penalty_factor.ndim:
+            penalty_factor = penalty_factor[:, None]
+        best = np.where(
+            best < penalty_threshold,
+            best - penalty_factor * (penalty_threshold - best),
+            best,
+        )
+        # 요청별로 자기 태그 행의 평균 (태그가 없는 요청은 0)
+        for b in range(len(query_indptr) - 1):
+            if query_indptr[b + 1] > query_indptr[b]:
+                tag_scores[b, has_tags] = best[query_indptr[b]:query_indptr[b + 1]].mean(axis=0)
+        return tag_scores
+
+    @staticmethod
+    def best_similarities(query_vocab_sims, csr: PortfolioTagCSR) -> Tuple[Optional[np.ndarray], np.ndarray]:
+        """
+        벌점 적용 전, 사용자 태그별로 포폴 태그 중 최고 유사도 (T, N') 와 태그가 있는 포폴 마스크 (N,).
+        N' 는 태그가 있는 포폴 수이며, 사용자 태그나 포폴 태그가 없으면 (None, 마스크) 입니다.
+        """
+        # 태그가 있는 포폴의 시작 위치만으로 reduceat 하면 빈 포폴 구간을 건너뛸 수 있습니다.
+        starts = csr.indptr[:-1]
+        has_tags = csr.indptr[1:] > starts
+        if query_vocab_sims is None or len(query_vocab_sims) == 0 or len(csr.indices) == 0:
+            return None, has_tags
+        # (T, nnz) -> 포폴 구간별 최댓값 (T, N')
+        return np.maximum.reduceat(query_vocab_sims[:, csr.indices], starts[has_tags], axis=1), has_tags
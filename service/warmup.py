@@ -0,0 +1,97 @@
+import time
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from service.llm_client import LLMClient
+from service.search_engine import SearchEngine
+from service.tag_mapping_store import TagMappingStore
+
+logger = logging.getLogger(__name__)
+
+# warm-up 인코딩에 쓰는 문장 (토크나이저/모델 첫 실행 비용을 요청 대신 미리 냅니다)
+WARMUP_TEXT = "브랜드 홍보 영상 촬영"
+# 실패한 검색 단계 재시도 간격(초): 처음 값에서 두 배씩 최대값까지
+RETRY_INITIAL_DELAY = 1.0
+RETRY_MAX_DELAY = 30.0
+
+
+class WarmUp:
+    """
+    서버 시작 시 무거운 모듈(torch, faiss, ollama)과 검색 상태를 미리 로드합니다 (main.lifespan 에서 백그라운드 실행).
+    /healthcheck 는 import 직후부터 응답하고, /healthcheck/ready 는 검색 상태(artifact, 태그 매핑)가 로드되고
+    인코더가 한 번 인코딩해야 ready 가 됩니다. ready 는 호출 시점의 실제 상태로 계산하므로, 첫 요청이 대신 로드한 경우에도 반영됩니다.
+    검색에 필요한 단계가 실패하면 성공할 때까지 간격을 늘려 가며 다시 시도합니다 (예: artifact 가 나중에 게시된 경우).
+    LLM 클라이언트 단계는 ready 조건이 아니며 실패해도 첫 사용 시 다시 만듭니다.
+    """
+    _instance: Optional["WarmUp"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        self.finished = False  # 첫 warm-up 시도가 끝났는지
+        self.retries = 0
+        self.stages: Dict[str, float] = {}  # 단계별 소요 시간(초)
+        self.errors: Dict[str, str] = {}
+        self._stop = threading.Event()
+
+    @classmethod
+    def get_instance(cls) -> "WarmUp":
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    @property
+    def ready(self) -> bool:
+        engine = SearchEngine.get_instance()
+        return engine.loaded and engine.encoder_warmed and TagMappingStore.get_instance().loaded
+
+    def run(self):
+        """스레드에서 실행합니다. 검색 단계가 모두 성공하거나 stop() 이 호출될 때까지 반환하지 않습니다."""
+        engine = SearchEngine.get_instance()
+        search_stages: List[Tuple[str, Callable]] = [
+            ("model", lambda: engine.model),
+            ("artifact", engine.load),
+            ("tag_mapping", TagMappingStore.get_instance().load),
+            ("tag_scorer", lambda: engine.tag_scorer),
+            ("encode", lambda: engine.query_encoder.encode([WARMUP_TEXT])),
+        ]
+        for name, fn in search_stages:
+            self._stage(name, fn)
+        self._stage("llm_client", LLMClient.get_instance)
+        self.finished = True
+        logger.info("warm-up finished in %.2fs (ready=%s)", sum(self.stages.values()), self.ready)
+
+        delay = RETRY_INITIAL_DELAY
+        while not self.ready and not self._stop.wait(delay):
+            self.retries += 1
+            for name, fn in search_stages:
+                if name in self.errors:
+                    self._stage(name, fn)
+            delay = min(delay * 2, RETRY_MAX_DELAY)
+        if self.retries:
+            logger.info("warm-up retried %d times (ready=%s)", self.retries, self.ready)
+
+    def stop(self):
+        """재시도 대기를 끝냅니다 (서버 종료 시)."""
+        self._stop.set()
+
+    def _stage(self, name: str, fn: Callable):
+        started = time.perf_counter()
+        try:
+            fn()
+            self.errors.pop(name, None)
+        except Exception as e:
+            logger.exception("warm-up stage %s failed; it will be retried", name)
+            self.errors[name] = str(e)
+        self.stages[name] = round(time.perf_counter() - started, 3)
+
+    def status(self) -> dict:
+        return {
+            "ready": self.ready,
+            "finished": self.finished,
+            "retries": self.retries,
+            "stages": dict(self.stages),
+            "errors": dict(self.errors),
+        }
@@ -0,0 +1,482 @@
+"""
+버전이 있는 컬럼형 artifact 저장소입니다.
+
+    <root>/<name>/CURRENT                  현재 generation 이름 (os.replace 로 원자적 교체)
+    <root>/<name>/<generation>/manifest.json
+    <root>/<name>/<generation>/embeddings.npy          float32 (N, d), np.load(mmap_mode='r') 로 zero-copy 로드
+    <root>/<name>/<generation>/<col>.npy               정수 컬럼
+    <root>/<name>/<generation>/<col>.offsets.npy       문자열 컬럼의 UTF-8 바이트 오프셋 (N + 1,)
+    <root>/<name>/<generation>/<col>.data.npy          문자열 컬럼의 UTF-8 바이트 (uint8)
+    <root>/tag/<generation>/similarity.npy             태그 어휘 코사인 유사도 표 float32 (V, V), TAG_NM 행 순서
+    <root>/tag/<generation>/name_embeddings.npy        유사도 표를 만든 원문 TAG_NM 임베딩 float32 (V, d)
+    <root>/tag_mapping/<generation>/<key>.npy          서버가 게시한 포폴→태그 매핑 CSR 배열 (TAG_MAPPING_SHARED)
+
+여러 uvicorn worker 가 같은 파일을 mmap 하므로 페이지 캐시를 공유하고, pickle 과 달리 로드 시 코드가 실행되지 않습니다.
+"""
+
+import os
+import json
+import uuid
+import shutil
+import pickle
+import hashlib
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Union
+
+import numpy as np
+
+from util.date_tool import get_seoul_time
+
+ARTIFACT_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+CURRENT_FILE = "CURRENT"
+EMBEDDINGS_FILE = "embeddings.npy"
+
+PORTFOLIO_ARTIFACT = "portfolio"
+TAG_ARTIFACT = "tag"
+TAG_SIMILARITY_FILE = "similarity.npy"
+TAG_NAME_EMBEDDINGS_FILE = "name_embeddings.npy"
+LEGACY_PORTFOLIO_PICKLE = "portfolio_embeddings.pkl"
+LEGACY_TAG_PICKLE = "tag_embeddings.pkl"
+
+
+class StringColumn:
+    """UTF-8 바이트 배열과 오프셋으로 표현한 문자열 컬럼. mmap 된 배열을 그대로 사용합니다."""
+
+    def __init__(self, offsets: np.ndarray, data: np.ndarray):
+        self.offsets = offsets
+        self.data = data
+
+    @classmethod
+    def from_list(cls, values: List[str]) -> "StringColumn":
+        encoded = [(value or "").encode("utf-8") for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return cls(offsets, data)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return bytes(self.data[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+
+    def tolist(self) -> List[str]:
+        return [self[i] for i in range(len(self))]
+
+
+Column = Union[np.ndarray, StringColumn]
+
+
+@dataclass(frozen=True)
+class Artifact:
+    path: str  # generation 디렉토리 (legacy pickle 이면 파일 경로)
+    manifest: dict
+    embeddings: np.ndarray  # shape (N, d)
+    columns: Dict[str, Column]
+
+    @property
+    def generation(self) -> str:
+        return self.manifest["generation"]
+
+    @property
+    def rows(self) -> int:
+        return self.manifest["rows"]
+
+
+@dataclass(frozen=True)
+class ArrayArtifact:
+    """행 수가 서로 다른 배열 묶음 artifact (write_array_artifact). 배열은 읽기 전용 mmap 입니다."""
+    path: str
+    manifest: dict
+    arrays: Dict[str, np.ndarray]
+
+    @property
+    def generation(self) -> str:
+        return self.manifest["generation"]
+
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _load_npy(path: str, mmap: bool) -> np.ndarray:
+    try:
+        return np.load(path, mmap_mode="r" if mmap else None, allow_pickle=False)
+    except ValueError:
+        # 크기가 0 인 배열은 mmap 할 수 없으므로 일반 로드
+        return np.load(path, allow_pickle=False)
+
+
+def _column_files(col: str, kind: str) -> List[str]:
+    if kind == "str":
+        return [f"{col}.offsets.npy", f"{col}.data.npy"]
+    return [f"{col}.npy"]
+
+
+def new_generation_name() -> str:
+    return get_seoul_time().strftime("%Y%m%dT%H%M%S%f") + "-" + uuid.uuid4().hex[:8]
+
+
+def current_generation(root: str, name: str) -> Optional[str]:
+    """CURRENT 가 가리키는 generation 이름. 아직 없으면 None."""
+    try:
+        with open(os.path.join(root, name, CURRENT_FILE), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+class _NpyAppender:
+    """
+    행 수를 모르는 상태에서 .npy 파일에 행을 이어 씁니다.
+    고정 길이 헤더를 먼저 쓰고, 닫을 때 최종 shape 으로 헤더만 다시 씁니다.
+    """
+    HEADER_SIZE = 128  # magic(6) + version(2) + 헤더 길이(2) + 헤더 dict (공백 패딩, 64 바이트 정렬)
+
+    def __init__(self, path: str, dtype, tail_shape: tuple = ()):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.tail_shape = tuple(tail_shape)
+        self.rows = 0
+        self._file = open(path, "wb")
+        self._file.write(self._header())
+
+    def _header(self) -> bytes:
+        header = repr({
+            "descr": np.lib.format.dtype_to_descr(self.dtype),
+            "fortran_order": False,
+            "shape": (self.rows, *self.tail_shape),
+        })
+        body_size = self.HEADER_SIZE - 10
+        if len(header) + 1 > body_size:
+            raise ValueError(f"npy header too long for {self.path}")
+        body = header.ljust(body_size - 1) + "\n"
+        return b"\x93NUMPY\x01\x00" + body_size.to_bytes(2, "little") + body.encode("latin1")
+
+    def append(self, values: np.ndarray):
+        values = np.ascontiguousarray(values, dtype=self.dtype)
+        if values.shape[1:] != self.tail_shape:
+            raise ValueError(f"expected rows of shape {self.tail_shape}, got {values.shape[1:]}")
+        self._file.write(values.tobytes())
+        self.rows += len(values)
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.seek(0)
+        self._file.write(self._header())
+        self._file.close()
+
+
+class ArtifactWriter:
+    """
+    artifact generation 을 배치 단위로 이어 쓰는 writer 입니다.
+    임베딩과 컬럼을 배치마다 바로 디스크에 쓰므로 메모리 사용량이 카탈로그 크기가 아닌 배치 크기에 비례합니다.
+    commit() 전까지는 임시 디렉토리에만 쓰고, commit() 에서 rename 후 CURRENT 를 교체합니다.
+
+        writer = ArtifactWriter(root, name, dim, {"PTFO_SEQNO": "int", "PTFO_NM": "str"}, model_name)
+        for batch in batches:
+            writer.append(batch_embeddings, {"PTFO_SEQNO": seqnos, "PTFO_NM": names})
+        generation = writer.commit()
+    """
+
+    def __init__(
+        self,
+        root: str,
+        name: str,
+        dim: int,
+        column_kinds: Dict[str, str],
+        model_name: str,
+        normalized: bool = True,
+        keep_generations: int = 3,
+    ):
+        self.root = root
+        self.name = name
+        self.dim = dim
+        self.model_name = model_name
+        self.normalized = normalized
+        self.keep_generations = keep_generations
+        self.generation = new_generation_name()
+        self.base = os.path.join(root, name)
+        self.tmp_path = os.path.join(self.base, f".{self.generation}.tmp")
+        os.makedirs(self.tmp_path)
+
+        self.column_meta = {col: {"kind": kind, "files": _column_files(col, kind)} for col, kind in column_kinds.items()}
+        self._embeddings = _NpyAppender(os.path.join(self.tmp_path, EMBEDDINGS_FILE), np.float32, (dim,))
+        self._columns: Dict[str, List[_NpyAppender]] = {}
+        self._string_sizes: Dict[str, int] = {}
+        for col, kind in column_kinds.items():
+            paths = [os.path.join(self.tmp_path, f) for f in self.column_meta[col]["files"]]
+            if kind == "str":
+                offsets, data = _NpyAppender(paths[0], np.int64), _NpyAppender(paths[1], np.uint8)
+                offsets.append(np.zeros(1, dtype=np.int64))
+                self._columns[col] = [offsets, data]
+                self._string_sizes[col] = 0
+            elif kind == "int":
+                self._columns[col] = [_NpyAppender(paths[0], np.int64)]
+            else:
+                raise ValueError(f"unknown column kind: {kind}")
+
+    @property
+    def rows(self) -> int:
+        return self._embeddings.rows
+
+    def append(self, embeddings: np.ndarray, columns: Dict[str, Union[np.ndarray, List[str]]]):
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(-1, self.dim)
+        if set(columns) != set(self._columns):
+            raise ValueError(f"expected columns {sorted(self._columns)}, got {sorted(columns)}")
+        for col, values in columns.items():
+            if len(values) != len(embeddings):
+                raise ValueError(f"column {col} has {len(values)} rows, expected {len(embeddings)}")
+
+        self._embeddings.append(embeddings)
+        for col, values in columns.items():
+            if self.column_meta[col]["kind"] == "str":
+                batch = values if isinstance(values, StringColumn) else StringColumn.from_list(list(values))
+                offsets, data = self._columns[col]
+                offsets.append(np.asarray(batch.offsets[1:]) + self._string_sizes[col])
+                data.append(np.asarray(batch.data))
+                self._string_sizes[col] += len(batch.data)
+            else:
+                self._columns[col][0].append(np.asarray(values))
+
+    def finish(self) -> np.ndarray:
+        """배열 파일을 닫고, 지금까지 쓴 임베딩을 mmap 으로 반환합니다 (ANN 인덱스 학습 등에 사용)."""
+        self._embeddings.close()
+        for appenders in self._columns.values():
+            for appender in appenders:
+                appender.close()
+        return _load_npy(os.path.join(self.tmp_path, EMBEDDINGS_FILE), mmap=True)
+
+    def commit(
+        self,
+        extra_files: Optional[Dict[str, Callable[[str], None]]] = None,
+        manifest_extra: Optional[dict] = None,
+    ) -> str:
+        """
+        manifest 를 쓰고 generation 을 공개합니다.
+
+        :param extra_files: 파일명 -> 해당 경로에 파일을 쓰는 함수 (예: FAISS 인덱스). 체크섬에 포함됩니다.
+        :param manifest_extra: manifest 에 추가로 기록할 항목
+        :return: 새 generation 이름
+        """
+        self.finish()
+        for file_name, writer in (extra_files or {}).items():
+            writer(os.path.join(self.tmp_path, file_name))
+
+        files = [EMBEDDINGS_FILE] + [f for meta in self.column_meta.values() for f in meta["files"]]
+        files += list(extra_files or {})
+        manifest = {
+            "format_version": ARTIFACT_FORMAT_VERSION,
+            "name": self.name,
+            "generation": self.generation,
+            "created_at": get_seoul_time().isoformat(),
+            "model_name": self.model_name,
+            "dim": int(self.dim),
+            "rows": int(self.rows),
+            "dtype": "float32",
+            "normalized": self.normalized,
+            "columns": self.column_meta,
+            "checksums": {f: _sha256(os.path.join(self.tmp_path, f)) for f in files},
+            **(manifest_extra or {}),
+        }
+        with open(os.path.join(self.tmp_path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        _publish_generation(self.base, self.tmp_path, self.generation, self.keep_generations)
+        return self.generation
+
+    def abort(self):
+        """commit 하지 않은 임시 generation 을 지웁니다."""
+        self.finish()
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+
+
+def write_artifact(
+    root: str,
+    name: str,
+    embeddings: np.ndarray,
+    columns: Dict[str, Union[np.ndarray, List[str]]],
+    model_name: str,
+    normalized: bool = True,
+    keep_generations: int = 3,
+    extra_files: Optional[Dict[str, Callable[[str], None]]] = None,
+    manifest_extra: Optional[dict] = None,
+) -> str:
+    """
+    메모리에 있는 임베딩과 컬럼으로 새 generation 을 한 번에 씁니다.
+    새 generation 을 임시 디렉토리에 모두 쓴 뒤 rename 하고, 마지막에 CURRENT 를 교체합니다.
+    읽는 쪽은 CURRENT 만 보므로 쓰는 도중의 generation 을 보지 않습니다.
+
+    :param columns: 컬럼명 -> 정수 배열 또는 문자열 리스트 (행 수는 embeddings 와 같아야 함)
+    :return: 새 generation 이름
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    dim = embeddings.shape[1] if embeddings.ndim == 2 else 0
+    column_kinds = {
+        col: "int" if isinstance(values, np.ndarray) and values.dtype.kind in "iu" else "str"
+        for col, values in columns.items()
+    }
+    writer = ArtifactWriter(root, name, dim, column_kinds, model_name, normalized, keep_generations)
+    try:
+        writer.append(embeddings.reshape(-1, dim), columns)
+        return writer.commit(extra_files, manifest_extra)
+    except Exception:
+        writer.abort()
+        raise
+
+
+def write_array_artifact(
+    root: str,
+    name: str,
+    arrays: Dict[str, np.ndarray],
+    manifest_extra: Optional[dict] = None,
+    keep_generations: int = 3,
+) -> str:
+    """
+    길이가 서로 다른 배열 묶음(예: 포폴→태그 CSR)을 새 generation 으로 씁니다.
+    write_artifact 와 같이 임시 디렉토리에 모두 쓴 뒤 rename 하고 CURRENT 를 교체하므로, 읽는 쪽은 완성된 generation 만 봅니다.
+
+    :return: 새 generation 이름
+    """
+    generation = new_generation_name()
+    base = os.path.join(root, name)
+    tmp_path = os.path.join(base, f".{generation}.tmp")
+    os.makedirs(tmp_path)
+    try:
+        files = {key: f"{key}.npy" for key in arrays}
+        for key, array in arrays.items():
+            np.save(os.path.join(tmp_path, files[key]), np.ascontiguousarray(array))
+        manifest = {
+            "format_version": ARTIFACT_FORMAT_VERSION,
+            "name": name,
+            "generation": generation,
+            "created_at": get_seoul_time().isoformat(),
+            "arrays": files,
+            "checksums": {f: _sha256(os.path.join(tmp_path, f)) for f in files.values()},
+            **(manifest_extra or {}),
+        }
+        with open(os.path.join(tmp_path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+    except Exception:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+    _publish_generation(base, tmp_path, generation, keep_generations)
+    return generation
+
+
+def _publish_generation(base: str, tmp_path: str, generation: str, keep_generations: int):
+    """완성된 임시 디렉토리를 generation 으로 rename 한 뒤 CURRENT 를 원자적으로 교체하고, 오래된 generation 을 정리합니다."""
+    os.rename(tmp_path, os.path.join(base, generation))
+    current_tmp = os.path.join(base, f".{CURRENT_FILE}.{generation}.tmp")
+    with open(current_tmp, "w", encoding="utf-8") as f:
+        f.write(generation)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(current_tmp, os.path.join(base, CURRENT_FILE))
+
+    _prune_generations(base, keep_generations, generation)
+
+
+def _prune_generations(base: str, keep: int, current: str):
+    """
+    오래된 generation 을 정리합니다. 방금 CURRENT 로 지정한 generation 은 항상 남깁니다.
+    이미 mmap 한 프로세스는 삭제 후에도 기존 매핑을 계속 사용할 수 있습니다.
+    """
+    generations = sorted(
+        d for d in os.listdir(base)
+        if d != current and not d.startswith(".") and os.path.isfile(os.path.join(base, d, MANIFEST_FILE))
+    )
+    for old in generations[:-(keep - 1)] if keep > 1 else generations:
+        shutil.rmtree(os.path.join(base, old), ignore_errors=True)
+
+
+def _read_manifest(root: str, name: str, generation: Optional[str], verify: bool):
+    """generation(미지정 시 CURRENT) 디렉토리 경로와 manifest. verify 이면 체크섬도 검증합니다."""
+    generation = generation or current_generation(root, name)
+    if generation is None:
+        raise FileNotFoundError(f"no artifact generation for '{name}' under {root}")
+    path = os.path.join(root, name, generation)
+    with open(os.path.join(path, MANIFEST_FILE), encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != ARTIFACT_FORMAT_VERSION:
+        raise ValueError(f"unsupported artifact format version: {manifest.get('format_version')}")
+
+    if verify:
+        for file_name, checksum in manifest["checksums"].items():
+            if _sha256(os.path.join(path, file_name)) != checksum:
+                raise ValueError(f"artifact checksum mismatch: {os.path.join(path, file_name)}")
+    return path, manifest
+
+
+def read_array_artifact(root: str, name: str, generation: Optional[str] = None, verify: bool = False) -> ArrayArtifact:
+    """write_array_artifact 로 쓴 generation(미지정 시 CURRENT)의 배열들을 읽기 전용 mmap 으로 엽니다."""
+    path, manifest = _read_manifest(root, name, generation, verify)
+    arrays = {key: _load_npy(os.path.join(path, file_name), mmap=True) for key, file_name in manifest["arrays"].items()}
+    return ArrayArtifact(path=path, manifest=manifest, arrays=arrays)
+
+
+def read_artifact(
+    root: str,
+    name: str,
+    generation: Optional[str] = None,
+    mmap: bool = True,
+    verify: bool = False,
+) -> Artifact:
+    """
+    artifact generation 을 읽습니다. 기본적으로 모든 배열을 읽기 전용 mmap 으로 열어 복사하지 않습니다.
+
+    :param generation: 미지정 시 CURRENT 가 가리키는 generation
+    :param verify: True 이면 manifest 의 sha256 체크섬을 검증 (파일 전체를 읽으므로 느림)
+    """
+    path, manifest = _read_manifest(root, name, generation, verify)
+    embeddings = _load_npy(os.path.join(path, EMBEDDINGS_FILE), mmap)
+    if manifest["rows"] and embeddings.shape != (manifest["rows"], manifest["dim"]):
+        raise ValueError(f"artifact shape {embeddings.shape} does not match manifest "
+                         f"({manifest['rows']}, {manifest['dim']})")
+
+    columns: Dict[str, Column] = {}
+    for col, meta in manifest["columns"].items():
+        arrays = [_load_npy(os.path.join(path, f), mmap) for f in meta["files"]]
+        columns[col] = StringColumn(*arrays) if meta["kind"] == "str" else arrays[0]
+        if len(columns[col]) != manifest["rows"]:
+            raise ValueError(f"artifact column {col} has {len(columns[col])} rows, expected {manifest['rows']}")
+
+    return Artifact(path=path, manifest=manifest, embeddings=embeddings, columns=columns)
+
+
+def load_legacy_pickle(path: str, model_name: str) -> Artifact:
+    """
+    이전 형식의 pickle artifact({"embeddings": ndarray, "data": [dict, ...]})를 읽어 Artifact 로 변환합니다.
+    마이그레이션 용도로만 사용하며, 임베딩은 정규화하여 메모리에 올립니다.
+    """
+    with open(path, "rb") as f:
+        legacy = pickle.load(f)
+    embeddings = np.asarray(legacy["embeddings"], dtype=np.float32)
+    embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    data = legacy["data"]
+
+    columns: Dict[str, Column] = {}
+    for col in (data[0].keys() if data else []):
+        values = [row[col] for row in data]
+        if all(isinstance(v, int) for v in values):
+            columns[col] = np.array(values, dtype=np.int64)
+        else:
+            columns[col] = StringColumn.from_list(values)
+
+    manifest = {
+        "format_version": 0,
+        "name": os.path.splitext(os.path.basename(path))[0],
+        "generation": f"legacy-{os.path.getmtime(path)}",
+        "model_name": model_name,
+        "dim": int(embeddings.shape[1]) if embeddings.ndim == 2 else 0,
+        "rows": len(data),
+        "dtype": "float32",
+        "normalized": True,
+    }
+    return Artifact(path=path, manifest=manifest, embeddings=embeddings, columns=columns)
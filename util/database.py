@@ -13,9 +13,18 @@ db_name = EnvVariables.DB_NAME
 db_username = EnvVariables.DB_USERNAME
 db_password = EnvVariables.DB_PASSWORD
 db_port = EnvVariables.DB_PORT
-DATABASE_URL = f"mysql+pymysql://{db_username}:{db_password}@{db_host}:{db_port}/{db_name}"
+# DATABASE_URL 이 지정되면 그대로 사용 (벤치마크의 SQLite 등), 없으면 MariaDB 접속 정보로 구성
+DATABASE_URL = EnvVariables.DATABASE_URL or f"mysql+pymysql://{db_username}:{db_password}@{db_host}:{db_port}/{db_name}"
 
-engine = create_engine(DATABASE_URL)
+# 커넥션 풀: 끊긴 커넥션은 사용 전 ping 으로 걸러내고, MySQL wait_timeout 전에 재생성합니다.
+engine = create_engine(
+    DATABASE_URL,
+    pool_size=EnvVariables.DB_POOL_SIZE,
+    max_overflow=EnvVariables.DB_MAX_OVERFLOW,
+    pool_timeout=EnvVariables.DB_POOL_TIMEOUT,
+    pool_recycle=EnvVariables.DB_POOL_RECYCLE,
+    pool_pre_ping=True,
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # 모든 모델의 부모
 Base = declarative_base()
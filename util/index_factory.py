@@ -0,0 +1,131 @@
+import math
+from dataclasses import dataclass, asdict
+
+import numpy as np
+import faiss
+
+from constants.env_variables import EnvVariables
+
+INDEX_FILE = "portfolio.index"
+
+INDEX_FLAT = "flat"
+INDEX_IVF_FLAT = "ivf_flat"
+INDEX_HNSW = "hnsw"
+INDEX_IVF_PQ = "ivf_pq"
+INDEX_TYPES = (INDEX_FLAT, INDEX_IVF_FLAT, INDEX_HNSW, INDEX_IVF_PQ)
+
+# 학습 표본은 클러스터당 이 개수까지만 사용하고, add 는 이 행 수 단위로 나눠서 수행합니다.
+TRAIN_SAMPLES_PER_CENTROID = 256
+ADD_CHUNK_ROWS = 65536
+
+
+@dataclass(frozen=True)
+class IndexParams:
+    """포폴 텍스트 인덱스 구성. 기본값은 EnvVariables 에서 읽습니다."""
+    index_type: str = INDEX_FLAT
+    nlist: int = 1024  # IVF 클러스터 수
+    nprobe: int = 16  # IVF 검색 시 탐색할 클러스터 수
+    hnsw_m: int = 32  # HNSW 노드당 이웃 수
+    ef_construction: int = 200  # HNSW 구축 시 탐색 폭
+    ef_search: int = 128  # HNSW 검색 시 탐색 폭
+    pq_m: int = 16  # PQ 서브벡터 수 (차원의 약수여야 함)
+    pq_nbits: int = 8  # PQ 서브벡터당 비트 수
+
+    @classmethod
+    def from_env(cls) -> "IndexParams":
+        return cls(
+            index_type=EnvVariables.INDEX_TYPE,
+            nlist=EnvVariables.INDEX_IVF_NLIST,
+            nprobe=EnvVariables.INDEX_IVF_NPROBE,
+            hnsw_m=EnvVariables.INDEX_HNSW_M,
+            ef_construction=EnvVariables.INDEX_HNSW_EF_CONSTRUCTION,
+            ef_search=EnvVariables.INDEX_HNSW_EF_SEARCH,
+            pq_m=EnvVariables.INDEX_PQ_M,
+            pq_nbits=EnvVariables.INDEX_PQ_NBITS,
+        )
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def build_index(embeddings: np.ndarray, params: IndexParams) -> faiss.Index:
+    """
+    정규화된 임베딩으로 내적(코사인) 기반 FAISS 인덱스를 학습/구축합니다.
+    데이터가 적으면 IVF 클러스터 수와 PQ 비트 수를 학습 가능한 범위로 줄입니다.
+    embeddings 는 mmap 배열이어도 되며, 학습은 표본으로, 추가는 청크 단위로 수행합니다.
+    """
+    if params.index_type not in INDEX_TYPES:
+        raise ValueError(f"unknown index type: {params.index_type} (expected one of {INDEX_TYPES})")
+    n, d = embeddings.shape
+    # FAISS k-means 는 클러스터당 39개 이상의 학습 데이터를 권장합니다.
+    nlist = max(1, min(params.nlist, n // 39))
+
+    if params.index_type == INDEX_FLAT:
+        index = faiss.IndexFlatIP(d)
+    elif params.index_type == INDEX_IVF_FLAT:
+        index = faiss.IndexIVFFlat(faiss.IndexFlatIP(d), d, nlist, faiss.METRIC_INNER_PRODUCT)
+    elif params.index_type == INDEX_HNSW:
+        index = faiss.IndexHNSWFlat(d, params.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = params.ef_construction
+    else:
+        if d % params.pq_m != 0:
+            raise ValueError(f"pq_m={params.pq_m} must divide embedding dimension {d}")
+        nbits = max(1, min(params.pq_nbits, int(math.log2(max(n, 2)))))
+        index = faiss.IndexIVFPQ(faiss.IndexFlatIP(d), d, nlist, params.pq_m, nbits, faiss.METRIC_INNER_PRODUCT)
+
+    if not index.is_trained:
+        train_size = min(n, max(nlist, 2 ** params.pq_nbits) * TRAIN_SAMPLES_PER_CENTROID)
+        rows = np.sort(np.random.default_rng(0).choice(n, size=train_size, replace=False))
+        index.train(np.ascontiguousarray(embeddings[rows], dtype=np.float32))
+    for start in range(0, n, ADD_CHUNK_ROWS):
+        index.add(np.ascontiguousarray(embeddings[start:start + ADD_CHUNK_ROWS], dtype=np.float32))
+    apply_search_params(index, params)
+    return index
+
+
+def apply_search_params(index: faiss.Index, params: IndexParams):
+    """검색 시점 파라미터(nprobe, efSearch)를 적용합니다. 인덱스 파일에는 저장되지 않으므로 로드 후에도 호출합니다."""
+    if isinstance(index, faiss.IndexIVF):
+        index.nprobe = min(params.nprobe, index.nlist)
+    elif isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = params.ef_search
+
+
+def search_subset(index: faiss.Index, queries: np.ndarray, k: int, ids: np.ndarray):
+    """
+    ids(행 번호)에 속한 벡터만 대상으로 검색합니다 (FAISS IDSelector).
+    인덱스에 적용된 nprobe / efSearch 를 그대로 사용합니다. 결과가 k 개보다 적으면 나머지 I 는 -1 입니다.
+    """
+    selector = faiss.IDSelectorBatch(np.ascontiguousarray(ids, dtype=np.int64))
+    if isinstance(index, faiss.IndexIVF):
+        params = faiss.SearchParametersIVF(sel=selector, nprobe=index.nprobe)
+    elif isinstance(index, faiss.IndexHNSW):
+        params = faiss.SearchParametersHNSW(sel=selector, efSearch=index.hnsw.efSearch)
+    else:
+        params = faiss.SearchParameters(sel=selector)
+    return index.search(np.ascontiguousarray(queries, dtype=np.float32), k, params=params)
+
+
+def write_index(index: faiss.Index, path: str):
+    faiss.write_index(index, path)
+
+
+def read_index(path: str, params: IndexParams) -> faiss.Index:
+    """
+    인덱스를 읽습니다. 가능하면 mmap 으로 열어 worker 끼리 페이지 캐시를 공유합니다.
+    IO_FLAG_MMAP_IFC(faiss 1.9+)는 flat/HNSW 의 벡터와 IVF 역리스트를 모두 복사 없이 매핑하고,
+    IO_FLAG_MMAP 은 IVF 역리스트만 매핑하므로 (flat/HNSW 는 worker 마다 사본) 앞의 것부터 시도합니다.
+    """
+    flags = [getattr(faiss, "IO_FLAG_MMAP_IFC", None), faiss.IO_FLAG_MMAP]
+    for flag in flags:
+        if flag is None:
+            continue
+        try:
+            index = faiss.read_index(path, flag | faiss.IO_FLAG_READ_ONLY)
+            break
+        except RuntimeError:
+            continue
+    else:
+        index = faiss.read_index(path)
+    apply_search_params(index, params)
+    return index
@@ -0,0 +1,69 @@
+import json
+from typing import Any, Dict, List, Optional
+
+
+class IncrementalJsonObject:
+    """
+    LLM 이 조각 단위로 내보내는 JSON 객체 텍스트에서 값이 완성된 최상위 필드를 바로 꺼냅니다.
+    문자열/중첩 깊이만 추적하며, 최상위 `,` 나 `}` 를 만나면 직전 필드를 파싱합니다.
+    객체 앞뒤의 공백이나 설명 문구는 무시합니다.
+
+        parser = IncrementalJsonObject()
+        for chunk in chunks:
+            for key in parser.feed(chunk):
+                print(key, parser.fields[key])
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.fields: Dict[str, Any] = {}
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member_start: Optional[int] = None  # 최상위 객체에서 현재 필드가 시작되는 위치
+        self._closed = False
+
+    def feed(self, chunk: str) -> List[str]:
+        """chunk 를 이어 붙이고, 이번에 값이 완성된 필드 이름들을 반환합니다."""
+        self.text += chunk
+        completed = []
+        text = self.text
+        while self._pos < len(text) and not self._closed:
+            ch = text[self._pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif self._depth == 0:
+                if ch == "{":
+                    self._depth = 1
+                    self._member_start = self._pos + 1
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                if self._depth == 1:
+                    completed += self._complete_member(self._pos)
+                    self._closed = True
+                self._depth -= 1
+            elif ch == "," and self._depth == 1:
+                completed += self._complete_member(self._pos)
+                self._member_start = self._pos + 1
+            self._pos += 1
+        return completed
+
+    def _complete_member(self, end: int) -> List[str]:
+        member = self.text[self._member_start:end].strip()
+        if not member:
+            return []
+        try:
+            parsed = json.loads("{" + member + "}")
+        except ValueError:
+            return []
+        self.fields.update(parsed)
+        return list(parsed)
@@ -0,0 +1,216 @@
+import os
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from util.text_tool import preprocess_text
+
+LEXICAL_FILES = {
+    "terms": "bm25_terms.npy",
+    "indptr": "bm25_indptr.npy",
+    "rows": "bm25_rows.npy",
+    "impacts": "bm25_impacts.npy",
+}
+
+# n-gram 의 문자 코드 포인트(최대 0x10FFFF, 21비트)를 이어 붙여 정수 하나로 표현합니다. int64 에는 3글자까지 들어갑니다.
+CODE_POINT_BITS = 21
+MAX_NGRAM = 3
+_SPACE = ord(" ")
+
+
+def ngram_terms(texts: List[str], n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    preprocess_text 를 거친 텍스트들을 공백 단위 단어의 문자 n-gram 으로 나눕니다. n 글자보다 짧은 단어는 단어 전체가 term 입니다.
+    한국어는 조사/어미가 붙어도 어간의 n-gram 이 겹치므로 형태소 분석 없이도 부분 일치를 잡습니다.
+    term 은 n-gram 의 코드 포인트를 이어 붙인 정수라 해시 충돌이 없습니다.
+
+    :return: (텍스트 번호, term) 배열. 한 텍스트 안에서 같은 term 이 여러 번 나올 수 있습니다.
+    """
+    if not 1 <= n <= MAX_NGRAM:
+        raise ValueError(f"ngram must be between 1 and {MAX_NGRAM}: {n}")
+    lengths = np.array([len(text) for text in texts], dtype=np.int64)
+    # 텍스트 사이와 끝에 공백을 두어 n-gram 이 텍스트 경계를 넘지 않게 합니다.
+    codes = np.frombuffer((" ".join(texts) + " ").encode("utf-32-le"), dtype=np.uint32).astype(np.int64)
+    text_of = np.repeat(np.arange(len(texts), dtype=np.int64), lengths + 1)
+    space = codes == _SPACE
+
+    m = max(len(codes) - n + 1, 0)
+    valid = np.ones(m, dtype=bool)
+    grams = np.zeros(m, dtype=np.int64)
+    for j in range(n):
+        valid &= ~space[j:j + m]
+        grams |= codes[j:j + m] << (CODE_POINT_BITS * j)
+
+    # n 글자보다 짧은 단어 (단어 시작 위치 ~ 다음 공백)
+    word_starts = np.flatnonzero(~space & np.concatenate([[True], space[:-1]]))
+    spaces = np.flatnonzero(space)
+    word_lengths = spaces[np.searchsorted(spaces, word_starts)] - word_starts
+    short = word_lengths < n
+    word_starts, word_lengths = word_starts[short], word_lengths[short]
+    words = np.zeros(len(word_starts), dtype=np.int64)
+    for j in range(n - 1):
+        has = word_lengths > j
+        words[has] |= codes[word_starts[has] + j] << (CODE_POINT_BITS * j)
+
+    return (
+        np.concatenate([text_of[:m][valid], text_of[word_starts]]),
+        np.concatenate([grams[valid], words]),
+    )
+
+
+@dataclass(frozen=True)
+class LexicalHits:
+    """한 쿼리의 BM25 결과. 점수가 0 보다 큰 행만 담습니다."""
+    rows: np.ndarray  # 행 번호 (오름차순)
+    scores: np.ndarray  # 쿼리 안 최고점으로 나눈 [0, 1] 점수
+
+    def top_rows(self, k: int) -> np.ndarray:
+        """점수 상위 k 개 행 번호 (오름차순)."""
+        if k >= len(self.rows):
+            return self.rows
+        if k <= 0:
+            return self.rows[:0]
+        return np.sort(self.rows[np.argpartition(-self.scores, k - 1)[:k]])
+
+    def scores_for(self, rows: Optional[np.ndarray], count: int) -> np.ndarray:
+        """rows(None 이면 전체 count 개 행) 위치별 점수. 결과에 없는 행은 0 입니다."""
+        if rows is None:
+            scores = np.zeros(count, dtype=np.float64)
+            scores[self.rows] = self.scores
+            return scores
+        if len(self.rows) == 0:
+            return np.zeros(len(rows), dtype=np.float64)
+        pos = np.minimum(np.searchsorted(self.rows, rows), len(self.rows) - 1)
+        return np.where(self.rows[pos] == rows, self.scores[pos], 0.0)
+
+
+@dataclass(frozen=True)
+class LexicalIndex:
+    """
+    포폴 텍스트의 문자 n-gram BM25 역색인 (CSR).
+    term 별 포스팅은 행 번호 오름차순이며, BM25 기여도(idf × 문서 길이로 정규화한 tf)를 미리 계산해 둡니다.
+    배열은 artifact 파일을 읽기 전용 mmap 한 것입니다.
+    """
+    ngram: int
+    k1: float
+    b: float
+    portfolio_count: int
+    terms: np.ndarray  # 정렬된 term, shape (V,) int64
+    indptr: np.ndarray  # term 별 포스팅 구간, shape (V + 1,) int64
+    rows: np.ndarray  # 포스팅 행 번호, shape (nnz,) int32
+    impacts: np.ndarray  # 포스팅 BM25 기여도, shape (nnz,) float32
+
+    def search(self, text: str) -> LexicalHits:
+        """
+        text 의 BM25 점수. 쿼리 term 의 포스팅만 읽으므로 비용은 카탈로그 크기가 아닌 포스팅 길이에 비례합니다.
+        쿼리 안에서 반복된 term 은 한 번만 셉니다.
+        """
+        _, terms = ngram_terms([preprocess_text(text)], self.ngram)
+        empty = LexicalHits(rows=np.zeros(0, dtype=np.int64), scores=np.zeros(0, dtype=np.float64))
+        if len(terms) == 0 or len(self.terms) == 0:
+            return empty
+        terms = np.unique(terms)
+        pos = np.minimum(np.searchsorted(self.terms, terms), len(self.terms) - 1)
+        pos = pos[self.terms[pos] == terms]
+        starts, lengths = self.indptr[pos], self.indptr[pos + 1] - self.indptr[pos]
+        total = int(lengths.sum())
+        if total == 0:
+            return empty
+        # 쿼리 term 들의 포스팅 구간을 이어 붙인 위치
+        postings = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+        if total * 8 >= self.portfolio_count:
+            # 포스팅이 많으면 (흔한 n-gram) 정렬 없이 전체 행 배열에 누적하는 편이 빠릅니다.
+            scores = np.bincount(self.rows[postings], weights=self.impacts[postings], minlength=self.portfolio_count)
+            rows = np.flatnonzero(scores > 0)
+            scores = scores[rows]
+        else:
+            rows, inverse = np.unique(self.rows[postings], return_inverse=True)
+            scores = np.bincount(inverse, weights=self.impacts[postings])
+        return LexicalHits(rows=rows.astype(np.int64), scores=scores / scores.max())
+
+    def files(self) -> Dict[str, Callable[[str], None]]:
+        """ArtifactWriter.commit 의 extra_files 로 넘길 파일 쓰기 함수들."""
+        return {
+            file_name: (lambda path, array=getattr(self, key): np.save(path, array))
+            for key, file_name in LEXICAL_FILES.items()
+        }
+
+    def manifest(self) -> dict:
+        return {
+            "ngram": self.ngram,
+            "k1": self.k1,
+            "b": self.b,
+            "documents": self.portfolio_count,
+            "terms": len(self.terms),
+            "postings": len(self.rows),
+            "files": LEXICAL_FILES,
+        }
+
+    @classmethod
+    def load(cls, path: str, meta: dict) -> "LexicalIndex":
+        """artifact 디렉토리의 색인 파일을 mmap 으로 읽습니다. meta 는 manifest 의 "lexical" 항목입니다."""
+        return cls(
+            ngram=meta["ngram"],
+            k1=meta["k1"],
+            b=meta["b"],
+            portfolio_count=meta["documents"],
+            **{key: np.load(os.path.join(path, file_name), mmap_mode="r") for key, file_name in meta["files"].items()},
+        )
+
+
+class LexicalIndexBuilder:
+    """
+    preprocess 단계에서 배치마다 add 로 포폴 텍스트를 누적하고, build 로 BM25 역색인을 만듭니다.
+    add 는 artifact 에 쓰는 행 순서 그대로 호출해야 합니다.
+    """
+
+    def __init__(self, ngram: int = 2, k1: float = 1.2, b: float = 0.75):
+        self.ngram = ngram
+        self.k1 = k1
+        self.b = b
+        self.rows = 0
+        self._rows: List[np.ndarray] = []
+        self._terms: List[np.ndarray] = []
+        self._tfs: List[np.ndarray] = []
+        self._lengths: List[np.ndarray] = []
+
+    def add(self, texts: List[str]):
+        """preprocess_text 를 거친 텍스트를 다음 행들로 추가합니다."""
+        text_of, terms = ngram_terms(texts, self.ngram)
+        # (행, term) 별 등장 횟수
+        order = np.lexsort((terms, text_of))
+        text_of, terms = text_of[order], terms[order]
+        first = np.ones(len(terms), dtype=bool)
+        first[1:] = (text_of[1:] != text_of[:-1]) | (terms[1:] != terms[:-1])
+        starts = np.flatnonzero(first)
+        self._rows.append((text_of[starts] + self.rows).astype(np.int32))
+        self._terms.append(terms[starts])
+        self._tfs.append(np.diff(np.append(starts, len(terms))).astype(np.int32))
+        self._lengths.append(np.bincount(text_of, minlength=len(texts)))
+        self.rows += len(texts)
+
+    def build(self) -> LexicalIndex:
+        rows = np.concatenate(self._rows) if self._rows else np.zeros(0, dtype=np.int32)
+        terms = np.concatenate(self._terms) if self._terms else np.zeros(0, dtype=np.int64)
+        tfs = np.concatenate(self._tfs).astype(np.float64) if self._tfs else np.zeros(0)
+        doc_lengths = np.concatenate(self._lengths).astype(np.float64) if self._lengths else np.zeros(0)
+
+        # term 순으로 묶습니다. 행 순서로 누적했으므로 stable 정렬이면 포스팅 안은 행 번호 오름차순입니다.
+        order = np.argsort(terms, kind="stable")
+        rows, terms, tfs = rows[order], terms[order], tfs[order]
+        unique_terms, starts, df = np.unique(terms, return_index=True, return_counts=True)
+
+        idf = np.log1p((self.rows - df + 0.5) / (df + 0.5))
+        avgdl = max(doc_lengths.mean(), 1.0) if len(doc_lengths) else 1.0
+        tf_norm = tfs * (self.k1 + 1) / (tfs + self.k1 * (1 - self.b + self.b * doc_lengths[rows] / avgdl))
+        return LexicalIndex(
+            ngram=self.ngram,
+            k1=self.k1,
+            b=self.b,
+            portfolio_count=self.rows,
+            terms=unique_terms,
+            indptr=np.append(starts, len(terms)).astype(np.int64),
+            rows=rows,
+            impacts=(np.repeat(idf, df) * tf_norm).astype(np.float32),
+        )
@@ -0,0 +1,38 @@
+import os
+from typing import Optional
+
+
+class LoaderLock:
+    """
+    같은 호스트의 여러 worker 프로세스 중 하나만 loader 가 되도록 하는 파일 잠금 (fcntl.flock, POSIX 전용).
+    잠금은 프로세스가 살아 있는 동안 유지되고, loader 가 종료되면 OS 가 풀어 주므로 다른 worker 가 다음 시도에서 이어받습니다.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def try_acquire(self) -> bool:
+        """기다리지 않고 잠금을 시도합니다. 이미 가지고 있거나 새로 얻었으면 True."""
+        if self._fd is not None:
+            return True
+        import fcntl
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
@@ -0,0 +1,149 @@
+import time
+import bisect
+import inspect
+import functools
+import threading
+import contextvars
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Prometheus 기본값에 가까운 지연시간 버킷(초). LLM 호출까지 담을 수 있도록 60초까지 둡니다.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Histogram:
+    """레이블별 누적 버킷 히스토그램 (Prometheus text format 출력)."""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], list] = {}  # labels -> [버킷별 개수..., 합계, 개수]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple([str(labels[name]) for name in self.label_names])
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series_items = [(key, list(series)) for key, series in sorted(self._series.items())]
+        for key, series in series_items:
+            labels = dict(zip(self.label_names, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': _format_value(bound)})} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {series[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {series[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {series[-1]}")
+        return lines
+
+
+def render_samples(name: str, documentation: str, metric_type: str,
+                   samples: Iterable[Tuple[Dict[str, str], Optional[float]]]) -> List[str]:
+    """gauge / counter 한 개를 Prometheus text format 으로 만듭니다. 값이 None 인 샘플은 생략합니다."""
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {metric_type}"]
+    for labels, value in samples:
+        if value is not None:
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    return lines
+
+
+# 단계별 소요시간 (RankService / GenerateService / SearchService 내부 단계)
+STAGE_SECONDS = Histogram("ragvertise_stage_seconds", "Time spent per pipeline stage", ("stage",))
+# HTTP 요청 전체 소요시간
+REQUEST_SECONDS = Histogram("ragvertise_http_request_seconds", "HTTP request latency", ("method", "route", "status"))
+
+# 현재 요청의 (단계, 소요 ms) 목록. Server-Timing 헤더로 내보냅니다.
+# asyncio.to_thread 는 context 를 복사하므로 스레드에서 실행된 검색 단계도 같은 목록에 기록됩니다.
+_request_timings: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("request_timings", default=None)
+
+
+class timed:
+    """
+    단계 소요시간을 STAGE_SECONDS 히스토그램과 현재 요청의 Server-Timing 목록에 기록합니다.
+    context manager 와 데코레이터(동기/비동기 함수) 모두로 사용할 수 있습니다.
+
+        with timed("encode"):
+            ...
+
+        @timed("llm")
+        async def call_llm(): ...
+    """
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self._started = 0.0
+
+    def __enter__(self) -> "timed":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record_stage(self.stage, time.perf_counter() - self._started)
+
+    def __call__(self, fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with timed(self.stage):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(self.stage):
+                return fn(*args, **kwargs)
+        return wrapper
+
+
+def record_stage(stage: str, seconds: float):
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage, seconds * 1000))
+
+
+def start_request_timings() -> Tuple[list, contextvars.Token]:
+    """요청 시작 시 호출. 이후 timed 로 기록되는 단계가 반환된 목록에 쌓입니다."""
+    timings = []
+    return timings, _request_timings.set(timings)
+
+
+def reset_request_timings(token: contextvars.Token):
+    _request_timings.reset(token)
+
+
+def server_timing_header(timings: List[Tuple[str, float]], total_ms: Optional[float] = None) -> str:
+    """같은 단계가 여러 번 기록되면 합산하여 `stage;dur=ms` 목록을 만듭니다."""
+    merged: Dict[str, float] = {}
+    for stage, ms in timings:
+        merged[stage] = merged.get(stage, 0.0) + ms
+    if total_ms is not None:
+        merged["total"] = total_ms
+    return ", ".join(f"{stage};dur={ms:.2f}" for stage, ms in merged.items())
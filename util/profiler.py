@@ -0,0 +1,92 @@
+import os
+import re
+import time
+import random
+import logging
+import cProfile
+import threading
+from typing import Optional
+
+from constants.env_variables import EnvVariables
+
+logger = logging.getLogger(__name__)
+
+try:
+    from pyinstrument import Profiler as _Pyinstrument
+except ImportError:  # pyinstrument 는 선택 의존성, 없으면 cProfile 사용
+    _Pyinstrument = None
+
+
+class RequestProfiler:
+    """
+    요청 단위 opt-in 프로파일러입니다.
+    sample_rate 비율의 요청만 프로파일링하고, slow_ms 이상 걸린 요청의 리포트만 output_dir 에 저장합니다.
+    pyinstrument 가 설치되어 있으면 async 호출 스택까지 담은 HTML, 없으면 cProfile .prof 파일을 남깁니다.
+    cProfile 은 한 번에 하나만 활성화할 수 있어, 이미 프로파일링 중인 요청이 있으면 다음 요청은 건너뜁니다.
+    """
+    _instance: Optional["RequestProfiler"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, sample_rate: float, slow_ms: float, output_dir: str):
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.output_dir = output_dir
+        self._active = threading.Lock()
+
+    @classmethod
+    def get_instance(cls) -> "RequestProfiler":
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls(EnvVariables.PROFILE_SAMPLE_RATE, EnvVariables.PROFILE_SLOW_MS,
+                                        EnvVariables.PROFILE_DIR)
+        return cls._instance
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0
+
+    def start(self):
+        """샘플링되면 시작된 프로파일러를, 아니면 None 을 반환합니다."""
+        if not self.enabled or random.random() >= self.sample_rate or not self._active.acquire(blocking=False):
+            return None
+        try:
+            if _Pyinstrument is not None:
+                profiler = _Pyinstrument(async_mode="enabled")
+                profiler.start()
+            else:
+                profiler = cProfile.Profile()
+                profiler.enable()
+            return profiler
+        except Exception:
+            self._active.release()
+            logger.exception("failed to start request profiler")
+            return None
+
+    def finish(self, profiler, label: str, elapsed_ms: float) -> Optional[str]:
+        """프로파일러를 멈추고, 느린 요청이면 리포트를 저장한 뒤 경로를 반환합니다."""
+        try:
+            if _Pyinstrument is not None:
+                profiler.stop()
+            else:
+                profiler.disable()
+            if elapsed_ms < self.slow_ms:
+                return None
+
+            os.makedirs(self.output_dir, exist_ok=True)
+            name = f"{time.strftime('%Y%m%d-%H%M%S')}_{re.sub(r'[^A-Za-z0-9_-]+', '_', label).strip('_')}" \
+                   f"_{elapsed_ms:.0f}ms"
+            if _Pyinstrument is not None:
+                path = os.path.join(self.output_dir, name + ".html")
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(profiler.output_html())
+            else:
+                path = os.path.join(self.output_dir, name + ".prof")
+                profiler.dump_stats(path)
+            logger.info("slow request profile saved: %s", path)
+            return path
+        except Exception:
+            logger.exception("failed to save request profile")
+            return None
+        finally:
+            self._active.release()
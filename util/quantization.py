@@ -0,0 +1,151 @@
+import os
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+STORAGE_FLOAT32 = "float32"
+STORAGE_FLOAT16 = "float16"
+STORAGE_INT8 = "int8"
+STORAGE_TYPES = (STORAGE_FLOAT32, STORAGE_FLOAT16, STORAGE_INT8)
+
+QUANTIZED_FILES = {
+    STORAGE_FLOAT16: {"codes": "embeddings_f16.npy"},
+    STORAGE_INT8: {"codes": "embeddings_i8.npy", "scale": "embeddings_i8_scale.npy", "offset": "embeddings_i8_offset.npy"},
+}
+
+# 양자화/역양자화는 이 행 수 단위로 나눕니다. 역양자화한 float32 블록이 CPU 캐시에 남아 있는 동안 내적하도록 작게 잡습니다
+# (384 차원이면 1.5MB).
+CHUNK_ROWS = 1024
+
+
+@dataclass(frozen=True)
+class EmbeddingMatrix:
+    """
+    검색 점수 계산에 쓰는 포폴 임베딩 행렬입니다. storage 에 따라 원본 float32, float16, int8(차원별 scale/offset) 중 하나로
+    보관하고, 내적은 CHUNK_ROWS 행씩 float32 로 역양자화하며 계산합니다.
+    int8 은 x ≈ codes * scale + offset 이므로 q·x = codes @ (scale * q) + offset·q 로 계산합니다.
+    """
+    storage: str
+    codes: np.ndarray  # (N, d) float32 | float16 | int8
+    scale: Optional[np.ndarray] = None  # int8: 차원별 scale, shape (d,)
+    offset: Optional[np.ndarray] = None  # int8: 차원별 offset, shape (d,)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @property
+    def dim(self) -> int:
+        return self.codes.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.codes.nbytes)
+
+    def dot(self, query: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """행(rows 가 None 이면 전체)별 query(d,) 와의 내적, shape (R,) float32."""
+        codes = self.codes if rows is None else self.codes[rows]
+        if self.storage == STORAGE_FLOAT32:
+            return codes @ query
+        query, bias = self._fold(query[None, :])
+        out = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), CHUNK_ROWS):
+            out[start:start + CHUNK_ROWS] = codes[start:start + CHUNK_ROWS].astype(np.float32) @ query[0]
+        return out + bias[0]
+
+    def dot_many(self, queries: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """행(rows 가 None 이면 전체)별 queries(Q, d) 와의 내적, shape (Q, R) float32."""
+        codes = self.codes if rows is None else self.codes[rows]
+        if self.storage == STORAGE_FLOAT32:
+            return queries @ codes.T
+        queries, bias = self._fold(queries)
+        out = np.empty((len(queries), len(codes)), dtype=np.float32)
+        for start in range(0, len(codes), CHUNK_ROWS):
+            out[:, start:start + CHUNK_ROWS] = queries @ codes[start:start + CHUNK_ROWS].astype(np.float32).T
+        return out + bias[:, None]
+
+    def _fold(self, queries: np.ndarray):
+        """int8 의 scale/offset 을 쿼리 쪽으로 옮깁니다: (scale * queries, offset · queries)."""
+        queries = np.asarray(queries, dtype=np.float32)
+        if self.storage != STORAGE_INT8:
+            return queries, np.zeros(len(queries), dtype=np.float32)
+        return queries * self.scale, queries @ self.offset
+
+    @classmethod
+    def quantize(cls, embeddings: np.ndarray, storage: str) -> "EmbeddingMatrix":
+        """float32 행렬(mmap 가능)을 storage 형식으로 변환합니다. CHUNK_ROWS 행씩 읽습니다."""
+        if storage == STORAGE_FLOAT32:
+            return cls(storage, embeddings)
+        if storage == STORAGE_FLOAT16:
+            return cls(storage, _chunked(embeddings, np.float16, lambda chunk: chunk))
+        if storage != STORAGE_INT8:
+            raise ValueError(f"unknown embedding storage: {storage} (expected one of {STORAGE_TYPES})")
+
+        # 차원별 [min, max] 를 256 단계로 나눕니다.
+        lo = np.full(embeddings.shape[1], np.inf, dtype=np.float32)
+        hi = np.full(embeddings.shape[1], -np.inf, dtype=np.float32)
+        for start in range(0, len(embeddings), CHUNK_ROWS):
+            chunk = np.asarray(embeddings[start:start + CHUNK_ROWS], dtype=np.float32)
+            lo, hi = np.minimum(lo, chunk.min(axis=0)), np.maximum(hi, chunk.max(axis=0))
+        if len(embeddings) == 0:
+            lo, hi = np.zeros_like(lo), np.zeros_like(hi)
+        scale = ((hi - lo) / 255).astype(np.float32)
+        scale[scale == 0] = 1.0
+        codes = _chunked(embeddings, np.int8, lambda chunk: np.clip(np.rint((chunk - lo) / scale) - 128, -128, 127))
+        return cls(storage, codes, scale=scale, offset=(lo + 128 * scale).astype(np.float32))
+
+    def files(self) -> Dict[str, Callable[[str], None]]:
+        """ArtifactWriter.commit 의 extra_files 로 넘길 파일 쓰기 함수들 (float32 는 embeddings.npy 를 그대로 사용)."""
+        return {
+            file_name: (lambda path, array=getattr(self, key): np.save(path, array))
+            for key, file_name in QUANTIZED_FILES.get(self.storage, {}).items()
+        }
+
+    def manifest(self) -> dict:
+        return {"type": self.storage, "files": QUANTIZED_FILES.get(self.storage, {})}
+
+    @classmethod
+    def load(cls, path: str, meta: Optional[dict], embeddings: np.ndarray) -> "EmbeddingMatrix":
+        """manifest 의 "storage" 항목대로 양자화 파일을 mmap 으로 읽습니다. 항목이 없으면 float32 embeddings 를 씁니다."""
+        if not meta or meta["type"] == STORAGE_FLOAT32:
+            return cls(STORAGE_FLOAT32, embeddings)
+        arrays = {key: np.load(os.path.join(path, file_name), mmap_mode="r") for key, file_name in meta["files"].items()}
+        return cls(meta["type"], **arrays)
+
+
+def _chunked(embeddings: np.ndarray, dtype, transform: Callable[[np.ndarray], np.ndarray]) -> np.ndarray:
+    out = np.empty(embeddings.shape, dtype=dtype)
+    for start in range(0, len(embeddings), CHUNK_ROWS):
+        out[start:start + CHUNK_ROWS] = transform(np.asarray(embeddings[start:start + CHUNK_ROWS], dtype=np.float32))
+    return out
+
+
+def accuracy_report(reference: np.ndarray, matrix: EmbeddingMatrix, queries: np.ndarray, k: int = 10) -> dict:
+    """
+    float32 원본(reference) 대비 양자화 행렬의 정확도와 쿼리당 전체 내적 지연시간.
+    - recall@k: 원본 내적 상위 k 중 양자화 내적 상위 k 에도 들어간 비율
+    - score_abs_error_max / mean: 내적 값의 절대 오차
+    """
+    top = min(k, len(reference))
+    hits, max_error, error_sum, latencies = 0, 0.0, 0.0, []
+    for query in queries:
+        exact = reference @ query
+        started = time.perf_counter()
+        approx = matrix.dot(query)
+        latencies.append((time.perf_counter() - started) * 1000)
+        if top > 0:
+            error = np.abs(approx - exact)
+            max_error = max(max_error, float(error.max()))
+            error_sum += float(error.mean())
+            hits += len(np.intersect1d(np.argpartition(-exact, top - 1)[:top], np.argpartition(-approx, top - 1)[:top]))
+    return {
+        "storage": matrix.storage,
+        "bytes": matrix.nbytes,
+        "compression": round(reference.nbytes / max(matrix.nbytes, 1), 2),
+        "queries": len(queries),
+        f"recall@{k}": round(hits / (len(queries) * top), 4) if len(queries) and top else None,
+        "score_abs_error_max": round(max_error, 6),
+        "score_abs_error_mean": round(error_sum / len(queries), 6) if len(queries) else None,
+        "latency_ms_p50": round(float(np.percentile(latencies, 50)), 4) if latencies else None,
+    }
@@ -0,0 +1,9 @@
+import re
+
+
+# 전처리 함수: 소문자 변환, 특수문자 제거, 다중 공백 정리
+def preprocess_text(text: str) -> str:
+    text = text.lower()
+    text = re.sub(r"[^가-힣a-zA-Z0-9\s]", " ", text)
+    text = re.sub(r"\s+", " ", text)
+    return text.strip()
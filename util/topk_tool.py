@@ -0,0 +1,42 @@
+from typing import Optional
+
+import numpy as np
+
+
+def select_top_k(
+    scores: np.ndarray,
+    top_k: Optional[int] = None,
+    offset: int = 0,
+    min_score: Optional[float] = None,
+) -> np.ndarray:
+    """
+    점수 내림차순으로 [offset, offset + top_k) 구간에 해당하는 행 번호를 반환합니다.
+    전체 정렬 대신 argpartition 으로 필요한 offset + top_k 개만 고른 뒤 그 부분만 정렬합니다.
+    동점은 행 번호가 작은 쪽이 앞에 오므로, 전체를 안정 정렬한 결과와 순서가 같습니다.
+
+    :param scores: 1차원 점수 배열
+    :param top_k: 반환할 최대 개수 (None 이면 offset 이후 전체)
+    :param offset: 건너뛸 상위 개수
+    :param min_score: 이 값 미만의 점수는 제외
+    :return: 선택된 행 번호 배열 (int64)
+    """
+    candidates = np.arange(len(scores), dtype=np.int64)
+    if min_score is not None:
+        candidates = candidates[scores >= min_score]
+    candidate_scores = scores[candidates]
+
+    k = len(candidates) if top_k is None else min(offset + top_k, len(candidates))
+    if k <= offset:
+        return np.zeros(0, dtype=np.int64)
+
+    if k < len(candidates):
+        kth = np.partition(-candidate_scores, k - 1)[k - 1]
+        greater = np.flatnonzero(-candidate_scores < kth)
+        # 경계값과 동점인 행은 행 번호가 작은 것부터 채웁니다.
+        equal = np.flatnonzero(-candidate_scores == kth)[:k - len(greater)]
+        selected = np.concatenate([greater, equal])
+    else:
+        selected = np.arange(len(candidates), dtype=np.int64)
+
+    order = np.lexsort((selected, -candidate_scores[selected]))
+    return candidates[selected[order]][offset:k]